@@ -0,0 +1,109 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Benchmark rendering through the render daemon against cold command lines.
+
+Renders a small tree many times, starting a new ``ninjecto`` process for
+each render, then sending each render to a daemon with the thin client
+command line, and with the client API from this process.
+
+Usage::
+
+    python3 benchmark/daemon.py --files 20 --renders 20
+"""
+
+from os import environ, getcwd
+from sys import executable
+from time import perf_counter, sleep
+from pathlib import Path
+from argparse import ArgumentParser
+from subprocess import Popen, run
+from tempfile import TemporaryDirectory
+
+from ninjecto.client import request
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--renders', type=int, default=20)
+    args = parser.parse_args()
+
+    with TemporaryDirectory(dir=Path.cwd()) as tmpdir:
+        root = Path(tmpdir)
+        source = root / 'source'
+        source.mkdir()
+        destination = root / 'destination'
+        destination.mkdir()
+        socket = root / 'ninjecto.sock'
+
+        for index in range(args.files):
+            (source / 'file{}.txt'.format(index)).write_text(
+                '{{ values.name }} ' + str(index), encoding='utf-8',
+            )
+
+        command = [
+            executable, '-m', 'ninjecto', '--force', '--output-in',
+            str(source), str(destination), '--values', 'name=ninjecto',
+        ]
+
+        def measure(name, render):
+            start = perf_counter()
+            for _ in range(args.renders):
+                render()
+            elapsed = perf_counter() - start
+
+            print('{:8} {:.3f}s: {:.1f} ms/render'.format(
+                name, elapsed, elapsed * 1000 / args.renders,
+            ))
+
+        measure('cold', lambda: run(command, check=True))
+
+        daemon = Popen([
+            executable, '-m', 'ninjecto', 'serve', '--socket', str(socket),
+        ])
+        try:
+            while not socket.exists():
+                sleep(0.01)
+
+            measure('client', lambda: run(
+                command[:3] + ['--connect', str(socket)] + command[3:],
+                check=True,
+            ))
+
+            job = {
+                'source': str(source),
+                'destination': str(destination),
+                'output_in': True,
+                'stdout': False,
+                'configs': [],
+                'libraries': [],
+                'values_files': [],
+                'values': {'name': 'ninjecto'},
+                'values_in': None,
+                'cwd': getcwd(),
+                'environ': dict(environ),
+                'options': {'override': True},
+            }
+            measure('api', lambda: request(socket, job))
+
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+
+if __name__ == '__main__':
+    main()
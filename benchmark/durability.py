@@ -0,0 +1,81 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Benchmark the cost of the durability modes of atomic writes.
+
+Renders a tree of small templates in every durability mode, reporting the
+files processed per second.
+
+Usage::
+
+    python3 benchmark/durability.py --files 2000 --directories 20
+"""
+
+from time import perf_counter
+from pathlib import Path
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+
+from ninjecto.core import Ninjecto
+from ninjecto.config import load_config
+from ninjecto.outputs import DURABILITY_MODES
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--directories', type=int, default=20)
+    args = parser.parse_args()
+
+    config = load_config([])
+    values = {'name': 'ninjecto'}
+
+    with TemporaryDirectory(dir=Path.cwd()) as tmpdir:
+        root = Path(tmpdir)
+        source = root / 'source'
+
+        for index in range(args.files):
+            directory = source / 'dir{}'.format(index % args.directories)
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / 'file{}.txt'.format(index)).write_text(
+                '{{ values.name }} ' + str(index), encoding='utf-8',
+            )
+
+        # Warm up the bytecode cache, so every mode renders the same way
+        for durability in ('warmup', ) + DURABILITY_MODES:
+            destination = root / durability
+            destination.mkdir()
+
+            ninjecto = Ninjecto(
+                config, None, {}, {}, [], values,
+                source, destination, None,
+            )
+
+            if durability == 'warmup':
+                ninjecto.run(jobs=1)
+                continue
+
+            start = perf_counter()
+            ninjecto.run(jobs=1, atomic=True, durability=durability)
+            elapsed = perf_counter() - start
+
+            print('{:14} {:.3f}s: {:.1f} files/sec'.format(
+                durability, elapsed, args.files / elapsed,
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Benchmark the rendering throughput of a directory tree.
+
+Generates a flat tree of small templates that use a library macro and render
+it several times with a single job, reporting the files processed per second
+with a new Jinja environment per file, as Ninjecto used to, and with the
+environment shared by all the files. The persistent bytecode cache is disabled
+so only the reuse of the environment is measured.
+
+Usage::
+
+    python3 benchmark/environment.py --files 5000 --rounds 3
+"""
+
+from time import perf_counter
+from pathlib import Path
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+
+from ninjecto.core import Ninjecto
+from ninjecto.config import load_config
+
+
+MACRO = """\
+{% macro entry(key, value) -%}
+{{ key }}: {{ value | default('none') }}
+{%- endmacro %}
+"""
+
+TEMPLATE = """\
+{% import 'library/macros.tpl' as macros %}
+# File {{ values.index }}
+{{ macros.entry('name', values.name) }}
+{{ macros.entry('version', values.version) }}
+"""
+
+
+class PerFileNinjecto(Ninjecto):
+    """
+    Ninjecto creating a new environment for each file, so no compiled
+    template is reused between files.
+    """
+
+    def _render_file(self, paths, content):
+        loader = self._environment.loader
+        self._environment = self._create_environment()
+        self._environment.loader = loader
+        return super()._render_file(paths, content)
+
+
+def generate(root, files):
+    """
+    Generate a source tree and a library for the benchmark.
+
+    :param Path root: Directory to create the workload in.
+    :param int files: Number of template files to create.
+
+    :return: A tuple with the source, library and destination directories.
+    :rtype: tuple
+    """
+    source = root / 'source'
+    library = root / 'library'
+    destination = root / 'destination'
+
+    for directory in (source, library, destination):
+        directory.mkdir()
+
+    (library / 'macros.tpl').write_text(MACRO, encoding='utf-8')
+
+    for index in range(files):
+        name = 'file{{{{ values.index }}}}_{}.txt'.format(index)
+        (source / name).write_text(TEMPLATE, encoding='utf-8')
+
+    return source, library, destination
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    config = load_config([])
+    config['ninjecto']['cache'] = {'enabled': False}
+    values = {'index': 1, 'name': 'ninjecto', 'version': '1.0.0'}
+
+    with TemporaryDirectory() as tmpdir:
+        source, library, destination = generate(Path(tmpdir), args.files)
+
+        for mode, clss in [
+            ('per-file', PerFileNinjecto),
+            ('shared', Ninjecto),
+        ]:
+            best = None
+            for _ in range(args.rounds):
+                ninjecto = clss(
+                    config, None, {}, {}, [library], values,
+                    source, destination, None,
+                )
+
+                start = perf_counter()
+                processed = ninjecto.run(override=True, jobs=1)
+                elapsed = perf_counter() - start
+
+                best = elapsed if best is None else min(best, elapsed)
+
+            print('{:8} {} files in {:.3f}s: {:.1f} files/sec'.format(
+                mode, processed, best, processed / best,
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Benchmark matrix rendering against one process per value set.
+
+Renders a tree of templates for many value sets, starting a new ``ninjecto``
+process per value set, then with a single matrix rendering.
+
+Usage::
+
+    python3 benchmark/matrix.py --files 50 --sets 40 --jobs 4
+"""
+
+from sys import executable
+from time import perf_counter
+from pathlib import Path
+from argparse import ArgumentParser
+from subprocess import run
+from tempfile import TemporaryDirectory
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--sets', type=int, default=40)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    with TemporaryDirectory(dir=Path.cwd()) as tmpdir:
+        root = Path(tmpdir)
+        source = root / 'source'
+        source.mkdir()
+        sets = root / 'sets'
+        sets.mkdir()
+
+        for index in range(args.files):
+            (source / 'file{}.txt'.format(index)).write_text(
+                '{% for key, value in values.items() %}'
+                '{{ key }}={{ value }} ' + str(index) + '\n'
+                '{% endfor %}',
+                encoding='utf-8',
+            )
+
+        for index in range(args.sets):
+            (sets / 'set{}.yaml'.format(index)).write_text(
+                'name: set{}\nindex: {}'.format(index, index),
+                encoding='utf-8',
+            )
+
+        command = [executable, '-m', 'ninjecto', '--output-in', '--parents']
+
+        start = perf_counter()
+        for path in sorted(sets.iterdir()):
+            run(command + [
+                '--values-file', str(path),
+                str(source), str(root / 'processes' / path.stem),
+            ], check=True)
+        elapsed = perf_counter() - start
+        print('{:10} {:.3f}s: {:.1f} sets/sec'.format(
+            'processes', elapsed, args.sets / elapsed,
+        ))
+
+        jobs = [] if args.jobs is None else ['--jobs', str(args.jobs)]
+        start = perf_counter()
+        run(command + jobs + [
+            '--matrix', str(sets / '*.yaml'),
+            str(source), str(root / 'matrix' / '{name}'),
+        ], check=True)
+        elapsed = perf_counter() - start
+        print('{:10} {:.3f}s: {:.1f} sets/sec'.format(
+            'matrix', elapsed, args.sets / elapsed,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Microbenchmark the filter and namespace plugins.
+
+Discovers every plugin available to Ninjecto, the ones declared in the
+``ninjecto_plugins_filters_1_0`` and ``ninjecto_plugins_namespaces_1_0``
+entry points and the ones registered with ``register()``, and measures the
+time of each one against representative inputs:
+
+- Filters are called directly with each input, and applied to every item of
+  a loop in a compiled template with their first input, like templates
+  usually do.
+- Namespaces are instanced with their default configuration, as done once
+  per run, and dynamic namespaces are called with a file path, as done for
+  each file, both with a new instance and with an instance already called.
+
+Results can be saved as a JSON baseline, and compared with a previous
+baseline, failing if any plugin got slower than a threshold.
+
+Usage::
+
+    python3 benchmark/plugins.py --save baseline.json
+    python3 benchmark/plugins.py --compare baseline.json
+
+Plugins registered with ``register()`` are discovered by importing the
+modules that register them with ``--import``. Those modules can also define
+a ``BENCHMARK_INPUTS`` dictionary mapping the name of each of their plugins
+to a list of ``(case, args, kwargs)`` tuples to benchmark it with. Filters
+without inputs are benchmarked with the inputs of the text filters.
+"""
+
+from sys import platform, version
+from json import dumps, loads
+from timeit import Timer
+from fnmatch import fnmatch
+from pathlib import Path
+from argparse import ArgumentParser
+from importlib import import_module
+from tempfile import TemporaryDirectory
+
+from ninjecto.config import load_defaults
+from ninjecto.environment import NinjectoEnvironment
+from ninjecto.utils.dictionary import Namespace
+from ninjecto.plugins.filters import FiltersLoader
+from ninjecto.plugins.namespaces import NamespacesLoader
+
+
+LINE = 'The quick "brown" fox jumps over the lazy dog'
+
+TEXT = {
+    'word': ('fox',),
+    'line': (LINE,),
+    'paragraph': ('\n'.join([LINE] * 50),),
+}
+
+IDENTIFIERS = {
+    'camel': ('DeviceType',),
+    'snake': ('device_type_identifier',),
+    'sentence': ('the quick brown fox',),
+}
+
+INPUTS = {
+    'comment': [
+        ('line-python', TEXT['line'], {}),
+        ('paragraph-python', TEXT['paragraph'], {}),
+        ('paragraph-cblock', TEXT['paragraph'], {'style': 'cblock'}),
+        ('paragraph-html', TEXT['paragraph'], {'style': 'html'}),
+    ],
+    'quote': [
+        ('line', TEXT['line'], {}),
+        ('paragraph', TEXT['paragraph'], {}),
+        ('paragraph-single', TEXT['paragraph'], {'quote': '\''}),
+    ],
+    'ordinal': [
+        ('number', (1002,), {}),
+    ],
+    'ordinalize': [
+        ('number', (1002,), {}),
+    ],
+    'transliterate': [
+        ('accents', ('Ærøskøbing älvkarleby',), {}),
+    ],
+}
+
+for key in [
+    'camelize', 'dasherize', 'humanize', 'parameterize', 'pluralize',
+    'singularize', 'tableize', 'titleize', 'underscore',
+]:
+    INPUTS[key] = [
+        (case, args, {}) for case, args in IDENTIFIERS.items()
+    ]
+
+DEFAULT_INPUTS = [
+    (case, args, {}) for case, args in TEXT.items()
+]
+
+LOOP = """\
+{% for item in items %}{{ item | plugin(*args, **kwargs) }}
+{% endfor %}"""
+
+LOOP_ITEMS = 100
+
+
+def measure(function, rounds):
+    """
+    Measure the time of a call to a function.
+
+    The number of calls per round is chosen so a round lasts at least 0.2
+    seconds.
+
+    :param function function: Function to call, without arguments.
+    :param int rounds: Number of rounds to measure.
+
+    :return: The best time of a call in the rounds, in seconds.
+    :rtype: float
+    """
+    timer = Timer(function)
+    number, elapsed = timer.autorange()
+    if rounds > 1:
+        elapsed = min(elapsed, *timer.repeat(repeat=rounds - 1, number=number))
+    return elapsed / number
+
+
+def filters(loaded, inputs, environment, rounds):
+    """
+    Benchmark filter plugins.
+
+    :return: A dictionary mapping the name of each filter and case to the
+     best time of a call, in seconds.
+    :rtype: dict
+    """
+    results = {}
+
+    for name, function in loaded.items():
+        environment.filters['plugin'] = function
+        template = environment.from_string(LOOP)
+
+        cases = inputs.get(name, DEFAULT_INPUTS)
+        for index, (case, args, kwargs) in enumerate(cases):
+            value, *extra = args
+
+            def call():
+                return environment.call_filter(
+                    'plugin', value, extra, kwargs,
+                )
+
+            try:
+                call()
+            except Exception as e:
+                print('Skipping filter {} ({}): {}'.format(name, case, e))
+                continue
+
+            key = '{}.{}'.format(name, case)
+            results['filters.{}.call'.format(key)] = measure(call, rounds)
+
+            if index:
+                continue
+
+            items = [value] * LOOP_ITEMS
+
+            def loop():
+                return template.render(
+                    items=items, args=extra, kwargs=kwargs,
+                )
+
+            results['filters.{}.loop'.format(key)] = \
+                measure(loop, rounds) / LOOP_ITEMS
+
+    return results
+
+
+def namespaces(loaded, config, filepath, rounds):
+    """
+    Benchmark namespace plugins.
+
+    :return: A dictionary mapping the name of each namespace and case to the
+     best time of a call, in seconds.
+    :rtype: dict
+    """
+    results = {}
+
+    for name, function in loaded.items():
+        nsconf = getattr(config.ninjecto.namespace, name, Namespace())
+
+        try:
+            namespace = function(nsconf)
+        except Exception as e:
+            print('Skipping namespace {}: {}'.format(name, e))
+            continue
+
+        results['namespaces.{}.instance'.format(name)] = measure(
+            lambda: function(nsconf), rounds,
+        )
+
+        # Only dynamic namespaces are called for each file
+        if not callable(namespace):
+            continue
+
+        def cold():
+            return function(nsconf)(filepath)
+
+        namespace(filepath)
+
+        results['namespaces.{}.file-cold'.format(name)] = measure(
+            cold, rounds,
+        )
+        results['namespaces.{}.file-warm'.format(name)] = measure(
+            lambda: namespace(filepath), rounds,
+        )
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline, printing the changes.
+
+    :return: The number of plugins that got slower than the threshold.
+    :rtype: int
+    """
+    regressions = 0
+
+    print('{:56} {:>10} {:>10} {:>8}'.format(
+        'plugin', 'baseline', 'current', 'change',
+    ))
+    for key, value in results['results'].items():
+        previous = baseline['results'].get(key)
+        if not previous:
+            continue
+
+        change = (value - previous) / previous
+        regressed = change > threshold
+        regressions += regressed
+
+        print('{:56} {:>8.2f}us {:>8.2f}us {:>+8.1%}{}'.format(
+            key, previous * 1e6, value * 1e6, change,
+            '  REGRESSION' if regressed else '',
+        ))
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument(
+        '--plugins', default='*',
+        help='Benchmark only the plugins whose name matches this pattern',
+    )
+    parser.add_argument(
+        '--import', dest='modules', action='append', default=[],
+        metavar='MODULE',
+        help='Import a module registering plugins before discovering them',
+    )
+    parser.add_argument('--save', type=Path)
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='Relative slowdown considered a regression',
+    )
+    args = parser.parse_args()
+
+    inputs = dict(INPUTS)
+    for module in args.modules:
+        inputs.update(getattr(import_module(module), 'BENCHMARK_INPUTS', {}))
+
+    def select(loaded):
+        return {
+            name: function
+            for name, function in loaded.items()
+            if fnmatch(name, args.plugins)
+        }
+
+    loaded_filters = select(FiltersLoader().load_functions())
+    loaded_namespaces = select(NamespacesLoader().load_functions())
+
+    print('Filters: {}'.format(', '.join(loaded_filters) or 'none'))
+    print('Namespaces: {}'.format(', '.join(loaded_namespaces) or 'none'))
+
+    with TemporaryDirectory() as tmpdir:
+        # The read filter is given the paths of files with the text inputs
+        readable = []
+        for case, (text, ) in TEXT.items():
+            path = Path(tmpdir) / '{}.txt'.format(case)
+            path.write_text(text, encoding='utf-8')
+            readable.append((case, (str(path), ), {}))
+        inputs.setdefault('read', readable)
+
+        results = filters(
+            loaded_filters, inputs, NinjectoEnvironment(), args.rounds,
+        )
+
+    # Dynamic namespaces get this file, which is part of a git repository
+    # when running from a checkout
+    results.update(namespaces(
+        loaded_namespaces, Namespace(load_defaults()),
+        Path(__file__).resolve(), args.rounds,
+    ))
+
+    print('{:56} {:>10} {:>14}'.format('plugin', 'time', 'calls/sec'))
+    for key, value in results.items():
+        print('{:56} {:>8.2f}us {:>14.1f}'.format(
+            key, value * 1e6, 1 / value,
+        ))
+
+    report = {
+        'python': version.split()[0],
+        'platform': platform,
+        'rounds': args.rounds,
+        'results': results,
+    }
+
+    if args.save:
+        args.save.write_text(dumps(report, indent=4) + '\n')
+        print('Saved results to {}'.format(args.save))
+
+    if args.compare:
+        baseline = loads(args.compare.read_text())
+        if compare(report, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Benchmark the peak memory of rendering a large output.
+
+Renders a single template that generates an output of the given size, whole
+and streamed, reporting the peak memory allocated by each render.
+
+Usage::
+
+    python3 benchmark/streaming.py --megabytes 200
+"""
+
+from pathlib import Path
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from tracemalloc import start, stop, get_traced_memory, reset_peak
+
+from ninjecto.core import Ninjecto
+from ninjecto.config import load_config
+
+
+TEMPLATE = """\
+{% for index in range(values.rows) -%}
+INSERT INTO entries (id, name) VALUES ({{ index }}, '{{ values.name }}');
+{% endfor %}
+"""
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--megabytes', type=int, default=50)
+    args = parser.parse_args()
+
+    config = load_config([])
+
+    # Each row is around 64 bytes long
+    values = {
+        'rows': args.megabytes * 1024 * 1024 // 64,
+        'name': 'ninjecto',
+    }
+
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        source = root / 'dump.sql'
+        source.write_text(TEMPLATE, encoding='utf-8')
+
+        start()
+        for stream in (False, True):
+            ninjecto = Ninjecto(
+                config, None, {}, {}, [], values,
+                source, root, 'output.sql',
+            )
+
+            reset_peak()
+            ninjecto.run(override=True, stream=stream)
+            _, peak = get_traced_memory()
+
+            print('{}: {:.1f} MiB output, {:.1f} MiB peak'.format(
+                'streamed' if stream else 'whole',
+                (root / 'output.sql').stat().st_size / 1024 / 1024,
+                peak / 1024 / 1024,
+            ))
+        stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+End-to-end benchmark suite over synthetic workloads.
+
+Generates template trees for several workloads, wide and deep trees, a huge
+single template, heavy use of library macros, a large values bundle and
+dynamic file names, and renders each one with the ``Ninjecto`` API and with
+the command line, each in a new process. Reports the files processed per
+second and the peak resident memory of each render, and the startup time of
+the command line.
+
+Results can be saved as a JSON baseline, and compared with a previous
+baseline, failing if any metric regressed more than a threshold.
+
+Usage::
+
+    python3 benchmark/suite.py --scale 0.1 --save baseline.json
+    python3 benchmark/suite.py --scale 0.1 --compare baseline.json
+
+A scale of 1 generates the full workloads, like 100000 files for the wide
+tree.
+"""
+
+import os
+from sys import executable, platform, version
+from json import dumps, loads
+from time import perf_counter
+from pathlib import Path
+from argparse import ArgumentParser
+from resource import getrusage, RUSAGE_SELF
+from subprocess import Popen, PIPE
+from tempfile import TemporaryDirectory
+
+
+MACROS = """\
+{% macro field(key, value) -%}
+{{ key | title }}: {{ value | default('none') }}
+{%- endmacro %}
+{% macro section(name, items) -%}
+[{{ name }}]
+{% for key, value in items.items() %}{{ field(key, value) }}
+{% endfor %}
+{%- endmacro %}
+"""
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+
+
+def wide(root, scale):
+    """
+    Many small templates in a flat tree.
+    """
+    for index in range(max(1, int(100000 * scale))):
+        write(
+            root / 'source' / 'file{}.txt'.format(index),
+            '{{ values.name }} ' + str(index),
+        )
+    return {'name': 'wide'}
+
+
+def deep(root, scale):
+    """
+    A chain of nested directories, with a template in each one.
+    """
+    directory = root / 'source'
+    for index in range(max(1, int(500 * scale))):
+        directory = directory / 'level{}'.format(index)
+        write(directory / 'file.txt', '{{ values.name }} ' + str(index))
+    return {'name': 'deep'}
+
+
+def huge(root, scale):
+    """
+    A single template with a huge number of statements.
+    """
+    lines = max(1, int(200000 * scale))
+    write(root / 'source' / 'huge.txt', ''.join(
+        'line {} {{{{ values.name }}}}'
+        '{{% if values.flag %}} flagged{{% endif %}}\n'.format(index)
+        for index in range(lines)
+    ))
+    return {'name': 'huge', 'flag': True}
+
+
+def library(root, scale):
+    """
+    Templates calling library macros in loops.
+    """
+    write(root / 'library' / 'macros.j2', MACROS)
+    for index in range(max(1, int(5000 * scale))):
+        write(
+            root / 'source' / 'file{}.ini'.format(index),
+            '{% import "library/macros.j2" as macros %}'
+            '{% for name, items in values.sections.items() %}'
+            '{{ macros.section(name, items) }}'
+            '{% endfor %}',
+        )
+    return {'sections': {
+        'section{}'.format(section): {
+            'key{}'.format(key): key * section for key in range(20)
+        }
+        for section in range(10)
+    }}
+
+
+def values(root, scale):
+    """
+    Templates reading a few keys of a large values bundle.
+    """
+    count = max(1, int(200000 * scale))
+    for index in range(max(1, int(2000 * scale))):
+        write(
+            root / 'source' / 'file{}.txt'.format(index),
+            '{{{{ values.entries.key{} }}}}'.format(index % count),
+        )
+    return {'entries': {
+        'key{}'.format(index): 'value{}'.format(index)
+        for index in range(count)
+    }}
+
+
+def dynamic(root, scale):
+    """
+    Templates and directories with rendered names.
+    """
+    for index in range(max(1, int(10000 * scale))):
+        write(
+            root / 'source' / '{{{{ values.prefix }}}}{}'.format(index % 100) /
+            '{{{{ values.prefix }}}}_file{}.txt'.format(index),
+            '{{ values.prefix }}',
+        )
+    return {'prefix': 'dynamic'}
+
+
+WORKLOADS = {
+    workload.__name__: workload
+    for workload in (wide, deep, huge, library, values, dynamic)
+}
+
+
+def execute(command, cache=None):
+    """
+    Run a command, getting its peak resident memory.
+
+    :param Path cache: Directory to store the caches of Ninjecto in, so each
+     command starts with a cold cache.
+
+    :return: A tuple with the elapsed seconds, the peak resident memory in
+     KiB and the standard output.
+    :rtype: tuple
+    """
+    start = perf_counter()
+    env = dict(os.environ)
+    if cache is not None:
+        env['XDG_CACHE_HOME'] = str(cache)
+
+    process = Popen(command, stdout=PIPE, env=env)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode:
+        raise RuntimeError('Command failed: {}'.format(' '.join(command)))
+    return elapsed, usage.ru_maxrss, output
+
+
+def render(root):
+    """
+    Render a generated workload with the API, in this process.
+
+    Prints the number of files processed, the elapsed seconds and the peak
+    resident memory as JSON.
+    """
+    from ninjecto.core import Ninjecto
+    from ninjecto.config import load_config
+
+    ninjecto = Ninjecto(
+        load_config([]), None, {}, {},
+        [path for path in [root / 'library'] if path.is_dir()],
+        loads((root / 'values.json').read_text(encoding='utf-8')),
+        root / 'source', root / 'api', None,
+    )
+
+    start = perf_counter()
+    processed = ninjecto.run(jobs=1)
+    elapsed = perf_counter() - start
+
+    print(dumps({
+        'files': processed,
+        'seconds': elapsed,
+        'peak_rss_kib': getrusage(RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def measure(name, root, scale):
+    """
+    Generate a workload and render it with the API and the command line.
+
+    Both start with a cold cache of compiled templates.
+
+    :return: The results of both.
+    :rtype: dict
+    """
+    root.mkdir()
+    (root / 'values.json').write_text(
+        dumps(WORKLOADS[name](root, scale)), encoding='utf-8',
+    )
+    (root / 'api').mkdir()
+    (root / 'cli').mkdir()
+
+    _, _, output = execute(
+        [executable, __file__, '--render', str(root)], root / 'api-cache',
+    )
+    api = loads(output)
+    api['files_per_second'] = api['files'] / api['seconds']
+
+    command = [
+        executable, '-m', 'ninjecto', '--jobs', '1', '--output-in',
+        '--values-file', str(root / 'values.json'),
+    ]
+    if (root / 'library').is_dir():
+        command.extend(['--library', str(root / 'library')])
+
+    elapsed, rss, _ = execute(
+        command + [str(root / 'source'), str(root / 'cli')],
+        root / 'cli-cache',
+    )
+    cli = {
+        'files': api['files'],
+        'seconds': elapsed,
+        'peak_rss_kib': rss,
+        'files_per_second': api['files'] / elapsed,
+    }
+
+    return {'api': api, 'cli': cli}
+
+
+def startup(root, rounds):
+    """
+    Measure the time to render a single file with the command line.
+
+    :return: The best elapsed seconds and the peak resident memory.
+    :rtype: dict
+    """
+    write(root / 'startup' / 'file.txt', '{{ values.name }}')
+
+    best = None
+    for index in range(rounds):
+        elapsed, rss, _ = execute([
+            executable, '-m', 'ninjecto', '--values', 'name=startup', '--',
+            str(root / 'startup' / 'file.txt'),
+            str(root / 'startup' / 'output{}.txt'.format(index)),
+        ])
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {'seconds': best, 'peak_rss_kib': rss}
+
+
+# Metrics compared with the baseline, and if higher values are better
+METRICS = {
+    'files_per_second': True,
+    'seconds': False,
+    'peak_rss_kib': False,
+}
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline, printing the changes.
+
+    :return: The number of metrics that regressed more than the threshold.
+    :rtype: int
+    """
+    regressions = 0
+
+    def walk(current, previous, path):
+        nonlocal regressions
+
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            if isinstance(value, dict):
+                walk(value, previous[key], path + [key])
+                continue
+            if key not in METRICS or not previous[key]:
+                continue
+
+            change = (value - previous[key]) / previous[key]
+            regressed = change < -threshold if METRICS[key] \
+                else change > threshold
+            regressions += regressed
+
+            print('{:40} {:>14.3f} {:>14.3f} {:>+8.1%}{}'.format(
+                '.'.join(path + [key]), previous[key], value, change,
+                '  REGRESSION' if regressed else '',
+            ))
+
+    print('{:40} {:>14} {:>14} {:>8}'.format(
+        'metric', 'baseline', 'current', 'change',
+    ))
+    walk(results['results'], baseline['results'], [])
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=float, default=0.05)
+    parser.add_argument(
+        '--workload', action='append', choices=sorted(WORKLOADS),
+        help='Workloads to run, all by default',
+    )
+    parser.add_argument('--startup-rounds', type=int, default=5)
+    parser.add_argument('--save', type=Path, help='Save the results as JSON')
+    parser.add_argument(
+        '--compare', type=Path, help='Baseline to compare the results with',
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='Relative change of a metric considered a regression',
+    )
+    parser.add_argument('--render', type=Path, help=None)
+    args = parser.parse_args()
+
+    # Render a workload, in a process started by the suite
+    if args.render:
+        render(args.render)
+        return 0
+
+    results = {}
+
+    with TemporaryDirectory(dir=Path.cwd()) as tmpdir:
+        root = Path(tmpdir)
+
+        for name in args.workload or WORKLOADS:
+            results[name] = measure(name, root / name, args.scale)
+            print('{:10} {}'.format(name, '  '.join(
+                '{}: {:.1f} files/sec, {} KiB'.format(
+                    kind, result['files_per_second'], result['peak_rss_kib'],
+                )
+                for kind, result in results[name].items()
+            )))
+
+        results['startup'] = startup(root, args.startup_rounds)
+        print('{:10} {:.3f}s, {} KiB'.format(
+            'startup', results['startup']['seconds'],
+            results['startup']['peak_rss_kib'],
+        ))
+
+    report = {
+        'python': version,
+        'platform': platform,
+        'scale': args.scale,
+        'results': results,
+    }
+
+    if args.save:
+        args.save.write_text(dumps(report, indent=4), encoding='utf-8')
+
+    if args.compare:
+        baseline = loads(args.compare.read_text(encoding='utf-8'))
+        if baseline['scale'] != args.scale:
+            print('Baseline scale {} differs from {}'.format(
+                baseline['scale'], args.scale,
+            ))
+        if compare(report, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
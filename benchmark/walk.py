@@ -0,0 +1,234 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Benchmark the filesystem calls made to walk a directory tree.
+
+Generates a tree of empty files spread in nested directories and renders it,
+counting the calls to the filesystem functions of the ``os`` module, which
+map one to one to system calls. As a baseline, the tree is also walked as
+Ninjecto used to, checking each path on its own and listing directories
+without their file types.
+
+Usage::
+
+    python3 benchmark/walk.py --entries 100000
+"""
+
+import os
+from time import perf_counter
+from pathlib import Path
+from functools import wraps
+from collections import Counter
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+
+from ninjecto.core import Ninjecto
+from ninjecto.config import load_config
+
+
+FUNCTIONS = [
+    'stat', 'lstat', 'scandir', 'listdir', 'mkdir', 'chmod',
+]
+
+
+def generate(root, entries, width):
+    """
+    Generate a source tree for the benchmark.
+
+    :param Path root: Directory to create the tree in.
+    :param int entries: Number of files and directories to create.
+    :param int width: Number of entries per directory.
+
+    :return: The source directory.
+    :rtype: Path
+    """
+    source = root / 'source'
+    source.mkdir()
+
+    created = 0
+    directories = [source]
+    while created < entries:
+        directory = directories.pop(0)
+        for index in range(width):
+            if created >= entries:
+                break
+            created += 1
+
+            # A tenth of the entries are directories, nesting the tree
+            if index < max(width // 10, 1):
+                subdirectory = directory / 'dir{}'.format(created)
+                subdirectory.mkdir()
+                directories.append(subdirectory)
+                continue
+
+            (directory / 'file{}.txt'.format(created)).touch()
+
+    return source
+
+
+def previous_walk(src, dstdir, override):
+    """
+    Walk a tree the way Ninjecto used to, before listing the directories
+    with ``scandir``.
+
+    Names aren't rendered and contents are copied as is, so only the calls
+    to the filesystem are compared.
+
+    :param Path src: Path to the source file or directory.
+    :param Path dstdir: Path to the destination directory.
+    :param bool override: Override existing files and directories.
+
+    :return: Number of files and directories processed.
+    :rtype: int
+    """
+    dst = dstdir / src.name
+
+    if dst.exists() and not override:
+        raise RuntimeError('{} exists'.format(dst))
+
+    if src.is_file():
+        dst.write_text(src.read_text(encoding='utf-8'), encoding='utf-8')
+        dst.chmod(src.stat().st_mode)
+        return 1
+
+    if src.is_dir():
+        dst.mkdir(exist_ok=override)
+        dst.chmod(src.stat().st_mode)
+
+        processed = 1
+        for subfile in src.iterdir():
+            processed += previous_walk(subfile, dst, override)
+        return processed
+
+    raise RuntimeError('{} is not a file or a directory'.format(src))
+
+
+def measure(label, walk):
+    """
+    Walk a tree, printing the time taken and the filesystem calls made.
+
+    :param str label: Label of the walk in the report.
+    :param walk: Function walking the tree, returning the number of entries
+     processed.
+    """
+    counter = Counter()
+    restore = count(counter)
+    start = perf_counter()
+    try:
+        processed = walk()
+    finally:
+        elapsed = perf_counter() - start
+        restore()
+
+    print('{} {} entries in {:.3f}s, {:.2f} calls per entry:'.format(
+        label, processed, elapsed, sum(counter.values()) / processed,
+    ))
+    for name in FUNCTIONS:
+        print('  {:8} {}'.format(name, counter[name]))
+
+
+def count(counter):
+    """
+    Wrap the filesystem functions of the ``os`` module to count their calls.
+
+    :param Counter counter: Counter to increment.
+
+    :return: A function restoring the original functions.
+    :rtype: function
+    """
+    originals = {name: getattr(os, name) for name in FUNCTIONS}
+
+    def wrap(name, function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            counter[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    for name, function in originals.items():
+        setattr(os, name, wrap(name, function))
+
+    # Entries of a listing stat the file on their own
+    class Entry:
+        def __init__(self, entry):
+            self._entry = entry
+
+        def __getattr__(self, name):
+            return getattr(self._entry, name)
+
+        def stat(self, **kwargs):
+            counter['stat'] += 1
+            return self._entry.stat(**kwargs)
+
+    class Listing:
+        def __init__(self, iterator):
+            self._iterator = iterator
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._iterator.close()
+
+        def __iter__(self):
+            return (Entry(entry) for entry in self._iterator)
+
+    scandir = os.scandir
+    os.scandir = lambda *args: Listing(scandir(*args))
+
+    def restore():
+        for name, function in originals.items():
+            setattr(os, name, function)
+
+    return restore
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--width', type=int, default=100)
+    args = parser.parse_args()
+
+    config = load_config([])
+
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        source = generate(root, args.entries, args.width)
+        previous = root / 'previous'
+        previous.mkdir()
+        destination = root / 'destination'
+        destination.mkdir()
+
+        for override in (False, True):
+            action = 'Overriding' if override else 'Creating'
+
+            measure(
+                '[previous] {}'.format(action),
+                lambda: previous_walk(source, previous, override),
+            )
+
+            ninjecto = Ninjecto(
+                config, None, {}, {}, [], {},
+                source, destination, None,
+            )
+            measure(
+                '[scandir]  {}'.format(action),
+                lambda: ninjecto.run(override=override, jobs=1),
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -19,48 +19,219 @@
 Executable module entry point.
 """
 
+from sys import argv, stdout
+from time import perf_counter
 from logging import getLogger
 
-from .core import Ninjecto
-from .local import load_local
-from .config import load_config
-from .values import load_values
-from .plugins.filters import FiltersLoader
-from .plugins.namespaces import NamespacesLoader
+from .tracing import span
 
 
 log = getLogger(__name__)
 
 
+def serve(argv):
+    """
+    Run the render daemon, see :mod:`ninjecto.server`.
+    """
+    from .args import InvalidArguments, parse_serve_args
+    try:
+        args = parse_serve_args(argv)
+    except InvalidArguments:
+        return 1
+
+    from .client import default_socket
+    from .server import serve
+
+    serve(
+        args.socket or default_socket(),
+        configs=args.configs,
+        max_instances=args.max_instances,
+    )
+    return 0
+
+
+def deps(argv):
+    """
+    Print the dependency graph of the templates, see :mod:`ninjecto.deps`.
+    """
+    from .args import InvalidArguments, parse_deps_args
+    try:
+        args = parse_deps_args(argv)
+    except InvalidArguments:
+        return 1
+
+    from .core import Ninjecto
+    from .local import load_local
+    from .config import load_config
+
+    ninjecto = Ninjecto(
+        load_config(args.configs),
+        load_local(args.source.parent),
+        {},
+        {},
+        args.libraries,
+        {},
+        args.source,
+        None,
+        None,
+    )
+    graph = ninjecto.dependencies()
+
+    if args.dependents:
+        for name in graph.dependents(args.dependents):
+            stdout.write(name + '\n')
+    elif args.format == 'dot':
+        stdout.write(graph.to_dot())
+    else:
+        stdout.write(graph.to_json() + '\n')
+
+    return 0
+
+
+def compile_(argv):
+    """
+    Precompile the templates to Python modules, see
+    :meth:`ninjecto.core.Ninjecto.compile`.
+    """
+    from .args import InvalidArguments, parse_compile_args
+    try:
+        args = parse_compile_args(argv)
+    except InvalidArguments:
+        return 1
+
+    from .core import Ninjecto
+    from .local import load_local
+    from .config import load_config
+    from .plugins.filters import FiltersLoader
+
+    # Filters are checked when compiling
+    local = load_local(args.source.parent)
+    ninjecto = Ninjecto(
+        load_config(args.configs),
+        local,
+        FiltersLoader().load_functions(),
+        {},
+        args.libraries,
+        {},
+        args.source,
+        None,
+        None,
+    )
+    ninjecto.compile(args.target)
+
+    return 0
+
+
+def connect(args):
+    """
+    Send the render to the daemon, see :mod:`ninjecto.client`.
+
+    Only lightweight modules are imported, so the client starts fast.
+    """
+    from .client import default_socket, job_from_args, request
+
+    path = args.connect or default_socket()
+    try:
+        response = request(path, job_from_args(args))
+    except OSError as e:
+        log.critical('Unable to connect to the daemon at {}: {}'.format(
+            path, e,
+        ))
+        return 1
+
+    if 'error' in response:
+        log.critical(response['error'])
+        return 1
+
+    result = response['result']
+    if result['output'] is not None:
+        stdout.write(result['output'])
+    return 0
+
+
 def main():
     from setproctitle import setproctitle
     setproctitle('ninjecto')
 
+    if argv[1:2] == ['serve']:
+        return serve(argv[2:])
+    if argv[1:2] == ['deps']:
+        return deps(argv[2:])
+    if argv[1:2] == ['compile']:
+        return compile_(argv[2:])
+
     # Parse arguments
+    started = perf_counter()
+
     from .args import InvalidArguments, parse_args
     try:
-        args = parse_args()
+        args = parse_args(argv[1:])
     except InvalidArguments:
         return 1
 
+    if args.connect is not None:
+        return connect(args)
+
+    if args.trace is None:
+        return run(args)
+
+    # Trace the phases of the run, including the arguments parsing
+    from .tracing import start_tracing, stop_tracing
+    start_tracing(origin=started).add('parse_args', started, perf_counter())
+
+    try:
+        return run(args)
+    finally:
+        stop_tracing().save(args.trace)
+
+
+def run(args):
+    """
+    Render the source with the parsed arguments.
+    """
+    with span('import'):
+        from .core import Ninjecto
+        from .local import load_local
+        from .config import load_config
+        from .watch import create_watcher
+        from .values import load_values, load_matrix
+        from .plugins.filters import FiltersLoader
+        from .plugins.namespaces import NamespacesLoader
+
     # Load values
     if args.values_files:
         log.info('Loading values files ...')
-    values = load_values(args.values_files, args.values, args.values_in)
+    with span('load_values'):
+        if args.matrix:
+            matrix = load_matrix(
+                args.matrix, args.values_files, args.values, args.values_in,
+            )
+            values = {}
+        else:
+            values = load_values(
+                args.values_files, args.values, args.values_in,
+            )
 
     # Load config
     if args.configs:
         log.info('Loading configuration files ...')
 
-    config = load_config(args.configs)
+    with span('load_config'):
+        config = load_config(args.configs)
 
     # Load plugins
-    local = load_local(args.source.parent)
-    filters = FiltersLoader().load_functions()
-    namespaces = NamespacesLoader().load_functions()
+    with span('load_local'):
+        local = load_local(args.source.parent)
+    with span('load_filters'):
+        filters = FiltersLoader().load_functions()
+    with span('load_namespaces'):
+        namespaces = NamespacesLoader().load_functions()
 
     # Determine destination
-    if args.output:
+    if args.stdout:
+        destination = None
+        filename = None
+    elif args.output:
         destination = args.destination.parent
         filename = args.destination.name
     elif args.output_in:
@@ -70,23 +241,115 @@ def main():
         raise RuntimeError('Invalid semantics for output')
 
     # Execute engine
-    ninjecto = Ninjecto(
-        config,
-        local,
-        filters,
-        namespaces,
-        args.libraries,
-        values,
-        args.source,
-        destination,
-        filename,
-    )
-    ninjecto.run(
-        dry_run=args.dry_run,
-        override=args.override,
-        levels=args.levels,
+    def create(config, local, values):
+        with span('create'):
+            ninjecto = Ninjecto(
+                config,
+                local,
+                filters,
+                namespaces,
+                args.libraries,
+                values,
+                args.source,
+                destination,
+                filename,
+            )
+            if args.compiled is not None:
+                ninjecto.load_compiled(args.compiled)
+            return ninjecto
+
+    ninjecto = create(config, local, values)
+
+    if args.stdout:
+        ninjecto.dump(stdout)
+        return 0
+
+    options = {
+        'dry_run': args.dry_run,
+        'override': args.override,
+        'levels': args.levels,
+        'jobs': args.jobs,
+        'pipeline': args.pipeline,
+        'incremental': args.incremental or args.watch,
+        'stream': args.stream,
+        'atomic': args.atomic,
+        'durability': args.durability,
+        'compare': args.compare,
+    }
+
+    if args.profile_report is not None:
+        from .profiling import Profiler
+        profiler = Profiler(top=args.profile_top)
+        ninjecto.run(profiler=profiler, **options)
+        profiler.save(args.profile_report)
+        return 0
+
+    if args.matrix:
+        ninjecto.run_matrix(
+            matrix,
+            str(destination),
+            filename,
+            **options,
+        )
+        return 0
+
+    if not args.watch:
+        ninjecto.run(**options)
+        return 0
+
+    # Watch the inputs, rendering again the outputs affected by changes
+    ninjeconf = args.source.parent / 'ninjeconf.py'
+    watchconf = config['ninjecto']['watch']
+    watcher = create_watcher(
+        [
+            args.source,
+            *args.values_files,
+            *args.configs,
+            *args.libraries,
+            ninjeconf,
+        ],
+        ignore=[args.destination],
+        polling=watchconf['polling'],
+        interval=watchconf['interval'],
     )
-    return 0
+
+    def render():
+        try:
+            ninjecto.run(**options)
+        except Exception:
+            log.exception('Rendering failed, waiting for changes ...')
+
+    try:
+        render()
+        log.info('Watching for changes ...')
+
+        while True:
+            changed = watcher.wait(watchconf['debounce'])
+            log.info('{} paths changed, rendering ...'.format(len(changed)))
+
+            try:
+                if changed & {*args.configs, ninjeconf}:
+                    log.info('Reloading configuration ...')
+                    config = load_config(args.configs)
+                    local = load_local(args.source.parent)
+                    values = load_values(args.values_files, args.values, None)
+                    ninjecto = create(config, local, values)
+
+                elif changed & set(args.values_files):
+                    log.info('Reloading values ...')
+                    ninjecto.update_values(load_values(
+                        args.values_files, args.values, None,
+                    ))
+            except Exception:
+                log.exception('Reloading failed, waiting for changes ...')
+                continue
+
+            render()
+
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
 
 
 if __name__ == '__main__':
@@ -19,6 +19,7 @@
 Argument management module.
 """
 
+from glob import glob
 from pathlib import Path
 from collections import OrderedDict
 from argparse import Action, ArgumentParser
@@ -98,18 +99,13 @@ class ExtendAction(Action):
         setattr(namespace, self.dest, items)
 
 
-def validate_args(args):
+def setup_logging(args):
     """
-    Validate that arguments are valid.
+    Setup logging according to the verbosity and color arguments.
 
     :param args: An arguments namespace.
     :type args: :py:class:`argparse.Namespace`
-
-    :return: The validated namespace.
-    :rtype: :py:class:`argparse.Namespace`
     """
-
-    # Setup logging
     level = LEVELS.get(args.verbosity, DEBUG)
 
     if not args.colorize:
@@ -129,61 +125,83 @@ def validate_args(args):
         level=level,
     )
 
-    log.debug('Arguments:\n{}'.format(args))
 
-    # Check output flag semantics
-    # XXX: Maybe use a Default class
-    if args.output and args.output_in:
-        raise InvalidArguments('Either use --output or --output-in')
-    if args.output is None and args.output_in is None:
-        args.output = True
+def validate_matrix(args):
+    """
+    Validate the arguments of a matrix rendering.
 
-    # Check if source exists
-    args.source = Path(args.source)
+    The matrix files and glob patterns are expanded to a sorted list of
+    files, and the destination is checked to be a pattern. Destinations are
+    created when rendering.
 
-    if not args.source.exists():
+    :param args: An arguments namespace.
+    :type args: :py:class:`argparse.Namespace`
+    """
+    if args.stdout or args.watch or args.connect is not None:
         raise InvalidArguments(
-            'No such input file or directory: "{}"'.format(args.source)
+            'A matrix can\'t be rendered to the standard output, '
+            'when watching or with the render daemon'
         )
 
-    args.source = args.source.resolve()
-
-    # Check destination
-    args.destination = Path(args.destination)
+    pattern = str(args.destination)
+    if '{name}' not in pattern and '{index}' not in pattern:
+        raise InvalidArguments(
+            'The destination of a matrix must be a pattern with {name} '
+            'or {index}'
+        )
 
-    if args.destination.exists():
-        if args.output and not args.override:
+    matrix = []
+    for pattern in args.matrix:
+        paths = sorted(glob(pattern, recursive=True))
+        if not paths:
             raise InvalidArguments(
-                'Output file or directory "{}" exists. '
-                'Use --force to force overriding.'.format(
-                    str(args.destination),
-                )
-            )
-        elif args.output_in and not args.destination.is_dir():
-            raise InvalidArguments(
-                'Output must be a directory when using --output-in.'
-            )
-    elif args.output_in:
-        if not args.parents:
-            raise InvalidArguments(
-                'No such output directory "{}" exists. '
-                'Use --parents to create it.'.format(
-                    str(args.destination),
-                )
+                'No such matrix files: {}'.format(pattern)
             )
+        matrix.extend(
+            Path(path).resolve() for path in paths
+            if Path(path).resolve() not in matrix
+        )
+
+    invalid = [path for path in matrix if not path.is_file()]
+    if invalid:
+        raise InvalidArguments(
+            'Invalid matrix files {}'.format(', '.join(map(str, invalid)))
+        )
+
+    args.matrix = matrix
 
-        args.destination.mkdir(parents=True)
 
-    args.destination = args.destination.resolve()
+# Inputs that may be given in the arguments, with how to check each path
+INPUTS = [
+    ('configurations', 'configs', lambda path: path.is_file()),
+    ('libraries', 'libraries', lambda path: path.is_dir()),
+    ('values files', 'values_files', lambda path: path.is_file()),
+]
+
 
-    # Check if files and directories exists
-    for human, argsattr, checker in [
-        ('configurations', 'configs', lambda path: path.is_file()),
-        ('libraries', 'libraries', lambda path: path.is_dir()),
-        ('values files', 'values_files', lambda path: path.is_file()),
-    ]:
-        assert hasattr(args, argsattr)
-        files = getattr(args, argsattr)
+def validate_inputs(args):
+    """
+    Validate that the source and the other inputs given in the arguments
+    exist and have the right type, resolving their paths.
+
+    Inputs the command doesn't take are skipped, see :data:`INPUTS`.
+
+    :param args: An arguments namespace.
+    :type args: :py:class:`argparse.Namespace`
+
+    :raises InvalidArguments: If an input is missing or invalid.
+    """
+    args.source = Path(args.source)
+
+    if not args.source.exists():
+        raise InvalidArguments(
+            'No such input file or directory: "{}"'.format(args.source)
+        )
+
+    args.source = args.source.resolve()
+
+    for human, argsattr, checker in INPUTS:
+        files = getattr(args, argsattr, None)
         if not files:
             continue
 
@@ -227,6 +245,124 @@ def validate_args(args):
 
         setattr(args, argsattr, files)
 
+
+def validate_args(args):
+    """
+    Validate that arguments are valid.
+
+    :param args: An arguments namespace.
+    :type args: :py:class:`argparse.Namespace`
+
+    :return: The validated namespace.
+    :rtype: :py:class:`argparse.Namespace`
+    """
+
+    # Setup logging
+    setup_logging(args)
+    log.debug('Arguments:\n{}'.format(args))
+
+    # Check output flag semantics
+    # XXX: Maybe use a Default class
+    if args.output and args.output_in:
+        raise InvalidArguments('Either use --output or --output-in')
+    if args.output is None and args.output_in is None:
+        args.output = True
+
+    # Check if source, files and directories exist
+    validate_inputs(args)
+
+    # Check destination, the standard output is used for "-"
+    args.stdout = args.destination == '-'
+    args.destination = Path(args.destination)
+
+    if args.matrix:
+        validate_matrix(args)
+    elif args.stdout:
+        if args.output_in or not args.source.is_file():
+            raise InvalidArguments(
+                'Only a file can be rendered to the standard output'
+            )
+    elif args.destination.exists():
+        if args.output and not args.override and not args.incremental \
+                and not args.watch:
+            raise InvalidArguments(
+                'Output file or directory "{}" exists. '
+                'Use --force to force overriding.'.format(
+                    str(args.destination),
+                )
+            )
+        elif args.output_in and not args.destination.is_dir():
+            raise InvalidArguments(
+                'Output must be a directory when using --output-in.'
+            )
+    elif args.output_in:
+        if not args.parents:
+            raise InvalidArguments(
+                'No such output directory "{}" exists. '
+                'Use --parents to create it.'.format(
+                    str(args.destination),
+                )
+            )
+
+        args.destination.mkdir(parents=True)
+
+    if not args.stdout:
+        args.destination = args.destination.resolve()
+
+    # Check watch mode
+    if args.watch and args.values_in:
+        raise InvalidArguments(
+            'Values can\'t be read from the standard input when watching'
+        )
+    if args.watch and args.stdout:
+        raise InvalidArguments(
+            'The standard output can\'t be used when watching'
+        )
+    if args.watch and args.connect:
+        raise InvalidArguments(
+            'The render daemon can\'t be used when watching'
+        )
+
+    # Check compiled templates
+    if args.compiled is not None:
+        if args.connect is not None:
+            raise InvalidArguments(
+                'Compiled templates aren\'t available with the render daemon'
+            )
+        args.compiled = Path(args.compiled)
+        if not args.compiled.is_dir():
+            raise InvalidArguments(
+                'No such compiled templates directory: "{}"'.format(
+                    args.compiled,
+                )
+            )
+        args.compiled = args.compiled.resolve()
+
+    # Check tracing
+    if args.trace is not None:
+        if args.connect is not None:
+            raise InvalidArguments(
+                'Tracing isn\'t available with the render daemon'
+            )
+        args.trace = Path(args.trace).resolve()
+
+    # Check profiling
+    if args.profile_report is not None:
+        if args.stdout or args.connect is not None or args.watch \
+                or args.matrix:
+            raise InvalidArguments(
+                'Profiling isn\'t available when rendering to the standard '
+                'output, with the render daemon, when watching or for a '
+                'matrix'
+            )
+        args.profile_report = Path(args.profile_report).resolve()
+
+    # Check number of jobs
+    if args.jobs is not None and args.jobs < 1:
+        raise InvalidArguments(
+            'Invalid number of jobs {}. Must be 1 or more.'.format(args.jobs)
+        )
+
     # Check values options
     if args.values:
         values = OrderedDict()
@@ -341,6 +477,18 @@ def parse_args(argv=None):
             'Must be a .toml, .yaml or .json'
         ),
     )
+    parser.add_argument(
+        '-m', '--matrix',
+        action='append',
+        default=[],
+        metavar='VALUES_FILE',
+        help=(
+            'Render the source once per values file, or glob of values '
+            'files, merged over the other values. DST is then a pattern '
+            'where {name} is replaced by the name of the values file, '
+            'without suffix, and {index} by its position'
+        ),
+    )
     parser.add_argument(
         '-s', '--values-in',
         choices=['toml', 'yaml', 'json'],
@@ -358,6 +506,25 @@ def parse_args(argv=None):
         default=False,
         help='Override existing files',
     )
+    parser.add_argument(
+        '-n', '--incremental',
+        action='store_true',
+        default=False,
+        help=(
+            'Only render the files whose inputs changed since the previous '
+            'run, as recorded in a manifest in the destination directory'
+        ),
+    )
+    parser.add_argument(
+        '-w', '--watch',
+        action='store_true',
+        default=False,
+        help=(
+            'Watch the source, values files, configuration files, libraries '
+            'and ninjeconf.py, rendering again the outputs affected by '
+            'changes. Implies --incremental'
+        ),
+    )
     parser.add_argument(
         '-r', '--levels',
         type=int,
@@ -365,6 +532,115 @@ def parse_args(argv=None):
         help='Limit recursion for directories to this number of levels',
     )
 
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help=(
+            'Number of files to render in parallel. '
+            'Defaults to the number of CPUs available'
+        ),
+    )
+
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        default=None,
+        help=(
+            'Write the outputs while they are rendered, instead of rendering '
+            'them whole first'
+        ),
+    )
+
+    parser.add_argument(
+        '--atomic',
+        action='store_true',
+        default=None,
+        help=(
+            'Write outputs to temporary files and rename them into place, '
+            'so an interrupted run never leaves partial files'
+        ),
+    )
+
+    parser.add_argument(
+        '--durability',
+        choices=['none', 'per-file', 'per-directory', 'end-of-run'],
+        default=None,
+        help=(
+            'How to flush outputs to the storage device. '
+            'Any mode but none implies --atomic'
+        ),
+    )
+
+    parser.add_argument(
+        '--compare',
+        action='store_true',
+        default=None,
+        help=(
+            'Leave untouched the outputs whose content and permissions '
+            'did not change'
+        ),
+    )
+
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        default=None,
+        help=(
+            'Read and write files in background threads while rendering, '
+            'with a single job'
+        ),
+    )
+
+    parser.add_argument(
+        '--compiled',
+        default=None,
+        metavar='COMPILED',
+        help=(
+            'Render from the templates precompiled in this directory by '
+            '"ninjecto compile"'
+        ),
+    )
+
+    parser.add_argument(
+        '--profile-report',
+        default=None,
+        metavar='REPORT',
+        help=(
+            'Write a JSON report of the time spent on each path, and log '
+            'the slowest ones'
+        ),
+    )
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=10,
+        metavar='N',
+        help='Number of slowest paths to log when profiling',
+    )
+
+    parser.add_argument(
+        '--trace',
+        default=None,
+        metavar='TRACE',
+        help=(
+            'Write a trace of the phases of the run and of the render of '
+            'each file, in the Chrome trace event format'
+        ),
+    )
+
+    parser.add_argument(
+        '--connect',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='SOCKET',
+        help=(
+            'Send the render to a daemon started with "ninjecto serve", '
+            'listening on the given socket or the default one'
+        ),
+    )
+
     parser.add_argument(
         '-o', '--output',
         action='store_true',
@@ -392,7 +668,10 @@ def parse_args(argv=None):
     parser.add_argument(
         'destination',
         metavar='DST',
-        help='File or directory to write to',
+        help=(
+            'File or directory to write to, '
+            'or - to write to the standard output'
+        ),
     )
 
     # Parse and validate arguments
@@ -407,6 +686,244 @@ def parse_args(argv=None):
     return args
 
 
+def parse_serve_args(argv=None):
+    """
+    Argument parsing routine of the ``serve`` command.
+
+    :param argv: A list of argument strings.
+    :type argv: list
+
+    :return: A parsed and verified arguments namespace.
+    :rtype: :py:class:`argparse.Namespace`
+    """
+
+    parser = ArgumentParser(
+        prog='ninjecto serve',
+        description=(
+            'Ninjecto - Render daemon'
+        )
+    )
+
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count',
+        dest='verbosity',
+        default=0,
+        help='Increase verbosity level',
+    )
+    parser.add_argument(
+        '--no-color',
+        action='store_false',
+        dest='colorize',
+        help='Do not colorize the log output'
+    )
+    parser.add_argument(
+        '-c', '--config',
+        action='append',
+        dest='configs',
+        default=[],
+        help=(
+            'Configuration files used for the renders that don\'t set any'
+        ),
+    )
+    parser.add_argument(
+        '--socket',
+        default=None,
+        help='Path to the socket to listen on',
+    )
+    parser.add_argument(
+        '--max-instances',
+        type=int,
+        default=32,
+        help=(
+            'Maximum number of sources, with their compiled templates, '
+            'to keep loaded'
+        ),
+    )
+
+    args = parser.parse_args(argv)
+    setup_logging(args)
+
+    try:
+        args.configs = [
+            Path(config).resolve(strict=True)
+            for config in args.configs
+        ]
+    except FileNotFoundError as e:
+        log.critical('No such configuration: {}'.format(e.filename))
+        raise InvalidArguments(str(e))
+
+    if args.max_instances < 1:
+        log.critical('Invalid maximum number of instances')
+        raise InvalidArguments(
+            'Invalid maximum number of instances {}'.format(
+                args.max_instances,
+            )
+        )
+
+    return args
+
+
+def parse_deps_args(argv=None):
+    """
+    Argument parsing routine of the ``deps`` command.
+
+    :param argv: A list of argument strings.
+    :type argv: list
+
+    :return: A parsed and verified arguments namespace.
+    :rtype: :py:class:`argparse.Namespace`
+    """
+
+    parser = ArgumentParser(
+        prog='ninjecto deps',
+        description=(
+            'Ninjecto - Templates dependency graph'
+        )
+    )
+
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count',
+        dest='verbosity',
+        default=0,
+        help='Increase verbosity level',
+    )
+    parser.add_argument(
+        '--no-color',
+        action='store_false',
+        dest='colorize',
+        help='Do not colorize the log output'
+    )
+    parser.add_argument(
+        '-c', '--config',
+        action='append',
+        dest='configs',
+        default=[],
+        help='Ninjecto and plugins configuration files',
+    )
+    parser.add_argument(
+        '-l', '--library',
+        action='append',
+        dest='libraries',
+        default=[],
+        help='One or more paths to directories with a templates library',
+    )
+    parser.add_argument(
+        '-f', '--format',
+        choices=['json', 'dot'],
+        default='json',
+        help='Format of the graph',
+    )
+    parser.add_argument(
+        '-d', '--dependents',
+        action='append',
+        default=[],
+        metavar='TEMPLATE',
+        help=(
+            'Instead of the graph, list the source templates depending on '
+            'the given template, for example library/macros.j2'
+        ),
+    )
+    parser.add_argument(
+        'source',
+        metavar='SRC',
+        help='File or directory to analyze',
+    )
+
+    args = parser.parse_args(argv)
+    setup_logging(args)
+
+    try:
+        validate_inputs(args)
+    except InvalidArguments as e:
+        log.critical(e)
+        raise e
+
+    return args
+
+
+def parse_compile_args(argv=None):
+    """
+    Argument parsing routine of the ``compile`` command.
+
+    :param argv: A list of argument strings.
+    :type argv: list
+
+    :return: A parsed and verified arguments namespace.
+    :rtype: :py:class:`argparse.Namespace`
+    """
+
+    parser = ArgumentParser(
+        prog='ninjecto compile',
+        description=(
+            'Ninjecto - Templates precompilation'
+        )
+    )
+
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count',
+        dest='verbosity',
+        default=0,
+        help='Increase verbosity level',
+    )
+    parser.add_argument(
+        '--no-color',
+        action='store_false',
+        dest='colorize',
+        help='Do not colorize the log output'
+    )
+    parser.add_argument(
+        '-c', '--config',
+        action='append',
+        dest='configs',
+        default=[],
+        help='Ninjecto and plugins configuration files',
+    )
+    parser.add_argument(
+        '-l', '--library',
+        action='append',
+        dest='libraries',
+        default=[],
+        help='One or more paths to directories with a templates library',
+    )
+    parser.add_argument(
+        'source',
+        metavar='SRC',
+        help='File or directory to compile',
+    )
+    parser.add_argument(
+        'target',
+        metavar='COMPILED',
+        help='Directory to write the compiled templates to',
+    )
+
+    args = parser.parse_args(argv)
+    setup_logging(args)
+
+    try:
+        validate_inputs(args)
+    except InvalidArguments as e:
+        log.critical(e)
+        raise e
+
+    args.target = Path(args.target)
+    if args.target.exists() and not args.target.is_dir():
+        log.critical(
+            'Compiled templates must go to a directory: "{}"'.format(
+                args.target,
+            )
+        )
+        raise InvalidArguments(str(args.target))
+    args.target = args.target.resolve()
+
+    return args
+
+
 __all__ = [
     'parse_args',
+    'parse_serve_args',
+    'parse_deps_args',
+    'parse_compile_args',
 ]
@@ -0,0 +1,226 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Persistent caches module.
+"""
+
+from os import environ, getpid, replace, scandir, unlink
+from fnmatch import fnmatch
+from pathlib import Path
+from json import loads, dumps
+from logging import getLogger
+from threading import get_ident
+
+from jinja2 import __version__ as jinja_version
+from jinja2.bccache import Bucket, FileSystemBytecodeCache
+
+from .utils.hashing import fingerprint
+
+
+log = getLogger(__name__)
+
+
+def cache_directory(config):
+    """
+    Determine the directory where Ninjecto stores its caches.
+
+    If ``ninjecto.cache.directory`` is unset, the cache is stored in
+    ``$XDG_CACHE_HOME/ninjecto`` or ``$HOME/.cache/ninjecto`` if
+    ``$XDG_CACHE_HOME`` is unavailable.
+
+    :param Namespace config: The ``ninjecto.cache`` configuration.
+
+    :return: Path to the cache directory.
+    :rtype: Path
+    """
+    if config.directory:
+        return Path(config.directory).expanduser()
+
+    return Path(environ.get(
+        'XDG_CACHE_HOME',
+        Path.home() / '.cache',
+    )) / 'ninjecto'
+
+
+class ContentBytecodeCache(FileSystemBytecodeCache):
+    """
+    Bytecode cache keyed by the content of the templates.
+
+    Jinja's default bytecode caches are keyed by the name of the template
+    and only invalidated by the Python version. Ninjecto templates are
+    identified by their paths, which are the same across unrelated projects,
+    so the key of a bucket is computed from the name, the source of the
+    template, the Jinja version and the options of the environment.
+
+    As every change to a template adds an entry, the cache is pruned on the
+    first write of each instance, and after every ``max_entries`` writes,
+    see :meth:`prune`.
+
+    :param Path directory: Directory to store the compiled templates in.
+     It is created if it doesn't exist.
+    :param options: Any serializable object describing the options of the
+     environment that affect the compilation of the templates.
+    :param int max_entries: Maximum number of compiled templates to keep.
+    """
+
+    def __init__(self, directory, options, max_entries=4096):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        super().__init__(str(directory), pattern='%s.cache')
+        self._options = fingerprint(jinja_version, options)
+        self._max_entries = max_entries
+        self._writes = 0
+
+    def get_bucket(self, environment, name, filename, source):
+        key = fingerprint(self._options, name, filename, source)
+        checksum = self.get_source_checksum(source)
+
+        bucket = Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def dump_bytecode(self, bucket):
+        super().dump_bytecode(bucket)
+
+        if not self._writes:
+            self.prune()
+        self._writes = (self._writes + 1) % self._max_entries
+
+    def prune(self):
+        """
+        Remove the least recently written compiled templates beyond the
+        maximum number of entries.
+        """
+        entries = []
+        with scandir(self.directory) as iterator:
+            for entry in iterator:
+                if not fnmatch(entry.name, self.pattern % '*'):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except FileNotFoundError:
+                    continue
+
+        excess = len(entries) - self._max_entries
+        if excess <= 0:
+            return
+
+        log.debug('Removing {} compiled templates from {} ...'.format(
+            excess, self.directory,
+        ))
+        entries.sort()
+        for _, path in entries[:excess]:
+            try:
+                unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class RenderCache:
+    """
+    Persistent cache of rendered outputs.
+
+    Outputs are stored under the key of their template, see :meth:`key`,
+    along with the inputs they depend on, so several outputs of the same
+    template rendered with different inputs can be cached. Which inputs are
+    still current is decided by the caller when looking up an output.
+
+    :param Path directory: Directory to store the outputs in.
+     It is created if it doesn't exist.
+    :param int max_entries: Maximum number of outputs to keep per template.
+     The least recently stored ones are discarded.
+    """
+
+    def __init__(self, directory, max_entries):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max_entries
+
+    def key(self, *objects):
+        """
+        Compute the key of a template.
+
+        :param objects: Objects identifying the template, like its name, its
+         source and the configuration.
+
+        :return: The key of the template.
+        :rtype: str
+        """
+        return fingerprint(*objects)
+
+    def _path(self, key):
+        return self._directory / '{}.json'.format(key)
+
+    def _load(self, key):
+        try:
+            return loads(self._path(key).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            log.warning('Ignoring invalid render cache {}: {}'.format(
+                self._path(key), e,
+            ))
+            return []
+
+    def lookup(self, key, current):
+        """
+        Find a cached output of a template whose inputs are still current.
+
+        :param str key: Key of the template.
+        :param function current: Function that receives an entry and returns
+         True if the inputs the entry depends on are still current.
+
+        :return: The entry found, a dictionary with the ``output`` and the
+         inputs it depends on, or None.
+        :rtype: dict
+        """
+        for entry in self._load(key):
+            if current(entry):
+                return entry
+        return None
+
+    def store(self, key, entry):
+        """
+        Store an output of a template.
+
+        :param str key: Key of the template.
+        :param dict entry: Dictionary with the ``output`` and the inputs it
+         depends on.
+        """
+        entries = [entry] + self._load(key)
+        path = self._path(key)
+        temporary = path.with_name('{}.{}.{}.tmp'.format(
+            path.name, getpid(), get_ident(),
+        ))
+
+        try:
+            temporary.write_text(
+                dumps(entries[:self._max_entries], ensure_ascii=False),
+                encoding='utf-8',
+            )
+            replace(temporary, path)
+        except OSError as e:
+            log.warning('Unable to store render cache {}: {}'.format(
+                path, e,
+            ))
+
+
+__all__ = [
+    'cache_directory',
+    'ContentBytecodeCache',
+    'RenderCache',
+]
@@ -0,0 +1,202 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Client of the render daemon, see :mod:`ninjecto.server`.
+
+This module is imported by the command line client, so it must only import
+lightweight modules.
+"""
+
+from os import environ, getcwd, getuid, stat
+from sys import stdin
+from json import dumps, loads
+from struct import calcsize, unpack
+from pathlib import Path
+from datetime import datetime
+from logging import getLogger
+from socket import socket, AF_UNIX, SOCK_STREAM, SOL_SOCKET
+
+from .utils.iso8601 import datetime_to_iso8601
+
+
+log = getLogger(__name__)
+
+
+def default_socket():
+    """
+    Default path to the socket of the render daemon.
+
+    :return: ``$XDG_RUNTIME_DIR/ninjecto.sock``, or
+     ``/tmp/ninjecto-<uid>.sock`` if ``$XDG_RUNTIME_DIR`` is unset.
+    :rtype: Path
+    """
+    runtime = environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return Path(runtime) / 'ninjecto.sock'
+    return Path('/tmp') / 'ninjecto-{}.sock'.format(getuid())
+
+
+def check_owner(connection, path):
+    """
+    Check that the daemon listening on a socket runs as the current user.
+
+    Jobs carry values and environment variables, so they must never be sent
+    to a socket created by another user, for example in ``/tmp``. The owner
+    is the user of the process at the other end of the connection where
+    supported, or the owner of the socket file otherwise.
+
+    :param connection: Socket connected to the daemon.
+    :param Path path: Path to the socket of the daemon.
+
+    :raises PermissionError: If the daemon is owned by another user.
+    """
+    try:
+        from socket import SO_PEERCRED
+        _, uid, _ = unpack('3i', connection.getsockopt(
+            SOL_SOCKET, SO_PEERCRED, calcsize('3i'),
+        ))
+    except ImportError:
+        uid = stat(path).st_uid
+
+    if uid != getuid():
+        raise PermissionError(
+            'The daemon at {} belongs to another user (uid {})'.format(
+                path, uid,
+            )
+        )
+
+
+def _serializable(value):
+    if isinstance(value, datetime):
+        return datetime_to_iso8601(value)
+    raise TypeError('Unable to serialize {!r}'.format(value))
+
+
+def send_message(connection, message):
+    """
+    Send a message, a JSON document in a single line.
+
+    :param connection: Connected socket.
+    :param dict message: The message.
+    """
+    connection.sendall(
+        dumps(message, default=_serializable).encode('utf-8') + b'\n'
+    )
+
+
+def receive_message(reader):
+    """
+    Receive a message sent with :func:`send_message`.
+
+    :param reader: Binary file object reading from the socket.
+
+    :return: The message, or None if the connection was closed.
+    :rtype: dict
+    """
+    line = reader.readline()
+    if not line:
+        return None
+    return loads(line)
+
+
+def job_from_args(args):
+    """
+    Create a render job from the parsed command line arguments.
+
+    Paths are already resolved, and the working directory and environment of
+    the client are sent along, so the daemon finds the same configuration
+    files and namespaces get the same environment as in the command line.
+    Values from the standard input are read here.
+
+    :param args: Parsed and validated arguments, see
+     :func:`ninjecto.args.parse_args`.
+    :type args: :py:class:`argparse.Namespace`
+
+    :return: The job.
+    :rtype: dict
+    """
+    job = {
+        'source': str(args.source),
+        'destination': None if args.stdout else str(args.destination),
+        'output_in': bool(args.output_in),
+        'stdout': args.stdout,
+        'configs': [str(path) for path in args.configs],
+        'libraries': [str(path) for path in args.libraries],
+        'values_files': [str(path) for path in args.values_files],
+        'values': dict(args.values or {}),
+        'values_in': None,
+        'cwd': getcwd(),
+        'environ': dict(environ),
+        'options': {
+            'dry_run': args.dry_run,
+            'override': args.override,
+            'levels': args.levels,
+            'jobs': args.jobs,
+            'pipeline': args.pipeline,
+            'incremental': args.incremental,
+            'stream': args.stream,
+            'atomic': args.atomic,
+            'durability': args.durability,
+            'compare': args.compare,
+        },
+    }
+
+    if args.values_in:
+        job['values_in'] = {
+            'format': args.values_in,
+            'content': stdin.read(),
+        }
+
+    return job
+
+
+def request(path, job):
+    """
+    Send a render job to the daemon and wait for its result.
+
+    :param Path path: Path to the socket of the daemon.
+    :param dict job: The job, see :func:`job_from_args`.
+
+    :return: The result of the job. Either a ``result`` key with the number
+     of files ``processed``, the ``summary`` of the outputs and the
+     ``output`` rendered to the standard output, if requested, or an
+     ``error`` key with the error message.
+    :rtype: dict
+
+    :raises PermissionError: If the daemon belongs to another user, see
+     :func:`check_owner`.
+    """
+    with socket(AF_UNIX, SOCK_STREAM) as connection:
+        connection.connect(str(path))
+        check_owner(connection, path)
+        send_message(connection, job)
+
+        with connection.makefile('rb') as reader:
+            response = receive_message(reader)
+
+    if response is None:
+        return {'error': 'The daemon closed the connection'}
+    return response
+
+
+__all__ = [
+    'default_socket',
+    'check_owner',
+    'send_message',
+    'receive_message',
+    'job_from_args',
+    'request',
+]
@@ -24,12 +24,75 @@ from logging import getLogger
 import packagedata as pkgdata
 
 from .utils.git import find_root, GitError
-from .inputs import SUPPORTED_FORMATS, load_files
+from .inputs import SUPPORTED_FORMATS, load_file, load_files
 
 
 log = getLogger(__name__)
 
 
+def load_defaults():
+    """
+    Load Ninjecto's default configuration.
+
+    :return: The package's default configuration.
+    :rtype: dict
+    """
+    with pkgdata.as_path(__package__, 'data/config.yaml') as pkgconfig:
+        return load_file(pkgconfig)
+
+
+def find_configs(configs):
+    """
+    Find the configuration files to load after the package's default
+    configuration, in order.
+
+    See :func:`load_config` for the order. Files are included whether they
+    exist or not.
+
+    :param list configs: List of paths to configurations files to load.
+
+    :return: List of paths to the configuration files.
+    :rtype: list
+    """
+    try:
+        gitroot = Path(find_root())
+    except GitError:
+        gitroot = None
+
+    return [
+        *(
+            Path('/etc/ninjecto/config.{}'.format(frmt))
+            for frmt in SUPPORTED_FORMATS
+        ),
+        *(
+            Path(environ.get(
+                'XDG_CONFIG_HOME',
+                Path.home() / '.config',
+            )) / 'ninjecto' / 'config.{}'.format(frmt)
+            for frmt in SUPPORTED_FORMATS
+        ),
+        *(
+            Path.home() / '.ninjerc.{}'.format(frmt)
+            for frmt in SUPPORTED_FORMATS
+        ),
+        *(
+            tuple() if gitroot is None
+            else (
+                gitroot / '.ninjerc.{}'.format(frmt)
+                for frmt in SUPPORTED_FORMATS
+            )
+        ),
+        *(
+            tuple() if gitroot is not None and gitroot == Path.cwd()
+            else (
+                Path.cwd() / '.ninjerc.{}'.format(frmt)
+                for frmt in SUPPORTED_FORMATS
+            )
+        ),
+        *configs,
+    ]
+
+
 def load_config(configs):
     """
     Load Ninjecto's default, system's, user's, project's and given
@@ -58,46 +121,9 @@ def load_config(configs):
     :rtype: dict
     """
 
-    try:
-        gitroot = Path(find_root())
-    except GitError:
-        gitroot = None
-
     with pkgdata.as_path(__package__, 'data/config.yaml') as pkgconfig:
 
-        files = [
-            pkgconfig,
-            *(
-                Path('/etc/ninjecto/config.{}'.format(frmt))
-                for frmt in SUPPORTED_FORMATS
-            ),
-            *(
-                Path(environ.get(
-                    'XDG_CONFIG_HOME',
-                    Path.home() / '.config',
-                )) / 'ninjecto' / 'config.{}'.format(frmt)
-                for frmt in SUPPORTED_FORMATS
-            ),
-            *(
-                Path.home() / '.ninjerc.{}'.format(frmt)
-                for frmt in SUPPORTED_FORMATS
-            ),
-            *(
-                tuple() if gitroot is None
-                else (
-                    gitroot / '.ninjerc.{}'.format(frmt)
-                    for frmt in SUPPORTED_FORMATS
-                )
-            ),
-            *(
-                tuple() if gitroot is not None and gitroot == Path.cwd()
-                else (
-                    Path.cwd() / '.ninjerc.{}'.format(frmt)
-                    for frmt in SUPPORTED_FORMATS
-                )
-            ),
-            *configs,
-        ]
+        files = [pkgconfig, *find_configs(configs)]
 
         log.debug('Configuration files:')
         valid = []
@@ -128,5 +154,7 @@ def load_config(configs):
 
 
 __all__ = [
+    'load_defaults',
+    'find_configs',
     'load_config',
 ]
@@ -19,30 +19,81 @@
 Core module.
 """
 
+import os
+import asyncio
+from copy import copy
+from stat import S_ISREG, S_ISDIR, S_IMODE
+from json import dumps, loads
+from codecs import lookup
+from collections import Counter
+from collections.abc import Mapping
+from fnmatch import fnmatch
+from inspect import isawaitable
+from pathlib import Path
 from logging import getLogger
 from collections import OrderedDict
+from threading import Lock
+from contextlib import contextmanager
+from multiprocessing import get_context, get_all_start_methods
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from jinja2 import (
     select_autoescape,
-    Environment,
     ChoiceLoader,
     DictLoader,
+    ModuleLoader,
     PrefixLoader,
-    FileSystemLoader,
 )
+from jinja2 import __version__ as jinja_version
 from jinja2 import (
+    TemplateNotFound,
     Undefined,
     ChainableUndefined,
     DebugUndefined,
     StrictUndefined,
 )
 
+from .config import load_defaults
+from .deps import DependencyGraph
+from .loaders import (
+    SourceLoader, LibraryLoader, CompiledLoader, compiled_key,
+)
+from .pipeline import pipeline
+from .tracing import span, tracer
+from .outputs import DURABILITY_MODES, Transaction, temporary_path
+from .manifest import Manifest, Snapshot
+from .environment import NinjectoEnvironment
+from .tracking import Recorder, digest, resolve, unwrap, MISSING
+from .cache import cache_directory, ContentBytecodeCache, RenderCache
+from .utils.cpus import available_cpus, gil_enabled
+from .utils.fs import (
+    contains_any, is_binary, copy_file, reflink_file, link_file,
+    equal_bytes, equal_files,
+)
+from .utils.hashing import fingerprint
 from .utils.dictionary import Namespace
 
 
 log = getLogger(__name__)
 
 
+# Marker of the content of a file without template markers, copied as is
+LITERAL = object()
+
+# Marker of the content of a binary or asset file, copied byte-for-byte
+PASSTHROUGH = object()
+
+# Functions to materialize passthrough files, by mode
+PASSTHROUGH_MODES = {
+    'copy': copy_file,
+    'reflink': reflink_file,
+    'hardlink': link_file,
+}
+
+# Name of the index of the compiled templates, see Ninjecto.compile
+COMPILED_INDEX = 'index.json'
+
+
 class Ninjecto:
     """
     Ninjecto Core Class.
@@ -52,6 +103,7 @@ class Ninjecto:
 
     :param dict config: Configuration tree.
      Use ``ninjecto.config.load_config`` to get a normalized data structure.
+     Missing options are taken from the package's default configuration.
     :param module local: Loaded ninjeconf.py Python module. Currently unused.
     :param OrderedDict filters: Dictionary mapping the name of the filter and
      the function implementing it.
@@ -78,19 +130,15 @@ class Ninjecto:
         destination,
         filename,
     ):
-        self._config = Namespace(config)
+        # Any option missing from the given configuration uses its default
+        self._config = Namespace(load_defaults(), config)
 
         self._local = local
         self._filters = filters
 
         # Instance namespaces
-        self._namespaces = OrderedDict()
-        for nskey, ns in namespaces.items():
-            nsconf = getattr(
-                self._config.ninjecto.namespace, nskey, Namespace()
-            )
-            self._namespaces[nskey] = ns(nsconf)
-
+        self._namespace_plugins = namespaces
+        self._namespaces = self._load_namespaces()
         self._libraries = libraries
 
         self._values = values
@@ -101,6 +149,23 @@ class Ninjecto:
         self._dry_run = False
         self._override = False
         self._levels = None
+        self._jobs = 1
+        self._pipeline = False
+        self._stream = False
+        self._atomic = False
+        self._durability = 'none'
+        self._transaction = None
+        self._compare = False
+        self._manifest = None
+        self._snapshot = None
+        self._records = {}
+        self._walked = {}
+        self._bindings = {}
+        self._profiler = None
+        self._embedded = False
+
+        # Outputs written, unchanged and skipped by the last run
+        self.summary = Counter()
 
         self.undefmap = {
             'Undefined': Undefined,
@@ -109,7 +174,309 @@ class Ninjecto:
             'StrictUndefined': StrictUndefined,
         }
 
-    def run(self, dry_run=False, override=False, levels=None):
+        self._sources = SourceLoader()
+        self._library = LibraryLoader(
+            self._libraries,
+            encoding=self._config.ninjecto.filesystemloader.encoding,
+            followlinks=self._config.ninjecto.filesystemloader.followlinks,
+            revalidate=self._config.ninjecto.filesystemloader.revalidate,
+        )
+        with span('create_environment'):
+            self._environment = self._create_environment()
+
+        # Namespace plugins may be coroutine functions, awaited on first use,
+        # by the async API in the event loop of the caller
+        self._pending = {
+            nskey: ns
+            for nskey, ns in self._namespaces.items()
+            if isawaitable(ns)
+        }
+        self._resolving = None
+        self._resolving_lock = Lock()
+        self._render_cache = self._create_render_cache()
+        self._libraries_digests = {}
+        self._markers, self._literal_markers = self._find_markers()
+
+        mode = self._config.ninjecto.passthrough.mode
+        if mode not in PASSTHROUGH_MODES:
+            raise ValueError(
+                'Unknown passthrough mode {}, expected one of: {}'.format(
+                    mode, ', '.join(PASSTHROUGH_MODES),
+                )
+            )
+        self._passthrough_file = PASSTHROUGH_MODES[mode]
+
+    def _load_namespaces(self):
+        """
+        Call the namespace plugins with their configuration.
+
+        :return: The namespaces, by name.
+        :rtype: OrderedDict
+        """
+        namespaces = OrderedDict()
+        for nskey, ns in self._namespace_plugins.items():
+            nsconf = getattr(
+                self._config.ninjecto.namespace, nskey, Namespace()
+            )
+            with span('namespace', namespace=nskey):
+                namespaces[nskey] = ns(nsconf)
+        return namespaces
+
+    def _create_environment(self):
+        """
+        Create the Jinja environment used to render all templates.
+
+        The environment is created once per instance so the templates cache
+        (both the library templates and the rendered ones) is shared by all
+        the files of a run. The templates being rendered are provided to it by
+        the :class:`ninjecto.loaders.SourceLoader`.
+
+        :return: A new environment with the filters, namespaces and values
+         of this context.
+        :rtype: :class:`ninjecto.environment.NinjectoEnvironment`
+        """
+        config = self._config.ninjecto
+
+        envconf = dict(config.environment)
+        envconf.update({
+            'undefined': self.undefmap[config.undefined.clss],
+            'autoescape': select_autoescape(
+                **dict(config.autoescape),
+            ),
+            'bytecode_cache': self._create_bytecode_cache(),
+            'loader': ChoiceLoader([
+                self._sources,
+                PrefixLoader({
+                    'library': self._library,
+                }, delimiter=config.prefixloader.delimiter),
+            ]),
+        })
+        environment = NinjectoEnvironment(**envconf)
+
+        # Allow to serialize the recording proxies of the render cache
+        environment.policies['json.dumps_kwargs'] = {
+            'sort_keys': True,
+            'default': unwrap,
+        }
+
+        # Make filters available
+        for key, fltr in self._filters.items():
+            environment.filters[key] = fltr
+
+        # Make static namespaces and values available. Dynamic namespaces
+        # depend on the file being rendered and are set on each render
+        for nskey, ns in self._namespaces.items():
+            environment.globals[nskey] = ns
+
+        environment.globals['values'] = self._values
+
+        return environment
+
+    def _create_bytecode_cache(self):
+        """
+        Create the persistent bytecode cache for the compiled templates.
+
+        :return: The bytecode cache, or None if the cache is disabled or its
+         directory can't be created.
+        :rtype: :class:`ninjecto.cache.ContentBytecodeCache`
+        """
+        cacheconf = self._config.ninjecto.cache
+
+        if not cacheconf.enabled:
+            return None
+
+        directory = cache_directory(cacheconf) / 'bytecode'
+
+        try:
+            return ContentBytecodeCache(
+                directory, self._compile_options(), cacheconf.max_entries,
+            )
+        except OSError as e:
+            log.warning(
+                'Unable to use bytecode cache directory {}: {}'.format(
+                    directory, e,
+                )
+            )
+
+        return None
+
+    def _compile_options(self):
+        """
+        Options of the environment that affect the compilation of the
+        templates.
+
+        :rtype: dict
+        """
+        config = self._config.ninjecto
+        return {
+            'environment': dict(config.environment),
+            'autoescape': dict(config.autoescape),
+            'undefined': config.undefined.clss,
+        }
+
+    def _create_render_cache(self):
+        """
+        Create the persistent cache of rendered outputs.
+
+        :return: The render cache, or None if the cache is disabled or its
+         directory can't be created.
+        :rtype: :class:`ninjecto.cache.RenderCache`
+        """
+        config = self._config.ninjecto
+
+        if not config.cache.enabled or not config.rendercache.enabled:
+            return None
+
+        directory = cache_directory(config.cache) / 'render'
+
+        try:
+            cache = RenderCache(directory, config.rendercache.max_entries)
+        except OSError as e:
+            log.warning(
+                'Unable to use render cache directory {}: {}'.format(
+                    directory, e,
+                )
+            )
+            return None
+
+        self._config_digest = fingerprint(self._config)
+        return cache
+
+    def _find_markers(self):
+        """
+        Determine the strings that start a template construct.
+
+        Names and contents without any of these strings render to themselves
+        and don't need to go through the environment.
+
+        :return: A tuple with the list of markers, and the list of markers
+         encoded in the input encoding. The encoded markers are None if files
+         without markers can't be copied as is, for example if the input and
+         output encodings differ or if the environment would change their
+         newlines.
+        :rtype: tuple
+        """
+        config = self._config.ninjecto
+        envconf = config.environment
+
+        markers = [
+            marker for marker in (
+                envconf.block_start_string,
+                envconf.variable_start_string,
+                envconf.comment_start_string,
+                getattr(envconf, 'line_statement_prefix', None),
+                getattr(envconf, 'line_comment_prefix', None),
+            ) if marker
+        ]
+
+        encoding = lookup(config.input.encoding).name
+        if (
+            encoding != lookup(config.output.encoding).name or
+            '{\n'.encode(encoding) != b'{\n' or
+            not getattr(envconf, 'keep_trailing_newline', False) or
+            getattr(envconf, 'newline_sequence', '\n') != '\n'
+        ):
+            return markers, None
+
+        # Carriage returns are normalized by the environment
+        return markers, [
+            marker.encode(encoding) for marker in markers
+        ] + [b'\r']
+
+    def derive(self, values=None, source=None, destination=None,
+               filename=None):
+        """
+        Create a context rendering other values, source or destination.
+
+        The new context shares everything else with this one, like the
+        environment, with its compiled templates, the plugins, the libraries
+        and the caches, so it is cheap to create. Values are set for each
+        render instead of in the globals of the environment, and the state
+        of the runs belongs to each context, so contexts derived from the same
+        one can render concurrently from different threads, see
+        :class:`ninjecto.engine.Engine`.
+
+        :param dict values: Arbitrary tree of values to pass to the
+         templates. Pass None to keep the values of this context.
+        :param Path source: Path to the source file or directory.
+        :param Path destination: Path to the destination directory.
+        :param str filename: Override the destination filename.
+
+        :return: The new context.
+        :rtype: :class:`Ninjecto`
+        """
+        ninjecto = copy(self)
+        if values is not None:
+            ninjecto._values = values
+        ninjecto._source = source
+        ninjecto._destination = destination
+        ninjecto._filename = filename
+
+        ninjecto._records = {}
+        ninjecto._walked = {}
+        ninjecto._bindings = {}
+        ninjecto._libraries_digests = {}
+        ninjecto.summary = Counter()
+        return ninjecto
+
+    def embed(self):
+        """
+        Prepare this context to be shared by the renders of a service, see
+        :class:`ninjecto.engine.Engine`.
+
+        The libraries are scanned now, once, instead of at the start of each
+        run, so concurrent runs don't scan them again, and runs don't log
+        their values, as they may hold secrets. Derived contexts are
+        embedded too.
+        """
+        self._library.scan()
+        self._embedded = True
+
+    def update_values(self, values):
+        """
+        Replace the values to render the templates with.
+
+        Everything else is kept, like the compiled templates, so subsequent
+        runs don't pay for them again.
+
+        :param dict values: Arbitrary tree of values to pass to the templates.
+        """
+        self._values = values
+        self._environment.globals['values'] = values
+
+    def reload_namespaces(self):
+        """
+        Call the namespace plugins again, replacing the namespaces.
+
+        Namespaces capture the state of the process when created, like its
+        environment variables. Everything else is kept, like the compiled
+        templates.
+        """
+        namespaces = self._load_namespaces()
+        with self._resolving_lock:
+            self._namespaces = namespaces
+            self._environment.globals.update(namespaces)
+            self._pending = {
+                nskey: ns
+                for nskey, ns in namespaces.items()
+                if isawaitable(ns)
+            }
+            self._resolving = None
+
+    def run(
+        self,
+        dry_run=False,
+        override=False,
+        levels=None,
+        jobs=None,
+        pipeline=None,
+        incremental=False,
+        stream=None,
+        atomic=None,
+        durability=None,
+        compare=None,
+        profiler=None,
+    ):
         """
         Execute the rendering of this Ninjecto context.
 
@@ -117,13 +484,153 @@ class Ninjecto:
         :param bool override: Override files if exit.
         :param int levels: Maximum numbers of directories levels to recurse
          into.
+        :param int jobs: Number of files to render in parallel.
+         Pass None to use all the CPUs available to the process.
+        :param bool pipeline: Read and write files in background threads
+         while rendering, with a single job. Pass None to use the
+         ``ninjecto.pipeline.enabled`` configuration.
+        :param bool incremental: Skip the outputs whose inputs didn't change
+         since the previous run, and write a manifest of the outputs in the
+         destination directory, see :class:`ninjecto.manifest.Manifest`.
+         Outputs recorded in the manifest can be overridden without
+         ``override``.
+        :param bool stream: Write the output of the templates to the
+         destination files while they are rendered, buffering up to
+         ``ninjecto.streaming.buffer_size`` characters, instead of rendering
+         them whole first. Pass None to use the ``ninjecto.streaming.enabled``
+         configuration.
+        :param bool atomic: Write the outputs to temporary files and rename
+         them into place, so an interrupted run never leaves partially written
+         outputs. Pass None to use the ``ninjecto.output.atomic``
+         configuration.
+        :param str durability: How to flush the outputs to the storage device,
+         one of ``none``, ``per-file``, ``per-directory`` or ``end-of-run``,
+         see :class:`ninjecto.outputs.Transaction`. Any mode but ``none``
+         implies atomic writes. Pass None to use the
+         ``ninjecto.output.durability`` configuration.
+        :param bool compare: Leave untouched the outputs whose content is
+         the same as the existing file. Pass None to use the
+         ``ninjecto.output.compare`` configuration.
+        :param profiler: Profiler to record the time spent on each path with.
+         The slowest paths are logged at the end of the run.
+        :type profiler: :class:`ninjecto.profiling.Profiler`
+
+        :return: Number of files processed. The number of outputs written,
+         left unchanged and skipped as up to date is available in
+         :attr:`summary`.
+        :rtype: int
+        """
+        self._prepare(
+            dry_run, override, levels, jobs, pipeline, stream, atomic,
+            durability, compare, profiler,
+        )
+
+        if profiler is not None:
+            profiler.start(self._namespaces)
+
+        if incremental:
+            self._manifest = Manifest(
+                self._destination / self._config.ninjecto.manifest.filename
+            ).load()
+            self._snapshot = Snapshot(
+                self._environment,
+                self._namespaces,
+                self._values,
+                self._config,
+            )
+
+        processed = self.process(
+            self._source,
+            self._destination,
+            self._filename,
+            self._levels,
+        )
+
+        if self._manifest is not None and not dry_run:
+            self._manifest.save(self._records)
+
+        log.info(
+            '{written} files written, {unchanged} unchanged, '
+            '{skipped} skipped'.format(**self.summary)
+        )
+
+        if profiler is not None:
+            profiler.summary()
+            self._profiler = None
+
+        return processed
+
+    async def arun(
+        self,
+        dry_run=False,
+        override=False,
+        levels=None,
+        concurrency=32,
+        atomic=None,
+        durability=None,
+        compare=None,
+    ):
+        """
+        Execute the rendering of this Ninjecto context asynchronously.
+
+        Like :meth:`run`, but the content of the files is rendered with
+        :meth:`arender`, up to ``concurrency`` files at a time, and files are
+        read, written and committed in threads, so none of it blocks the
+        event loop. The libraries are scanned and the tree is walked in a
+        thread too, rendering the names of the files with :meth:`render`.
+
+        Incremental runs, the render cache, streaming, the pipeline and
+        profiling are only available with :meth:`run`.
+
+        Requires the ``ninjecto.environment.enable_async`` configuration.
+
+        :param int concurrency: Maximum number of files to render at once.
+
+        See :meth:`run` for the other parameters.
 
         :return: Number of files processed.
         :rtype: int
         """
+        self._check_async()
+        await self._await_namespaces()
+
+        await asyncio.to_thread(
+            self._prepare,
+            dry_run, override, levels, 1, False, False, atomic, durability,
+            compare, None,
+        )
+
+        files = []
+        with span('walk', path=str(self._source)):
+            processed = await asyncio.to_thread(
+                self._walk,
+                self._source,
+                self._destination,
+                self._filename,
+                self._levels,
+                files,
+            )
+        with span('execute', files=len(files)):
+            await self._aexecute(files, concurrency)
+
+        log.info(
+            '{written} files written, {unchanged} unchanged, '
+            '{skipped} skipped'.format(**self.summary)
+        )
+
+        return processed
+
+    def _prepare(
+        self, dry_run, override, levels, jobs, pipeline, stream, atomic,
+        durability, compare, profiler,
+    ):
+        """
+        Set the options of a run and reset the state of the previous one.
 
+        See :meth:`run` for the parameters.
+        """
         log.info('Render {} -> {}'.format(self._source, self._destination))
-        if self._values:
+        if self._values and not self._embedded:
             log.info('With values:\n{}'.format(self._values))
 
         log.info(
@@ -136,168 +643,1711 @@ class Ninjecto:
         self._dry_run = dry_run
         self._override = override
         self._levels = levels
-        return self.process(
-            self._source,
-            self._destination,
-            self._filename,
-            self._levels,
+        self._jobs = available_cpus() if jobs is None else jobs
+        self._pipeline = (
+            self._config.ninjecto.pipeline.enabled
+            if pipeline is None else pipeline
+        )
+        self._stream = (
+            self._config.ninjecto.streaming.enabled
+            if stream is None else stream
         )
 
-    def process(self, src, dstdir, filename=None, levels=None):
-        """
-        Process a path.
+        if self._stream and self._render_cache is not None:
+            log.warning(
+                'Streaming is unavailable with the render cache, '
+                'rendering whole outputs ...'
+            )
+            self._stream = False
 
-        Path can be a single file, or a directory, in which case it will
-        recurse into it.
+        if self._stream and self._pipeline:
+            log.info('Streaming outputs, the pipeline is disabled ...')
+            self._pipeline = False
 
-        :param Path src: Path to the source file or directory.
-        :param Path disdir: Path to the destination directory.
-        :param str filename: Override the destination filename.
-         Pass None to use the rendered name.
-        :param int levels: Maximum numbers of directories levels to recurse
-         into.
+        if self._pipeline and self._jobs > 1:
+            if jobs is not None:
+                log.warning(
+                    'The pipeline renders with a single job, '
+                    'ignoring the {} jobs requested ...'.format(jobs)
+                )
+            self._jobs = 1
 
-        :return: Number of files processed.
-        :rtype: int
+        outconf = self._config.ninjecto.output
+        self._durability = (
+            outconf.durability if durability is None else durability
+        )
+        if self._durability not in DURABILITY_MODES:
+            raise ValueError(
+                'Unknown durability mode {}, expected one of: {}'.format(
+                    self._durability, ', '.join(DURABILITY_MODES),
+                )
+            )
+        self._atomic = (
+            (outconf.atomic if atomic is None else atomic) or
+            self._durability != 'none'
+        )
+        self._compare = outconf.compare if compare is None else compare
+
+        self._manifest = None
+        self._snapshot = None
+        self._records = {}
+        self._walked = {}
+        self._bindings = {}
+        self._profiler = profiler
+        self._transaction = None
+        self._libraries_digests = {}
+        self.summary = Counter(written=0, unchanged=0, skipped=0)
+
+        # Index the libraries once, as they are at the start of the run
+        if not self._embedded:
+            self._library.scan()
+
+    def run_matrix(self, matrix, destination, filename=None, jobs=None,
+                   **options):
         """
+        Render the source once per value set of a matrix.
 
-        config = self._config.ninjecto
-        dry_run = self._dry_run
-        override = self._override
+        The compiled templates, configuration and plugins of this context are
+        reused by all the value sets. The first value set is rendered in this
+        process, compiling the templates, and the rest are distributed to a
+        pool of worker processes forked afterwards, each one rendering whole
+        value sets with a single job.
 
-        if levels is not None and levels < 1:
-            return 0
+        :param OrderedDict matrix: Ordered dictionary mapping the name of
+         each value set to its values, see
+         :func:`ninjecto.values.load_matrix`.
+        :param str destination: Pattern of the destination directory of each
+         value set. Replacement fields ``{name}`` and ``{index}`` are
+         replaced by the name and position of the value set. Missing
+         directories are created.
+        :param str filename: Pattern of the destination filename of each
+         value set, as ``destination``. Pass None to use the rendered name.
+        :param int jobs: Number of value sets to render in parallel.
+         Pass None to use all the CPUs available to the process.
+        :param options: Options of each render, see :meth:`run`.
 
-        # First thing first, render the filename
-        if filename is None:
-            filename = self.render(
-                src.name,
-                src.name,
-                filepath=src,
-            )
+        :return: Number of files processed by all the value sets. The number
+         of outputs written, left unchanged and skipped as up to date by all
+         the value sets is available in :attr:`summary`.
+        :rtype: int
+        """
+        renders = []
+        seen = {}
 
-            # The file rendered as empty, which usually implies a conditional
-            # file, so we stop the process
-            if not filename.strip():
-                log.warning(
-                    '"{}" file renders to nothing, skipping ...'.format(
-                        src.name
+        for index, (name, values) in enumerate(matrix.items()):
+            fields = {'name': name, 'index': index}
+            dstdir = Path(destination.format(**fields))
+            dstname = None if filename is None else filename.format(**fields)
+
+            output = (dstdir, dstname)
+            if output in seen:
+                raise ValueError(
+                    'Value sets {} and {} render to the same output {}'.format(
+                        seen[output], name, dstdir / (dstname or ''),
                     )
                 )
-                return 0
-
-        # Now with the name, we have an output
-        dst = dstdir / filename
+            seen[output] = name
 
-        # Check override
-        if dst.exists() and not override:
-            raise RuntimeError(
-                '{} exists. '
-                'Use --force to override files and directories.'.format(
-                    dst,
-                )
-            )
+            renders.append((name, values, dstdir, dstname))
 
-        # Check if file, if file, render content and write
-        if src.is_file():
-            content = self.render(
-                src.name,
-                src.read_text(encoding=config.input.encoding),
-                filepath=src,
+        jobs = min(
+            available_cpus() if jobs is None else jobs,
+            len(renders) - 1,
+        )
+        if jobs > 1 and 'fork' not in get_all_start_methods():
+            log.warning(
+                'Parallel matrix rendering requires the fork start method. '
+                'Rendering with a single job ...'
             )
-            if not dry_run:
-                dst.write_text(
-                    content, encoding=config.output.encoding,
-                )
-                dst.chmod(src.stat().st_mode)
+            jobs = 1
 
-            return 1
+        options['jobs'] = 1
+        processed = 0
+        summary = Counter(written=0, unchanged=0, skipped=0)
 
-        # If directory, recurse into it
-        elif src.is_dir():
+        def register(result):
+            nonlocal processed
+            processed += result[0]
+            summary.update(result[1])
 
-            if not dry_run:
-                dst.mkdir(exist_ok=override)
-                dst.chmod(src.stat().st_mode)
+        if renders:
+            register(self._run_value_set(*renders[0], options))
 
-            processed = 1
-            levels = None if levels is None else levels - 1
+        if jobs <= 1:
+            for render in renders[1:]:
+                register(self._run_value_set(*render, options))
+        else:
+            log.info(
+                'Rendering value sets with {} processes ...'.format(jobs)
+            )
+            executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                mp_context=get_context('fork'),
+                initializer=_initialize_worker,
+                initargs=(self, ),
+            )
 
-            for subfile in src.iterdir():
-                processed += self.process(
-                    subfile, dst,
-                    filename=None,
-                    levels=levels,
-                )
+            with executor:
+                futures = [
+                    executor.submit(_run_value_set, *render, options)
+                    for render in renders[1:]
+                ]
 
-            return processed
+                try:
+                    for future in futures:
+                        register(future.result())
+                except BaseException:
+                    executor.shutdown(cancel_futures=True)
+                    raise
 
-        raise RuntimeError(
-            '{} isn\'t a file nor directory. '
-            'Don\'t know what to do.'.format(src)
+        self.summary = summary
+        log.info(
+            '{} value sets rendered: {written} files written, '
+            '{unchanged} unchanged, {skipped} skipped'.format(
+                len(renders), **summary
+            )
         )
+        return processed
 
-    def render(self, name, content, filepath=None):
+    def _run_value_set(self, name, values, dstdir, filename, options):
         """
-        Render a template.
+        Render the source with a value set of a matrix.
 
-        :param str name: Name of the template.
-         Used as key to fetch the template only.
-        :param str content: The content of the template itself.
-        :param Path filepath: Path to the template file, if any.
-         This is used to call namespaces that depend on the filepath.
-         Namespaces that require a filepath won't be called if unset.
+        :param str name: Name of the value set.
+        :param dict values: Values of the value set.
+        :param Path dstdir: Destination directory of the value set.
+        :param str filename: Destination filename of the value set, or None
+         to use the rendered name.
+        :param dict options: Options of the render, see :meth:`run`.
 
-        :return: The rendered template.
-        :rtype: str
+        :return: A tuple with the number of files processed and the summary
+         of the outputs.
+        :rtype: tuple
         """
+        log.info('Rendering value set {} ...'.format(name))
 
-        # Optimization for empty files
-        if not content:
-            return ''
+        if not options.get('dry_run'):
+            dstdir.mkdir(parents=True, exist_ok=True)
 
-        config = self._config.ninjecto
+        self.update_values(values)
+        self._destination = dstdir
+        self._filename = filename
 
-        # Prepare environment
-        envconf = dict(config.environment)
-        envconf.update({
-            'undefined': self.undefmap[config.undefined.clss],
-            'autoescape': select_autoescape(
-                **dict(config.autoescape),
-            ),
-            'loader': ChoiceLoader([
-                DictLoader({
-                    name: content,
-                }),
-                PrefixLoader({
-                    'library': FileSystemLoader(
-                        self._libraries,
-                        encoding=config.filesystemloader.encoding,
-                        followlinks=config.filesystemloader.followlinks,
-                    ),
-                }, delimiter=config.prefixloader.delimiter),
-            ]),
-        })
-        environment = Environment(**envconf)
+        with span('value_set', value_set=name):
+            processed = self.run(**options)
+        return processed, dict(self.summary)
 
-        # Make filters available
-        for key, fltr in self._filters.items():
-            environment.filters[key] = fltr
+    def dependencies(self):
+        """
+        Build the dependency graph of the templates of the source and the
+        libraries.
 
-        # Make namespaces and values available
-        for nskey, ns in self._namespaces.items():
-            if callable(ns) and filepath:
-                environment.globals[nskey] = ns(filepath)
+        Source templates are named by their path relative to the parent of
+        the source, and library templates by the name used to include them,
+        for example ``library/macros.j2``. Binary and passthrough files
+        are left out.
+
+        The templates depending on a library template, and so the outputs to
+        render again when it changes, are found with
+        :meth:`ninjecto.deps.DependencyGraph.dependents`.
+
+        :return: The dependency graph.
+        :rtype: :class:`ninjecto.deps.DependencyGraph`
+        """
+        graph = DependencyGraph(self._environment)
+        encoding = self._config.ninjecto.input.encoding
+
+        if self._source.is_dir():
+            paths = sorted(
+                Path(dirpath) / filename
+                for dirpath, _, filenames in os.walk(
+                    self._source, followlinks=True,
+                )
+                for filename in filenames
+            )
+        else:
+            paths = [self._source]
+
+        for src in paths:
+            if self._passthrough(src):
                 continue
-            environment.globals[nskey] = ns
+            try:
+                source = src.read_text(encoding=encoding)
+            except UnicodeDecodeError:
+                continue
+            graph.add(
+                src.relative_to(self._source.parent).as_posix(),
+                source,
+                'source',
+            )
 
-        environment.globals['values'] = self._values
+        self._library.scan()
+        prefix = 'library' + self._config.ninjecto.prefixloader.delimiter
 
-        # Render template
-        template = environment.get_template(name)
-        render = template.render()
+        for name in self._library.list_templates():
+            try:
+                source, _, _ = self._library.get_source(
+                    self._environment, name,
+                )
+            except UnicodeDecodeError:
+                continue
+            graph.add(prefix + name, source, 'library')
 
-        return render
+        return graph
+
+    def compile(self, target):
+        """
+        Compile the templates of the source and the libraries to Python
+        modules, so runs using them don't need to compile them, see
+        :meth:`load_compiled`.
+
+        The templates compiled are the contents of the source files, the
+        names of the source files and directories, and the library
+        templates. Files copied as is, like passthrough files and files
+        without template markers, are left out.
+
+        Along the modules, an index is written mapping the key of each
+        template, see :func:`ninjecto.loaders.compiled_key`, to its module
+        and the hash of its source.
+
+        :param Path target: Directory to write the compiled templates to.
+         Templates compiled previously in it are replaced.
+
+        :return: Number of templates compiled.
+        :rtype: int
+        """
+        templates = OrderedDict()
+
+        def add(name, source):
+            templates[compiled_key(name, self._source)] = source
+
+        def add_name(name):
+            if any(marker in name for marker in self._markers):
+                add(name, name)
+
+        add_name(self._source.name)
+
+        if self._source.is_dir():
+            paths = []
+            for dirpath, dirnames, filenames in os.walk(
+                self._source, followlinks=True,
+            ):
+                for name in dirnames + filenames:
+                    add_name(name)
+                paths.extend(Path(dirpath) / name for name in filenames)
+        else:
+            paths = [self._source]
+
+        for rule in self._config.ninjecto.fanout.rules:
+            if rule.get('output'):
+                add_name(rule['output'])
+
+        for src in sorted(paths):
+            try:
+                content = self._read_file((src, None))
+            except UnicodeDecodeError:
+                log.warning('Unable to decode {}, skipping ...'.format(src))
+                continue
+            if content and content is not PASSTHROUGH \
+                    and content is not LITERAL:
+                add(str(src), content)
+
+        self._library.scan()
+        prefix = 'library' + self._config.ninjecto.prefixloader.delimiter
+
+        for name in self._library.list_templates():
+            source, _, _ = self._library.get_source(self._environment, name)
+            add(prefix + name, source)
+
+        target = Path(target)
+        target.mkdir(parents=True, exist_ok=True)
+        for path in target.glob('tmpl_*.py'):
+            path.unlink()
+
+        environment = self._environment.overlay(loader=DictLoader(templates))
+        environment.compile_templates(
+            str(target),
+            zip=None,
+            log_function=log.debug,
+            ignore_errors=False,
+        )
+
+        index = {
+            'options': fingerprint(jinja_version, self._compile_options()),
+            'templates': {
+                key: {
+                    'module': ModuleLoader.get_template_key(key),
+                    'digest': fingerprint(source),
+                }
+                for key, source in templates.items()
+            },
+        }
+        (target / COMPILED_INDEX).write_text(
+            dumps(index, indent=4, sort_keys=True) + '\n',
+            encoding='utf-8',
+        )
+
+        log.info('Compiled {} templates to {}'.format(len(templates), target))
+        return len(templates)
+
+    def load_compiled(self, directory):
+        """
+        Render from the templates compiled by :meth:`compile`.
+
+        Compiled templates are used as long as their source is the same they
+        were compiled from. Any other template is compiled from its source,
+        as usual.
+
+        :param Path directory: Directory with the compiled templates.
+
+        :return: True if the compiled templates are used, False if they were
+         compiled by another version of Jinja or with other options of the
+         environment, and were ignored.
+        :rtype: bool
+        """
+        directory = Path(directory)
+        index = loads(
+            (directory / COMPILED_INDEX).read_text(encoding='utf-8')
+        )
+
+        if index['options'] != fingerprint(
+            jinja_version, self._compile_options(),
+        ):
+            log.warning(
+                'Templates in {} were compiled with other options, '
+                'ignoring them ...'.format(directory)
+            )
+            return False
+
+        environment = self._environment
+        environment.loader = ChoiceLoader([
+            CompiledLoader(
+                directory,
+                index['templates'],
+                environment.loader,
+                self._source,
+            ),
+            environment.loader,
+        ])
+        if environment.cache is not None:
+            environment.cache.clear()
+
+        log.info('Using {} compiled templates from {}'.format(
+            len(index['templates']), directory,
+        ))
+        return True
+
+    def process(self, src, dstdir, filename=None, levels=None):
+        """
+        Process a path.
+
+        Path can be a single file, or a directory, in which case it will
+        recurse into it.
+
+        The tree is walked first, rendering the names of the files and
+        creating the directories. The content of the files is then rendered
+        using up to the number of jobs given to :meth:`run`.
+
+        :param Path src: Path to the source file or directory.
+        :param Path disdir: Path to the destination directory.
+        :param str filename: Override the destination filename.
+         Pass None to use the rendered name.
+        :param int levels: Maximum numbers of directories levels to recurse
+         into.
+
+        :return: Number of files processed.
+        :rtype: int
+        """
+        files = []
+        with span('walk', path=str(src)):
+            processed = self._walk(src, dstdir, filename, levels, files)
+        with span('execute', files=len(files)):
+            self._execute(files)
+        return processed
+
+    def _walk(self, src, dstdir, filename, levels, files):
+        """
+        Walk a path, rendering names and creating directories.
+
+        The tree is walked iteratively, so its depth isn't bounded by the
+        recursion limit, and in order of the names of the entries. The type
+        and permissions of each entry are taken from a single ``stat``, and
+        each destination directory that already existed is listed once to
+        check for existing outputs.
+
+        :param Path src: Path to the source file or directory.
+        :param Path disdir: Path to the destination directory.
+        :param str filename: Override the destination filename.
+         Pass None to use the rendered name.
+        :param int levels: Maximum numbers of directories levels to recurse
+         into.
+        :param list files: List to append the source and destination paths
+         of the files to render to.
+
+        :return: Number of files processed.
+        :rtype: int
+        """
+
+        dry_run = self._dry_run
+        override = self._override
+
+        # Names in the destination directories, listed on demand. None for
+        # the destination directory of the given path, and for directories
+        # not walked, like the ones in rendered names, checked directly.
+        listings = {dstdir: None}
+
+        def exists(dst):
+            names = listings.get(dst.parent)
+            if names is None:
+                return os.path.lexists(dst)
+            if callable(names):
+                names = listings[dst.parent] = names()
+            return dst.name in names
+
+        def listing(directory):
+            return lambda: set(os.listdir(directory))
+
+        processed = 0
+        stack = [(src, src.stat(), dstdir, filename, levels, None)]
+
+        while stack:
+            src, stat, dstdir, filename, levels, element = stack.pop()
+
+            if levels is not None and levels < 1:
+                continue
+
+            # Fan-out files are scheduled once per element of their list
+            if element is None and S_ISREG(stat.st_mode):
+                fanout = self._fanout(src)
+                if fanout is not None:
+                    for element in reversed(fanout):
+                        stack.append(
+                            (src, stat, dstdir, filename, levels, element)
+                        )
+                    continue
+
+            # First thing first, render the filename, unless it is literal
+            template = src.name
+            bindings = None
+            if element is not None:
+                output, bindings = element
+                template = output or template
+
+            if filename is None and not any(
+                marker in template for marker in self._markers
+            ):
+                filename = template
+
+            if filename is None:
+                filename = self.render(
+                    template,
+                    template,
+                    filepath=src,
+                    bindings=bindings,
+                )
+
+                # The file rendered as empty, which usually implies a
+                # conditional file, so we stop the process
+                if not filename.strip():
+                    log.warning(
+                        '"{}" file renders to nothing, skipping ...'.format(
+                            src.name
+                        )
+                    )
+                    continue
+
+                # Fan-out outputs are written next to their source
+                if element is not None and any(
+                    separator and separator in filename
+                    for separator in (os.sep, os.altsep)
+                ):
+                    raise RuntimeError(
+                        'Fan-out of {} renders the name {}, with a path '
+                        'separator. Fan-out names must be file names.'.format(
+                            src, filename,
+                        )
+                    )
+
+            # Now with the name, we have an output
+            dst = dstdir / filename
+
+            # Check override
+            existed = exists(dst)
+            tracked = self._tracked(dst)
+            if existed and not override and not tracked:
+                raise RuntimeError(
+                    '{} exists. '
+                    'Use --force to override files and directories.'.format(
+                        dst,
+                    )
+                )
+
+            # Check if file, if file, schedule its rendering
+            if S_ISREG(stat.st_mode):
+                if bindings is not None:
+                    if dst in self._bindings:
+                        raise RuntimeError(
+                            'Fan-out of {} renders {} more than once. '
+                            'Use the loop variable in its name.'.format(
+                                src, dst,
+                            )
+                        )
+                    self._bindings[dst] = bindings
+
+                files.append((src, dst))
+                self._walked[dst] = (stat.st_mode, existed)
+                processed += 1
+                continue
+
+            if not S_ISDIR(stat.st_mode):
+                raise RuntimeError(
+                    '{} isn\'t a file nor directory. '
+                    'Don\'t know what to do.'.format(src)
+                )
+
+            # If directory, schedule its entries, in order
+            if not dry_run:
+                if not existed:
+                    dst.mkdir()
+                dst.chmod(stat.st_mode)
+
+            if self._manifest is not None:
+                self._records[self._output_key(dst)] = {}
+
+            processed += 1
+            listings[dst] = listing(dst) if existed else set()
+            levels = None if levels is None else levels - 1
+
+            with os.scandir(src) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+
+            for entry in reversed(entries):
+                stack.append(
+                    (src / entry.name, entry.stat(), dst, None, levels, None)
+                )
+
+        return processed
+
+    def _output_key(self, dst):
+        """
+        Key of an output in the manifest.
+
+        :param Path dst: Path to the output.
+
+        :return: The path of the output relative to the destination.
+        :rtype: str
+        """
+        return dst.relative_to(self._destination).as_posix()
+
+    def _tracked(self, dst):
+        """
+        Check if an output was recorded in the manifest of a previous run.
+
+        :param Path dst: Path to the output.
+
+        :rtype: bool
+        """
+        return (
+            self._manifest is not None and
+            self._output_key(dst) in self._manifest.entries
+        )
+
+    def _stale(self, files):
+        """
+        Filter the files whose outputs are up to date with their inputs.
+
+        The entries of the up to date outputs are carried over to the new
+        manifest.
+
+        :param list files: List of tuples with the source and destination
+         paths of the files to render.
+
+        :return: The files that need to be rendered.
+        :rtype: list
+        """
+        if self._manifest is None:
+            return files
+
+        stale = []
+        for src, dst in files:
+            key = self._output_key(dst)
+            entry = self._manifest.entries.get(key)
+
+            if self._snapshot.fresh(entry, src, dst):
+                self._records[key] = entry
+                continue
+
+            stale.append((src, dst))
+
+        self.summary['skipped'] += len(files) - len(stale)
+        log.info('{} files up to date, {} files to render'.format(
+            len(files) - len(stale), len(stale),
+        ))
+        return stale
+
+    def _execute(self, files):
+        """
+        Render the content of the given files.
+
+        Files are rendered in this process if a single job is requested or
+        the pipeline is enabled, which overlaps the reading and writing of
+        the files with the rendering, see :func:`ninjecto.pipeline.pipeline`.
+        Otherwise, they
+        are distributed to a pool of worker processes, or of threads on
+        free-threaded interpreters. Workers are initialized once with this
+        context, its values, configuration and plugins.
+
+        :param list files: List of tuples with the source and destination
+         paths of the files to render.
+        """
+        files = self._stale(files)
+
+        with self._transact(files):
+            self._dispatch(files)
+
+    async def _aexecute(self, files, concurrency):
+        """
+        Render the content of the given files asynchronously.
+
+        :param list files: List of tuples with the source and destination
+         paths of the files to render.
+        :param int concurrency: Maximum number of files to render at once.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # Transactions aren't thread safe, outputs are committed one by one
+        committing = asyncio.Lock()
+
+        async def process(src, dst):
+            async with semaphore:
+                with span('read', path=str(src)):
+                    content = await asyncio.to_thread(
+                        self._read_file, (src, dst),
+                    )
+                with span('render', path=str(src)):
+                    rendered = await self._arender_file((src, dst), content)
+                with span('write', path=str(src)):
+                    status = await asyncio.to_thread(
+                        self._write, (src, dst), rendered,
+                    )
+            async with committing:
+                await asyncio.to_thread(self._written, dst, status)
+
+        log.info('Rendering up to {} files at once ...'.format(concurrency))
+
+        transact = self._transact(files)
+        await asyncio.to_thread(transact.__enter__)
+        try:
+            await asyncio.gather(*(process(src, dst) for src, dst in files))
+        except BaseException as e:
+            await asyncio.to_thread(
+                transact.__exit__, type(e), e, e.__traceback__,
+            )
+            raise
+        await asyncio.to_thread(transact.__exit__, None, None, None)
+
+    @contextmanager
+    def _transact(self, files):
+        """
+        Write the outputs of the given files in a transaction, if the run
+        writes atomically, see :class:`ninjecto.outputs.Transaction`.
+
+        The transaction is aborted if the context raises.
+
+        :param list files: List of tuples with the source and destination
+         paths of the files to render.
+        """
+        self._transaction = None
+        if self._atomic and not self._dry_run:
+            self._transaction = Transaction(
+                self._durability,
+                [dst for _, dst in files],
+                self._destination,
+                syncfs=self._config.ninjecto.output.syncfs,
+            )
+
+        try:
+            yield
+        except BaseException:
+            if self._transaction is not None:
+                self._transaction.abort()
+            raise
+
+        if self._transaction is not None:
+            self._transaction.close()
+
+    def _dispatch(self, files):
+        """
+        Render the content of the given files, in this process or in
+        workers.
+
+        :param list files: List of tuples with the source and destination
+         paths of the files to render.
+        """
+        jobs = min(self._jobs, len(files))
+
+        if jobs > 1 and gil_enabled() \
+                and 'fork' not in get_all_start_methods():
+            log.warning(
+                'Parallel rendering requires the fork start method. '
+                'Rendering with a single job ...'
+            )
+            jobs = 1
+
+        if self._pipeline:
+            budget = self._config.ninjecto.pipeline.budget
+            encoding = self._config.ninjecto.output.encoding
+
+            # Outputs aren't encoded just to be measured, their size is
+            # bounded by 4 bytes per character, or by the width of a space
+            # for ASCII text, without the byte order mark if any
+            width = len('  '.encode(encoding)) - len(' '.encode(encoding))
+
+            log.info(
+                'Rendering with a pipeline of {} bytes ...'.format(budget)
+            )
+
+            def read(paths):
+                with span('read', path=str(paths[0])):
+                    return self._read_file(paths)
+
+            def render(paths, content):
+                with span('render', path=str(paths[0])):
+                    return self._render_file(paths, content)
+
+            def write(paths, content):
+                with span('write', path=str(paths[0])):
+                    status = self._write(paths, content)
+                self._written(paths[1], status)
+
+            pipeline(
+                files,
+                read,
+                render,
+                write,
+                budget,
+                sizeof=lambda data: (
+                    len(data) * (width if data.isascii() else 4)
+                    if isinstance(data, str) else 0
+                ),
+            )
+            return
+
+        if jobs <= 1:
+            for src, dst in files:
+                self._written(dst, self.process_file(src, dst))
+            return
+
+        if gil_enabled():
+            log.info('Rendering with {} processes ...'.format(jobs))
+            executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                mp_context=get_context('fork'),
+                initializer=_initialize_worker,
+                initargs=(self, ),
+            )
+            task = _process_file
+        else:
+            log.info('Rendering with {} threads ...'.format(jobs))
+            executor = ThreadPoolExecutor(max_workers=jobs)
+            task = self._process_file_threaded
+
+        with executor:
+            futures = [
+                executor.submit(task, src, dst)
+                for src, dst in files
+            ]
+
+            try:
+                for (src, dst), future in zip(files, futures):
+                    status, record, profile, events = future.result()
+                    if record is not None:
+                        self._records[self._output_key(dst)] = record
+                    if profile is not None:
+                        self._profiler.merge(src, profile)
+                    if events:
+                        tracer().merge(events)
+                    self._written(dst, status)
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    def _written(self, dst, status):
+        """
+        Register that an output was processed, so the transaction of the run
+        can commit it.
+
+        :param Path dst: Path to the output.
+        :param str status: Either ``written`` or ``unchanged``, or None in
+         dry runs.
+        """
+        if status is not None:
+            self.summary[status] += 1
+
+        if self._transaction is not None:
+            self._transaction.done(dst, written=status == 'written')
+
+    def process_file(self, src, dst):
+        """
+        Render the content of a file and write it.
+
+        :param Path src: Path to the source file.
+        :param Path dst: Path to the destination file.
+
+        :return: Either ``written`` or ``unchanged``, or None in dry runs.
+        :rtype: str
+        """
+        with span('read', path=str(src)):
+            content = self._read_file((src, dst))
+        with span('render', path=str(src)):
+            rendered = self._render_file((src, dst), content)
+        with span('write', path=str(src)):
+            return self._write((src, dst), rendered)
+
+    def _process_file_threaded(self, src, dst):
+        """
+        Render a file in a worker thread.
+
+        Worker threads share the records, profiler and tracer of this
+        process, so only the status is returned, in the same tuple returned
+        by the worker processes.
+
+        :param Path src: Path to the source file.
+        :param Path dst: Path to the destination file.
+
+        :return: See :func:`_process_file`.
+        :rtype: tuple
+        """
+        return self.process_file(src, dst), None, None, None
+
+    def _write(self, paths, content):
+        """
+        Write the rendered content of a file, profiling it if requested.
+
+        See :meth:`_write_file`.
+        """
+        if self._profiler is None:
+            return self._write_file(paths, content)
+        return self._profiler.write(self._write_file, paths, content)
+
+    def _passthrough(self, src):
+        """
+        Check if a source file must be copied without being rendered.
+
+        That's the case of the files matching any of the passthrough
+        patterns, either by name or by path relative to the source directory,
+        and, if enabled, of the files that look binary.
+
+        :param Path src: Path to the source file.
+
+        :rtype: bool
+        """
+        passconf = self._config.ninjecto.passthrough
+
+        if any(self._matches(src, pattern) for pattern in passconf.patterns):
+            return True
+
+        return passconf.detect and is_binary(src)
+
+    def _matches(self, src, pattern):
+        """
+        Check if a source file matches a pattern, either by name or by path
+        relative to the source directory.
+
+        :param Path src: Path to the source file.
+        :param str pattern: Shell-style pattern.
+
+        :rtype: bool
+        """
+        if self._source.is_dir():
+            relative = src.relative_to(self._source).as_posix()
+        else:
+            relative = src.name
+
+        return fnmatch(src.name, pattern) or fnmatch(relative, pattern)
+
+    def _fanout(self, src):
+        """
+        Get the elements a source file is fanned out to, if any.
+
+        A file is fanned out when it matches the pattern of a rule in
+        ``ninjecto.fanout.rules``. It is then rendered once per element of
+        the list found in the values at the ``items`` dot-notation path of
+        the rule, with the element bound to the ``name`` variable of the
+        rule, ``item`` by default. The name of each output is rendered from
+        the ``output`` template of the rule, or from the name of the file.
+
+        :param Path src: Path to the source file.
+
+        :return: A list of tuples with the template of the output name, or
+         None to use the name of the file, and the bindings of each element.
+         None if the file isn't fanned out.
+        :rtype: list
+        """
+        for rule in self._config.ninjecto.fanout.rules:
+            if not self._matches(src, rule['pattern']):
+                continue
+
+            items = self._values
+            for key in rule['items'].split('.'):
+                items = items.get(key) if isinstance(items, Mapping) else None
+
+            if items is None:
+                log.warning(
+                    'No values at {} to fan out {} to, skipping ...'.format(
+                        rule['items'], src,
+                    )
+                )
+                return []
+
+            if not isinstance(items, (list, tuple)):
+                raise RuntimeError(
+                    'Values at {} to fan out {} to must be a list'.format(
+                        rule['items'], src,
+                    )
+                )
+
+            name = rule.get('name', 'item')
+            output = rule.get('output')
+            return [(output, {name: item}) for item in items]
+
+        return None
+
+    def _read_file(self, paths):
+        """
+        Read the content of a file to render.
+
+        :param tuple paths: Source and destination paths of the file.
+
+        :return: The content of the source file, :data:`PASSTHROUGH` if the
+         file must be copied byte-for-byte, or :data:`LITERAL` if the file
+         has no template markers and can be copied as is.
+        :rtype: str
+        """
+        src, _ = paths
+
+        if self._passthrough(src):
+            return PASSTHROUGH
+
+        if self._literal_markers is not None and not contains_any(
+            src, self._literal_markers,
+        ):
+            return LITERAL
+
+        return src.read_text(encoding=self._config.ninjecto.input.encoding)
+
+    def _render_file(self, paths, content):
+        """
+        Render the content of a file.
+
+        :param tuple paths: Source and destination paths of the file.
+        :param str content: The content of the source file.
+
+        :return: The rendered content.
+        :rtype: str
+        """
+        src, dst = paths
+
+        if content is PASSTHROUGH:
+            if self._snapshot is not None:
+                self._records[self._output_key(dst)] = self._snapshot.record(
+                    src, src.read_bytes(), set(),
+                )
+            return content
+
+        if content is LITERAL:
+            if self._snapshot is not None:
+                self._records[self._output_key(dst)] = self._snapshot.record(
+                    src,
+                    src.read_text(
+                        encoding=self._config.ninjecto.input.encoding,
+                    ),
+                    set(),
+                )
+            return content
+
+        bindings = self._bindings.get(dst)
+
+        if self._stream:
+            return self._generate_file(src, dst, content, bindings)
+
+        if self._snapshot is None and self._render_cache is None:
+            return self.render(
+                str(src), content, filepath=src, bindings=bindings,
+            )
+
+        with self._environment.record() as loaded:
+            if self._render_cache is None:
+                rendered = self.render(
+                    str(src), content, filepath=src, bindings=bindings,
+                )
+            else:
+                rendered = self._render_cached(
+                    str(src), content, src, loaded, bindings,
+                )
+
+        if self._snapshot is None:
+            return rendered
+
+        self._records[self._output_key(dst)] = self._record(
+            src, content, loaded, bindings,
+        )
+        return rendered
+
+    async def _arender_file(self, paths, content):
+        """
+        Render the content of a file asynchronously.
+
+        See :meth:`_render_file`.
+        """
+        src, dst = paths
+
+        if content is PASSTHROUGH or content is LITERAL:
+            return content
+
+        return await self.arender(
+            str(src), content, filepath=src, bindings=self._bindings.get(dst),
+        )
+
+    def _record(self, src, content, loaded, bindings):
+        """
+        Create the manifest entry of a rendered output.
+
+        The elements bound to fan-out outputs come from the values, so the
+        values are always recorded for them.
+
+        :param Path src: Path to the source file.
+        :param str content: The content of the source file.
+        :param set loaded: Names of the templates loaded while rendering it.
+        :param dict bindings: Variables bound to the render, if any.
+
+        :return: The entry, see :meth:`ninjecto.manifest.Snapshot.record`.
+        :rtype: dict
+        """
+        entry = self._snapshot.record(src, content, loaded)
+        if bindings and entry['values'] is None:
+            entry['values'] = self._snapshot.values()
+        return entry
+
+    def _generate_file(self, src, dst, content, bindings=None):
+        """
+        Render the content of a file piece by piece.
+
+        :param Path src: Path to the source file.
+        :param Path dst: Path to the destination file.
+        :param str content: The content of the source file.
+        :param dict bindings: Variables bound to the render, if any.
+
+        :return: Iterator over the pieces of the rendered content.
+        :rtype: iterator
+        """
+        if self._snapshot is None:
+            yield from self.generate(
+                str(src), content, filepath=src, bindings=bindings,
+            )
+            return
+
+        with self._environment.record() as loaded:
+            yield from self.generate(
+                str(src), content, filepath=src, bindings=bindings,
+            )
+
+        self._records[self._output_key(dst)] = self._record(
+            src, content, loaded, bindings,
+        )
+
+    def _write_chunks(self, output, chunks):
+        """
+        Write the pieces of a rendered content to a stream, buffering them up
+        to ``ninjecto.streaming.buffer_size`` characters.
+
+        :param output: Text stream to write to.
+        :param chunks: Iterable of the pieces of the rendered content.
+        """
+        limit = self._config.ninjecto.streaming.buffer_size
+        buffer = []
+        size = 0
+
+        for chunk in chunks:
+            buffer.append(chunk)
+            size += len(chunk)
+
+            if size >= limit:
+                output.write(''.join(buffer))
+                buffer.clear()
+                size = 0
+
+        if buffer:
+            output.write(''.join(buffer))
+
+    def dump(self, output):
+        """
+        Render the source file to a text stream, like the standard output.
+
+        The output is written while it is rendered, see :meth:`generate`.
+
+        :param output: Text stream to write to.
+
+        :return: Number of files processed.
+        :rtype: int
+        """
+        if not self._source.is_file():
+            raise RuntimeError(
+                'Only a file can be rendered to a stream, {} is not'.format(
+                    self._source,
+                )
+            )
+
+        log.info('Render {} -> stream'.format(self._source))
+
+        content = self._source.read_text(
+            encoding=self._config.ninjecto.input.encoding,
+        )
+        self._write_chunks(
+            output,
+            self.generate(
+                str(self._source), content, filepath=self._source,
+            ),
+        )
+        output.flush()
+        return 1
+
+    def _write_file(self, paths, content):
+        """
+        Write the rendered content of a file and copy its permissions.
+
+        :param tuple paths: Source and destination paths of the file.
+        :param content: The rendered content, or an iterator over its pieces
+         when streaming.
+        :type content: str or iterator
+
+        :return: ``unchanged`` if the output was left untouched because it
+         already had the same content, ``written`` otherwise, or None in dry
+         runs.
+        :rtype: str
+        """
+        if self._dry_run:
+            # Streamed outputs are only rendered as they are consumed
+            if not isinstance(content, str) and \
+                    content not in (LITERAL, PASSTHROUGH):
+                for _ in content:
+                    pass
+            return None
+
+        src, dst = paths
+        transaction = self._transaction
+        encoding = self._config.ninjecto.output.encoding
+
+        # Reuse the state of the files seen while walking the tree
+        walked = self._walked.get(dst)
+        mode, existed = (None, True) if walked is None else walked
+        if mode is None:
+            mode = src.stat().st_mode
+
+        # Leave the output untouched if its content didn't change
+        if self._compare and existed and isinstance(content, str):
+            content = content.replace('\n', os.linesep).encode(encoding)
+
+        if self._compare and existed and self._unchanged(
+            src, dst, content, mode,
+        ):
+            return 'unchanged'
+
+        # Write atomic outputs to a temporary file, renamed into place later
+        target = dst if transaction is None else temporary_path(dst)
+
+        # Never write through a hard link, it could be linked to the source
+        if existed and transaction is None:
+            try:
+                if dst.stat().st_nlink > 1:
+                    dst.unlink()
+            except FileNotFoundError:
+                pass
+
+        if content is PASSTHROUGH:
+            self._passthrough_file(src, target)
+        elif content is LITERAL:
+            copy_file(src, target)
+        elif isinstance(content, bytes):
+            target.write_bytes(content)
+        elif isinstance(content, str):
+            target.write_text(content, encoding=encoding)
+        else:
+            with target.open('w', encoding=encoding) as output:
+                self._write_chunks(output, content)
+        target.chmod(mode)
+
+        record = self._records.get(self._output_key(dst))
+        profiler = self._profiler
+        if record is not None or profiler is not None:
+            stat = target.stat()
+        if record is not None:
+            record['output'] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+            }
+        if profiler is not None:
+            profiler.written(src, stat.st_size)
+
+        if transaction is not None:
+            transaction.write(dst)
+
+        return 'written'
+
+    def _unchanged(self, src, dst, content, mode):
+        """
+        Check if an output already has the given content, fixing its
+        permissions if they differ.
+
+        Streamed outputs are always considered changed.
+
+        :param Path src: Path to the source file.
+        :param Path dst: Path to the output.
+        :param content: The rendered content, encoded, or the marker of the
+         files copied as is.
+        :param int mode: Permissions of the source file.
+
+        :rtype: bool
+        """
+        try:
+            stat = dst.stat()
+        except FileNotFoundError:
+            return False
+
+        if content is LITERAL or content is PASSTHROUGH:
+            unchanged = equal_files(dst, src, stat=stat)
+        elif isinstance(content, bytes):
+            unchanged = equal_bytes(dst, content, stat=stat)
+        else:
+            unchanged = False
+
+        if not unchanged:
+            return False
+
+        if S_IMODE(stat.st_mode) != S_IMODE(mode):
+            dst.chmod(mode)
+
+        record = self._records.get(self._output_key(dst))
+        if record is not None:
+            record['output'] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+            }
+        return True
+
+    def _render_cached(self, name, content, filepath, loaded, bindings=None):
+        """
+        Render a template using the render cache.
+
+        The template is rendered with recording proxies in place of the values
+        and namespaces, so the output is stored with the hashes of only the
+        values it read, see :class:`ninjecto.tracking.Recorder`. Later renders
+        of the same template reuse the output as long as those values, and
+        the library templates it used, are unchanged.
+
+        :param str name: Name of the template.
+        :param str content: The content of the template itself.
+        :param Path filepath: Path to the template file.
+        :param set loaded: Set to add the names of the loaded templates to.
+        :param dict bindings: Variables bound to the render, if any. They are
+         part of the key of the output.
+
+        :return: The rendered template.
+        :rtype: str
+        """
+        cache = self._render_cache
+        key = cache.key(
+            name, content,
+            fingerprint([self._config_digest, bindings])
+            if bindings else self._config_digest,
+        )
+
+        def current(entry):
+            for root, path, value in entry['reads']:
+                if root == 'values':
+                    obj = self._values
+                elif root in self._namespaces:
+                    obj = self._namespace(root, filepath)
+                else:
+                    return False
+                if digest(resolve(obj, path)) != value:
+                    return False
+
+            return all(
+                self._library_digest(library) == value
+                for library, value in entry['libraries'].items()
+            )
+
+        entry = cache.lookup(key, current)
+        if entry is not None:
+            loaded.update(entry['libraries'])
+            return entry['output']
+
+        recorder = Recorder()
+        rendered = self._render(
+            name, content, filepath, recorder=recorder, bindings=bindings,
+        )
+
+        cache.store(key, {
+            'output': rendered,
+            'reads': [
+                [root, list(path), value]
+                for (root, path), value in recorder.paths.items()
+            ],
+            'libraries': {
+                library: self._library_digest(library)
+                for library in sorted(loaded - {name})
+            },
+        })
+        return rendered
+
+    def _library_digest(self, name):
+        """
+        Hash of the current source of a library template, memoized per run.
+
+        :param str name: Name of the library template.
+
+        :return: The hash of its source, or :data:`ninjecto.tracking.MISSING`
+         if it doesn't exist.
+        :rtype: str
+        """
+        if name not in self._libraries_digests:
+            environment = self._environment
+            try:
+                source, _, _ = environment.loader.get_source(
+                    environment, name,
+                )
+                value = digest(source)
+            except TemplateNotFound:
+                value = MISSING
+            self._libraries_digests[name] = value
+        return self._libraries_digests[name]
+
+    def _namespace(self, nskey, filepath):
+        """
+        Get the value of a namespace for the given file.
+
+        :param str nskey: Name of the namespace.
+        :param Path filepath: Path to the template file, if any.
+
+        :return: The namespace, called with the file if it is dynamic, and
+         awaited if that returned an awaitable.
+        """
+        if self._pending:
+            self._wait_namespaces()
+
+        ns = self._namespaces[nskey]
+        if not callable(ns) or not filepath:
+            return ns
+
+        result = {nskey: ns(filepath)}
+        if isawaitable(result[nskey]):
+            _wait(result)
+        return result[nskey]
+
+    def render(self, name, content, filepath=None, bindings=None):
+        """
+        Render a template.
+
+        :param str name: Name of the template.
+         Used as key to fetch and cache the compiled template.
+        :param str content: The content of the template itself.
+        :param Path filepath: Path to the template file, if any.
+         This is used to call namespaces that depend on the filepath.
+         Namespaces that require a filepath won't be called if unset.
+        :param dict bindings: Variables to make available to this render
+         only, for example the element of a fan-out.
+
+        :return: The rendered template.
+        :rtype: str
+        """
+        return self._render(name, content, filepath, bindings=bindings)
+
+    async def arender(self, name, content, filepath=None, bindings=None):
+        """
+        Render a template asynchronously.
+
+        Like :meth:`render`, but namespaces returning awaitables are awaited,
+        concurrently, and so are the coroutines called from the template,
+        without blocking the event loop.
+
+        Requires the ``ninjecto.environment.enable_async`` configuration.
+
+        See :meth:`render` for the parameters.
+
+        :return: The rendered template.
+        :rtype: str
+        """
+        self._check_async()
+        await self._await_namespaces()
+
+        if not content:
+            return ''
+
+        environment = self._environment
+        overlay = self._overlay(filepath, bindings=bindings, wait=False)
+        await _gather(overlay)
+
+        with environment.globals.scope(overlay), \
+                self._sources.source(name, content):
+            template = environment.get_template(name)
+            return await template.render_async()
+
+    def _check_async(self):
+        """
+        Check that the environment renders asynchronously, as required by
+        the async API.
+        """
+        if not self._environment.is_async:
+            raise RuntimeError(
+                'Rendering asynchronously requires the '
+                'ninjecto.environment.enable_async configuration'
+            )
+
+    async def _await_namespaces(self):
+        """
+        Await the namespaces whose plugins returned awaitables, concurrently,
+        in the running event loop.
+
+        Concurrent calls share the same task, so each awaitable is only
+        awaited once.
+        """
+        if not self._pending:
+            return
+
+        with self._resolving_lock:
+            if self._resolving is None:
+                self._resolving = asyncio.ensure_future(
+                    _gather(self._pending),
+                )
+        await self._resolving
+        self._resolved()
+
+    def _wait_namespaces(self):
+        """
+        Wait for the namespaces whose plugins returned awaitables, from
+        synchronous code, see :func:`_wait`.
+        """
+        with self._resolving_lock:
+            if not self._pending:
+                return
+
+            if self._resolving is not None:
+                if not self._resolving.done():
+                    raise RuntimeError(
+                        'Namespaces are being awaited by the async API'
+                    )
+                # Raise the error of the namespaces, if any
+                self._resolving.result()
+            else:
+                _wait(self._pending)
+            self._resolved()
+
+    def _resolved(self):
+        """
+        Replace the namespaces that were awaited with their results.
+        """
+        self._namespaces.update(self._pending)
+        self._environment.globals.update(self._pending)
+        self._pending = {}
+
+    def _render(
+        self, name, content, filepath=None, recorder=None, bindings=None,
+    ):
+        """
+        Render a template, optionally recording the values it reads.
+
+        :param str name: Name of the template.
+        :param str content: The content of the template itself.
+        :param Path filepath: Path to the template file, if any.
+        :param recorder: Recorder to wrap the values and namespaces with.
+        :type recorder: :class:`ninjecto.tracking.Recorder`
+        :param dict bindings: Variables to make available to this render
+         only.
+
+        :return: The rendered template.
+        :rtype: str
+        """
+
+        # Optimization for empty files
+        if not content:
+            return ''
+
+        environment = self._environment
+        overlay = self._overlay(filepath, recorder, bindings)
+
+        # Render template
+        with environment.globals.scope(overlay), \
+                self._sources.source(name, content):
+            if self._profiler is not None:
+                return self._profiler.render(environment, name, filepath)
+
+            template = environment.get_template(name)
+            render = template.render()
+
+        return render
+
+    def _overlay(self, filepath, recorder=None, bindings=None, wait=True):
+        """
+        Globals to set for a single render.
+
+        :param Path filepath: Path to the template file, if any.
+        :param recorder: Recorder to wrap the values and namespaces with.
+        :type recorder: :class:`ninjecto.tracking.Recorder`
+        :param dict bindings: Variables to make available to this render
+         only.
+        :param bool wait: Wait for the namespaces returning awaitables, see
+         :func:`_wait`. If False, the caller must await them.
+
+        :return: Mapping of the globals.
+        :rtype: dict
+        """
+        if wait and self._pending:
+            self._wait_namespaces()
+
+        # Make dynamic namespaces available for this render only
+        overlay = {
+            nskey: ns(filepath)
+            for nskey, ns in self._namespaces.items()
+            if callable(ns) and filepath
+        }
+
+        if wait and any(isawaitable(ns) for ns in overlay.values()):
+            _wait(overlay)
+
+        # Values are set for each render too, for derived contexts
+        overlay['values'] = self._values
+
+        if recorder is not None:
+            overlay = {
+                nskey: recorder.wrap(
+                    nskey, overlay.get(nskey, self._namespaces[nskey]),
+                )
+                for nskey in self._namespaces
+            }
+            overlay['values'] = recorder.wrap('values', self._values)
+
+        if bindings:
+            overlay.update(bindings)
+        return overlay
+
+    def generate(self, name, content, filepath=None, bindings=None):
+        """
+        Render a template piece by piece.
+
+        Like :meth:`render`, but the output is yielded as it is rendered, so
+        it is never held in memory as a whole. The output must be consumed
+        in the same thread, before rendering any other template.
+
+        :param str name: Name of the template.
+        :param str content: The content of the template itself.
+        :param Path filepath: Path to the template file, if any.
+        :param dict bindings: Variables to make available to this render
+         only.
+
+        :return: Iterator over the pieces of the rendered template.
+        :rtype: iterator
+        """
+        if not content:
+            return
+
+        environment = self._environment
+        overlay = self._overlay(filepath, bindings=bindings)
+
+        with environment.globals.scope(overlay), \
+                self._sources.source(name, content):
+            if self._profiler is not None and filepath is not None:
+                template = self._profiler.template(
+                    environment, name, filepath,
+                )
+            else:
+                template = environment.get_template(name)
+            yield from template.generate()
+
+
+async def _gather(mapping):
+    """
+    Await the values of a mapping that are awaitable, concurrently, replacing
+    them with their results.
+
+    :param dict mapping: The mapping to update.
+    """
+    keys = [key for key, value in mapping.items() if isawaitable(value)]
+    results = await asyncio.gather(*(mapping[key] for key in keys))
+    mapping.update(zip(keys, results))
+
+
+def _wait(mapping):
+    """
+    Await the values of a mapping that are awaitable from synchronous code,
+    see :func:`_gather`.
+
+    They are awaited in a new event loop, in a separate thread if this one
+    is already running an event loop, which is blocked meanwhile, as when
+    rendering synchronously from a coroutine.
+
+    :param dict mapping: The mapping to update.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(_gather(mapping))
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(asyncio.run, _gather(mapping)).result()
+
+
+# Context of the worker processes, set by _initialize_worker
+_worker = None
+
+
+def _initialize_worker(ninjecto):
+    """
+    Initialize a worker process with the context to render files with.
+
+    :param Ninjecto ninjecto: The context of the parent process.
+    """
+    global _worker
+    _worker = ninjecto
+
+    # Profiles and traces are sent back to the parent, that already has its
+    # own
+    if ninjecto._profiler is not None:
+        ninjecto._profiler.entries.clear()
+    if tracer() is not None:
+        tracer().collect()
+
+
+def _process_file(src, dst):
+    """
+    Render a file in a worker process.
+
+    :param Path src: Path to the source file.
+    :param Path dst: Path to the destination file.
+
+    :return: A tuple with the status of the output, see
+     :meth:`Ninjecto.process_file`, its manifest entry, if any, its profile,
+     if profiling, and its trace events, if tracing.
+    :rtype: tuple
+    """
+    status = _worker.process_file(src, dst)
+    profiler = _worker._profiler
+    return (
+        status,
+        _worker._records.pop(_worker._output_key(dst), None),
+        None if profiler is None else profiler.pop(src),
+        None if tracer() is None else tracer().collect(),
+    )
+
+
+def _run_value_set(name, values, dstdir, filename, options):
+    """
+    Render a value set of a matrix in a worker process.
+
+    See :meth:`Ninjecto._run_value_set`.
+    """
+    return _worker._run_value_set(name, values, dstdir, filename, options)
 
 
 __all__ = [
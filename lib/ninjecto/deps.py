@@ -0,0 +1,200 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Dependency graph of the templates, from their include, import and extends
+statements.
+"""
+
+from json import dumps
+from logging import getLogger
+from collections import OrderedDict
+
+from jinja2 import TemplateSyntaxError
+from jinja2.meta import find_referenced_templates
+
+
+log = getLogger(__name__)
+
+
+def find_dependencies(environment, source):
+    """
+    Find the templates a template includes, imports or extends.
+
+    :param environment: Environment to parse the template with.
+    :type environment: :class:`jinja2.Environment`
+    :param str source: Source of the template.
+
+    :return: A tuple with the set of names of the referenced templates and
+     a boolean telling if other templates are referenced by names only
+     known when rendering.
+    :rtype: tuple
+    """
+    names = set()
+    dynamic = False
+
+    for name in find_referenced_templates(environment.parse(source)):
+        if name is None:
+            dynamic = True
+        else:
+            names.add(name)
+
+    return names, dynamic
+
+
+class DependencyGraph:
+    """
+    Graph of the templates and the templates they reference.
+
+    :param environment: Environment to parse the templates with.
+    :type environment: :class:`jinja2.Environment`
+    """
+
+    def __init__(self, environment):
+        self._environment = environment
+
+        #: Mapping of each template to the names of the templates it
+        #: references.
+        self.edges = OrderedDict()
+
+        #: Kind of each template, ``source`` or ``library``.
+        self.kinds = {}
+
+        #: Templates referencing templates by names only known when
+        #: rendering.
+        self.dynamic = set()
+
+        #: Templates that couldn't be parsed, with their errors.
+        self.errors = {}
+
+    def add(self, name, source, kind):
+        """
+        Add a template to the graph.
+
+        :param str name: Name of the template in the graph.
+        :param str source: Source of the template.
+        :param str kind: Kind of the template, ``source`` or ``library``.
+        """
+        self.kinds[name] = kind
+
+        try:
+            names, dynamic = find_dependencies(self._environment, source)
+        except TemplateSyntaxError as e:
+            log.warning('Unable to parse {}: {}'.format(name, e))
+            self.errors[name] = str(e)
+            names, dynamic = set(), False
+
+        self.edges[name] = sorted(names)
+        if dynamic:
+            self.dynamic.add(name)
+
+    def dependents(self, names, kind='source'):
+        """
+        Find the templates that depend, directly or not, on any of the given
+        templates.
+
+        :param list names: Names of the templates.
+        :param str kind: Kind of the templates to return, or None for all.
+
+        :return: Sorted list of the names of the dependent templates,
+         including the given ones. Templates referencing templates by names
+         only known when rendering are always included, as they may depend
+         on any.
+        :rtype: list
+        """
+        reverse = {}
+        for name, references in self.edges.items():
+            for reference in references:
+                reverse.setdefault(reference, set()).add(name)
+
+        found = set(self.dynamic)
+        pending = list(names)
+
+        while pending:
+            name = pending.pop()
+            if name in found:
+                continue
+            found.add(name)
+            pending.extend(reverse.get(name, ()))
+
+        # Dependents of the dynamic templates may depend on anything too
+        pending = list(self.dynamic)
+        while pending:
+            for dependent in reverse.get(pending.pop(), ()):
+                if dependent not in found:
+                    found.add(dependent)
+                    pending.append(dependent)
+
+        return sorted(
+            name for name in found
+            if kind is None or self.kinds.get(name) == kind
+        )
+
+    def to_json(self):
+        """
+        Serialize the graph to JSON.
+
+        :return: A JSON document with the ``templates``, mapping each one to
+         its ``kind`` and the templates it ``references``, and the sorted
+         lists of the ``dynamic`` templates and of the parsing ``errors``.
+        :rtype: str
+        """
+        return dumps({
+            'templates': OrderedDict(
+                (name, {
+                    'kind': self.kinds[name],
+                    'references': references,
+                })
+                for name, references in self.edges.items()
+            ),
+            'dynamic': sorted(self.dynamic),
+            'errors': dict(sorted(self.errors.items())),
+        }, indent=4)
+
+    def to_dot(self):
+        """
+        Serialize the graph to the DOT language of Graphviz.
+
+        Library templates are drawn as boxes, and templates referencing
+        templates by names only known when rendering are dashed.
+
+        :return: A directed graph in the DOT language.
+        :rtype: str
+        """
+        lines = ['digraph dependencies {']
+
+        for name, kind in self.kinds.items():
+            attributes = ['shape=box'] if kind == 'library' else []
+            if name in self.dynamic:
+                attributes.append('style=dashed')
+            lines.append('    {}{};'.format(
+                dumps(name),
+                ' [{}]'.format(', '.join(attributes)) if attributes else '',
+            ))
+
+        for name, references in self.edges.items():
+            for reference in references:
+                lines.append('    {} -> {};'.format(
+                    dumps(name), dumps(reference),
+                ))
+
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+
+__all__ = [
+    'find_dependencies',
+    'DependencyGraph',
+]
@@ -0,0 +1,139 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Rendering engine to embed Ninjecto in services rendering on request.
+"""
+
+from pathlib import Path
+from logging import getLogger
+
+from .core import Ninjecto
+
+
+log = getLogger(__name__)
+
+
+class Engine:
+    """
+    Rendering engine, safe to share between threads.
+
+    The configuration, plugins and libraries are given once, when creating
+    the engine, along with the Jinja environment whose compiled templates are
+    shared by all the renders. Libraries are scanned once too, and values are
+    never logged, see :meth:`ninjecto.core.Ninjecto.embed`. Each render gets
+    its own context, see :meth:`ninjecto.core.Ninjecto.derive`, so renders
+    called concurrently from many threads never see each other's values,
+    paths or options.
+
+    Usage:
+
+    .. code-block:: python3
+
+        from ninjecto.engine import Engine
+        from ninjecto.config import load_config
+
+        engine = Engine(load_config([]), libraries=[Path('library')])
+
+        engine.render_string('greeting', 'Hello {{ values.name }}', {
+            'name': 'world',
+        })
+        engine.render_tree('templates', 'output', {'name': 'world'})
+
+    :param dict config: Ninjecto's configuration, see
+     :func:`ninjecto.config.load_config`.
+    :param local: The local ``ninjeconf.py`` module, if any, see
+     :func:`ninjecto.local.load_local`.
+    :param dict filters: Mapping of the name of the filters to the filter
+     functions.
+    :param dict namespaces: Mapping of the name of the namespaces to the
+     namespace plugin functions.
+    :param list libraries: List of Paths to the library directories.
+    """
+
+    def __init__(
+        self, config, local=None, filters=None, namespaces=None,
+        libraries=(),
+    ):
+        self._ninjecto = Ninjecto(
+            config,
+            local,
+            filters or {},
+            namespaces or {},
+            [Path(library) for library in libraries],
+            {},
+            None,
+            None,
+            None,
+        )
+        self._ninjecto.embed()
+
+    def render_string(self, name, content, values=None, filepath=None):
+        """
+        Render a template.
+
+        Compiled templates are reused by the renders of the same name and
+        content, so each template should have its own name.
+
+        :param str name: Name of the template.
+        :param str content: The content of the template itself.
+        :param dict values: Arbitrary tree of values to pass to the template.
+        :param Path filepath: Path to the template file, if any, to call the
+         namespaces that depend on it.
+
+        :return: The rendered template.
+        :rtype: str
+        """
+        ninjecto = self._ninjecto.derive(values=values or {})
+        return ninjecto.render(name, content, filepath=filepath)
+
+    def render_tree(
+        self, source, destination, values=None, filename=None, **options
+    ):
+        """
+        Render a file or directory into a destination directory.
+
+        Files are always rendered in the calling thread, with a single job,
+        as forking worker processes from a threaded process could deadlock
+        on the locks held by its other threads.
+
+        :param Path source: Path to the source file or directory.
+        :param Path destination: Path to the directory to write the output
+         in.
+        :param dict values: Arbitrary tree of values to pass to the
+         templates.
+        :param str filename: Name of the output. Pass None to use the
+         rendered name of the source.
+        :param options: Options of the run, see
+         :meth:`ninjecto.core.Ninjecto.run`.
+
+        :return: A tuple with the number of files processed, and the number
+         of outputs written, left unchanged and skipped, see
+         :attr:`ninjecto.core.Ninjecto.summary`.
+        :rtype: tuple
+        """
+        ninjecto = self._ninjecto.derive(
+            values=values or {},
+            source=Path(source),
+            destination=Path(destination),
+            filename=filename,
+        )
+        processed = ninjecto.run(**dict(options, jobs=1))
+        return processed, ninjecto.summary
+
+
+__all__ = [
+    'Engine',
+]
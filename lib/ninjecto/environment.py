@@ -0,0 +1,82 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Jinja environment used by Ninjecto.
+"""
+
+from threading import local
+from logging import getLogger
+from contextlib import contextmanager
+
+from jinja2 import Environment
+
+from .utils.dictionary import ScopedMapping
+
+
+log = getLogger(__name__)
+
+
+class NinjectoEnvironment(Environment):
+    """
+    Jinja environment shared by all the renders of a Ninjecto context.
+
+    Compared to a regular environment:
+
+    - Its globals are a :class:`ninjecto.utils.dictionary.ScopedMapping`,
+      allowing to set globals for a single render with
+      ``environment.globals.scope()``.
+    - It can record the templates loaded while rendering, see
+      :meth:`record`, including the ones included, imported or extended.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.globals = ScopedMapping(self.globals)
+        self._recorders = local()
+
+    @contextmanager
+    def record(self):
+        """
+        Record the names of the templates loaded by the current thread
+        during the context.
+
+        :return: A set that will contain the names of the loaded templates.
+        :rtype: set
+        """
+        loaded = set()
+        previous = getattr(self._recorders, 'loaded', None)
+        self._recorders.loaded = loaded
+        try:
+            yield loaded
+        finally:
+            self._recorders.loaded = previous
+            if previous is not None:
+                previous.update(loaded)
+
+    def _load_template(self, name, globals):
+        # All the public methods to get a template, and the include, import
+        # and extends statements, load templates through this method with the
+        # full name of the template
+        loaded = getattr(self._recorders, 'loaded', None)
+        template = super()._load_template(name, globals)
+        if loaded is not None:
+            loaded.add(name)
+        return template
+
+
+__all__ = [
+    'NinjectoEnvironment',
+]
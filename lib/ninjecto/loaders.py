@@ -0,0 +1,294 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Template loaders used by the Ninjecto environment.
+"""
+
+import os
+from logging import getLogger
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from jinja2 import BaseLoader, ModuleLoader, TemplateNotFound
+from jinja2.loaders import split_template_path
+
+from .utils.hashing import fingerprint
+
+
+log = getLogger(__name__)
+
+
+class SourceLoader(BaseLoader):
+    """
+    Loader for the templates being rendered.
+
+    Unlike a ``DictLoader``, this loader is meant to live as long as the
+    environment that uses it. The source of a template is only registered
+    while it is being rendered, see :meth:`source`, so the loader doesn't
+    accumulate the content of every file of a tree.
+
+    A compiled template is considered up to date as long as the source
+    registered for its name is the same the template was compiled from,
+    allowing the environment cache to be reused across renders.
+
+    Sources are registered per thread and per asyncio task, so concurrent
+    renders never see each other's sources.
+    """
+
+    def __init__(self):
+        self._registered = ContextVar('sources', default={})
+
+    @property
+    def _sources(self):
+        return self._registered.get()
+
+    @contextmanager
+    def source(self, name, content):
+        """
+        Register the source of a template for the duration of the context.
+
+        :param str name: Name of the template.
+        :param str content: The content of the template itself.
+        """
+        # Registered sources are never changed in place, tasks inheriting
+        # them would see the changes
+        token = self._registered.set({**self._sources, name: content})
+        try:
+            yield
+        finally:
+            self._registered.reset(token)
+
+    def get_source(self, environment, template):
+        if template not in self._sources:
+            raise TemplateNotFound(template)
+
+        source = self._sources[template]
+        return source, None, lambda: self._sources.get(template) == source
+
+    def list_templates(self):
+        return sorted(self._sources)
+
+
+class LibraryLoader(BaseLoader):
+    """
+    Loader for the templates of the libraries, from an in-memory index.
+
+    The library directories are scanned once, by :meth:`scan`, building an
+    index of the names of the templates to their paths and modification
+    times. Sources are read on their first use and kept in memory, so later
+    lookups, and the checks of the compiled templates, are dictionary hits
+    instead of filesystem accesses.
+
+    Like a ``FileSystemLoader``, directories are searched left to right, the
+    first one having a template wins.
+
+    :param list searchpath: List of Paths to the library directories.
+    :param str encoding: Encoding of the templates.
+    :param bool followlinks: Follow symbolic links to directories when
+     listing the templates. Templates under them are found anyway.
+    :param bool revalidate: Check the modification time of the templates on
+     each use, reading them again if they changed, instead of relying on the
+     last scan.
+    """
+
+    def __init__(
+        self, searchpath, encoding='utf-8', followlinks=False,
+        revalidate=False,
+    ):
+        self.searchpath = [os.fspath(path) for path in searchpath]
+        self.encoding = encoding
+        self.followlinks = followlinks
+        self.revalidate = revalidate
+
+        self._index = None
+        self._sources = {}
+
+    def scan(self):
+        """
+        Scan the library directories, replacing the index.
+
+        Sources of the templates whose modification time didn't change are
+        kept.
+        """
+        index = {}
+
+        for searchpath in reversed(self.searchpath):
+            walk_dir = os.walk(searchpath, followlinks=self.followlinks)
+            for dirpath, _, filenames in walk_dir:
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, searchpath).replace(
+                        os.path.sep, '/',
+                    )
+                    try:
+                        mtime = os.stat(path).st_mtime_ns
+                    except OSError:
+                        continue
+                    index[name] = (path, mtime)
+
+        # Sources may be read by other threads while scanning
+        self._sources = {
+            name: source
+            for name, source in self._sources.copy().items()
+            if index.get(name) == source[0]
+        }
+        self._index = index
+
+        log.debug('Indexed {} library templates'.format(len(index)))
+
+    def _entry(self, template):
+        if self._index is None:
+            self.scan()
+
+        pieces = split_template_path(template)
+        name = '/'.join(pieces)
+        entry = self._index.get(name)
+        if entry is None:
+            entry = self._lookup(template, pieces)
+            self._index[name] = entry
+
+        if self.revalidate:
+            path, mtime = entry
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                raise TemplateNotFound(template)
+
+            if current != mtime:
+                entry = self._index[name] = (path, current)
+
+        return name, entry
+
+    def _lookup(self, template, pieces):
+        # Templates not listed by the scan, like the ones under symbolic
+        # links to directories when not following them, are still found,
+        # like a FileSystemLoader does
+        for searchpath in self.searchpath:
+            path = os.path.join(searchpath, *pieces)
+            if not os.path.isfile(path):
+                continue
+            try:
+                return path, os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        raise TemplateNotFound(template)
+
+    def get_source(self, environment, template):
+        name, entry = self._entry(template)
+
+        cached = self._sources.get(name)
+        if cached is None or cached[0] != entry:
+            with open(entry[0], encoding=self.encoding) as fd:
+                cached = self._sources[name] = (entry, fd.read())
+
+        def uptodate():
+            if self.revalidate:
+                try:
+                    self._entry(name)
+                except TemplateNotFound:
+                    return False
+            return self._index.get(name) == entry
+
+        return cached[1], os.path.normpath(entry[0]), uptodate
+
+    def list_templates(self):
+        if self._index is None:
+            self.scan()
+        return sorted(self._index)
+
+
+def compiled_key(name, source):
+    """
+    Key of a template in the index of the compiled templates.
+
+    The templates of the source tree are named after their paths, which
+    depend on where the tree is. Their keys are relative to the source
+    instead, prefixed with ``source/``, so the compiled templates can be used
+    with a copy of the tree anywhere. Any other template, like the ones of
+    the libraries or the names of the files, is its own key.
+
+    :param str name: Name of the template.
+    :param source: Path to the source file or directory.
+
+    :return: The key of the template.
+    :rtype: str
+    """
+    source = os.fspath(source)
+
+    if name == source:
+        return 'source/' + os.path.basename(source)
+
+    if name.startswith(os.path.join(source, '')):
+        return 'source/' + os.path.relpath(name, source).replace(
+            os.path.sep, '/',
+        )
+
+    return name
+
+
+class CompiledLoader(BaseLoader):
+    """
+    Loader for the templates precompiled to Python modules, see
+    :meth:`ninjecto.core.Ninjecto.compile`.
+
+    A compiled template is only used if the current source of the template,
+    fetched from the given loader, is the same it was compiled from.
+    Otherwise, or if the template wasn't compiled, it isn't found, so the
+    next loader can compile it from its source.
+
+    :param str directory: Path to the directory with the compiled templates.
+    :param dict templates: Index of the compiled templates, mapping their
+     keys, see :func:`compiled_key`, to their module and the hash of their
+     source.
+    :param loader: Loader of the sources of the templates.
+    :type loader: :class:`jinja2.BaseLoader`
+    :param source: Path to the source file or directory.
+    """
+
+    def __init__(self, directory, templates, loader, source):
+        self._modules = ModuleLoader(directory)
+        self._templates = templates
+        self._loader = loader
+        self._source = source
+
+    def load(self, environment, name, globals=None):
+        key = compiled_key(name, self._source)
+        entry = self._templates.get(key)
+        if entry is None:
+            raise TemplateNotFound(name)
+
+        source, _, uptodate = self._loader.get_source(environment, name)
+        if fingerprint(source) != entry['digest']:
+            log.debug('Compiled template {} is outdated'.format(name))
+            raise TemplateNotFound(name)
+
+        template = self._modules.load(environment, key, globals)
+
+        # Compiled templates are up to date as long as their source is
+        template._uptodate = uptodate
+        return template
+
+    def list_templates(self):
+        # Compiled templates are listed by the loaders of their sources
+        return []
+
+
+__all__ = [
+    'SourceLoader',
+    'LibraryLoader',
+    'CompiledLoader',
+    'compiled_key',
+]
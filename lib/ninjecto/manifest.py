@@ -0,0 +1,341 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Render manifest module, used to support incremental rebuilds.
+"""
+
+from os import replace
+from posixpath import dirname
+from json import loads, dumps
+from logging import getLogger
+
+from jinja2 import nodes, TemplateNotFound
+
+from .utils.hashing import fingerprint
+
+
+log = getLogger(__name__)
+
+
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """
+    Record of the outputs of a previous run and the inputs they were rendered
+    from.
+
+    The manifest is a JSON file mapping the path of each output, relative to
+    the destination directory, to an entry with the hashes of:
+
+    - ``template``: The source of the template, with the size and
+      modification time of the source file to avoid rehashing it.
+    - ``config``: The configuration.
+    - ``values``: The values bundle, only if the templates use them.
+    - ``libraries``: Each library template it included, imported or
+      extended.
+    - ``namespaces``: Each namespace used by the templates.
+
+    Plus the size and modification time of the output, to detect outputs
+    modified since the previous run. Directories are recorded with an empty
+    entry.
+
+    :param Path path: Path to the manifest file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    def load(self):
+        """
+        Load the manifest file, if any.
+
+        A missing, unreadable or incompatible manifest is treated as empty.
+
+        :return: This manifest.
+        :rtype: Manifest
+        """
+        try:
+            manifest = loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as e:
+            log.warning(
+                'Ignoring invalid manifest {}: {}'.format(self.path, e)
+            )
+            return self
+
+        if manifest.get('version') != MANIFEST_VERSION:
+            log.warning(
+                'Ignoring manifest {} with unsupported version {}'.format(
+                    self.path, manifest.get('version'),
+                )
+            )
+            return self
+
+        self.entries = manifest['outputs']
+        return self
+
+    def save(self, entries):
+        """
+        Atomically replace the manifest file with the entries of a run,
+        merged with the entries of the previous runs.
+
+        Runs into the same destination directory may render different
+        sources, so the previous entries are kept unless the run replaced
+        them, or they are in a directory the run walked, recorded with an
+        empty entry, as their sources no longer exist.
+
+        :param dict entries: Entries of the outputs of the run.
+        """
+        walked = {key for key, entry in entries.items() if not entry}
+        merged = {
+            key: entry
+            for key, entry in self.entries.items()
+            if key not in entries and dirname(key) not in walked
+        }
+        merged.update(entries)
+        entries = self.entries = merged
+
+        temporary = self.path.with_name(self.path.name + '.tmp')
+
+        temporary.write_text(
+            dumps({
+                'version': MANIFEST_VERSION,
+                'outputs': entries,
+            }, indent=2, sort_keys=True),
+            encoding='utf-8',
+        )
+        replace(temporary, self.path)
+
+
+class Snapshot:
+    """
+    Current state of the inputs of a run, computed lazily and memoized.
+
+    :param environment: Environment used to render the templates.
+    :type environment: :class:`ninjecto.environment.NinjectoEnvironment`
+    :param OrderedDict namespaces: Instanced namespaces.
+    :param dict values: Values bundle of the run.
+    :param config: Configuration of the run.
+    """
+
+    def __init__(self, environment, namespaces, values, config):
+        self._environment = environment
+        self._namespaces = namespaces
+        self._values = values
+        self._config = config
+
+        self._memo = {}
+        self._names = {}
+        self._snapshots = {}
+
+    def _memoize(self, key, function):
+        if key not in self._memo:
+            self._memo[key] = function()
+        return self._memo[key]
+
+    def config(self):
+        return self._memoize(
+            ('config', ), lambda: fingerprint(self._config),
+        )
+
+    def values(self):
+        return self._memoize(
+            ('values', ), lambda: fingerprint(self._values),
+        )
+
+    def library(self, name):
+        """
+        Hash of the current source of a library template.
+
+        :param str name: Name of the library template.
+
+        :return: The hash, or None if the template no longer exists.
+        :rtype: str
+        """
+        def compute():
+            environment = self._environment
+            try:
+                source, _, _ = environment.loader.get_source(
+                    environment, name,
+                )
+            except TemplateNotFound:
+                return None
+            return fingerprint(source)
+
+        return self._memoize(('library', name), compute)
+
+    def names(self, source):
+        """
+        Names of the variables a template source uses.
+
+        This includes the names of local variables, which is conservative but
+        unlike ``jinja2.meta.find_undeclared_variables`` includes the
+        variables that are globals of the environment, like the namespaces.
+
+        :param str source: Source of the template.
+
+        :return: Set of names.
+        :rtype: set
+        """
+        key = fingerprint(source)
+        if key not in self._names:
+            self._names[key] = {
+                node.name
+                for node in self._environment.parse(source).find_all(
+                    nodes.Name,
+                )
+                if node.ctx == 'load'
+            }
+        return self._names[key]
+
+    def namespace(self, nskey, filepath):
+        """
+        Hash of the snapshot of a namespace.
+
+        Dynamic namespaces are called with the file being rendered.
+
+        :param str nskey: Name of the namespace.
+        :param Path filepath: Path to the template file.
+
+        :return: The hash of the namespace.
+        :rtype: str
+        """
+        ns = self._namespaces[nskey]
+        if callable(ns):
+            ns = ns(filepath)
+
+        # Keep a reference to the namespace so its id isn't reused
+        key = id(ns)
+        if key not in self._snapshots:
+            self._snapshots[key] = (ns, fingerprint(ns))
+        return self._snapshots[key][1]
+
+    def record(self, src, content, loaded):
+        """
+        Create the entry of an output with the state of its inputs.
+
+        :param Path src: Path to the source file.
+        :param content: Content of the source file. Bytes for the files that
+         are copied without being rendered.
+        :type content: str or bytes
+        :param set loaded: Names of the templates loaded while rendering it.
+
+        :return: The entry, without the output state.
+        :rtype: dict
+        """
+        stat = src.stat()
+        binary = isinstance(content, bytes)
+        names = set() if binary else set(self.names(content))
+
+        libraries = {}
+        for name in sorted(loaded - {str(src)}):
+            libraries[name] = self.library(name)
+            source, _, _ = self._environment.loader.get_source(
+                self._environment, name,
+            )
+            names.update(self.names(source))
+
+        return {
+            'template': {
+                'hash': fingerprint(content),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'binary': binary,
+            },
+            'config': self.config(),
+            'values': self.values() if 'values' in names else None,
+            'libraries': libraries,
+            'namespaces': {
+                nskey: self.namespace(nskey, src)
+                for nskey in sorted(names)
+                if nskey in self._namespaces
+            },
+        }
+
+    def fresh(self, entry, src, dst):
+        """
+        Check if an output is up to date with its inputs.
+
+        :param dict entry: Entry of the output in the previous manifest.
+        :param Path src: Path to the source file.
+        :param Path dst: Path to the output file.
+
+        :return: True if the output doesn't need to be rendered again.
+        :rtype: bool
+        """
+        if not entry or 'output' not in entry:
+            return False
+
+        # Check the output wasn't modified or removed
+        try:
+            stat = dst.stat()
+        except FileNotFoundError:
+            return False
+
+        output = entry['output']
+        if (stat.st_size, stat.st_mtime_ns) != (
+            output['size'], output['mtime_ns'],
+        ):
+            return False
+
+        # Check the template, hashing it only if the file changed
+        stat = src.stat()
+        template = entry['template']
+        if (stat.st_size, stat.st_mtime_ns) != (
+            template['size'], template['mtime_ns'],
+        ):
+            if template.get('binary'):
+                content = src.read_bytes()
+            else:
+                try:
+                    content = src.read_text(
+                        encoding=self._config.ninjecto.input.encoding,
+                    )
+                except UnicodeDecodeError:
+                    return False
+            if fingerprint(content) != template['hash']:
+                return False
+
+            # Only the metadata of the file changed, avoid rehashing it
+            template['size'] = stat.st_size
+            template['mtime_ns'] = stat.st_mtime_ns
+
+        if entry['config'] != self.config():
+            return False
+
+        if entry['values'] is not None and entry['values'] != self.values():
+            return False
+
+        for name, digest in entry['libraries'].items():
+            if self.library(name) != digest:
+                return False
+
+        for nskey, digest in entry['namespaces'].items():
+            if nskey not in self._namespaces:
+                return False
+            if self.namespace(nskey, src) != digest:
+                return False
+
+        return True
+
+
+__all__ = [
+    'Manifest',
+    'Snapshot',
+]
@@ -0,0 +1,194 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Atomic output writing module.
+"""
+
+from os import replace
+from logging import getLogger
+from collections import Counter
+
+from .utils.fs import fsync_path, sync_files
+
+
+log = getLogger(__name__)
+
+
+DURABILITY_MODES = ('none', 'per-file', 'per-directory', 'end-of-run')
+
+
+def temporary_path(dst):
+    """
+    Path of the temporary file an output is written to before being renamed
+    into place.
+
+    The path is derived from the output path only, so any process can find
+    the temporary file of an output.
+
+    :param Path dst: Path to the output.
+
+    :return: Path to the temporary file, in the same directory.
+    :rtype: Path
+    """
+    return dst.with_name('.{}.ninjecto-tmp'.format(dst.name))
+
+
+class Transaction:
+    """
+    Commit outputs written atomically to temporary files.
+
+    Outputs are written to a temporary file in the same directory, see
+    :func:`temporary_path`, and renamed into place, so an interrupted run
+    never leaves a partially written output behind. The durability mode
+    controls how outputs are flushed to the storage device:
+
+    ``none``
+      Outputs are renamed as soon as they are written, and never flushed.
+
+    ``per-file``
+      Each output is flushed before being renamed, and its directory after.
+
+    ``per-directory``
+      Outputs are renamed once all the outputs of their directory were
+      written. Then, their data is flushed at once, they are renamed, and the
+      directory is flushed.
+
+    ``end-of-run``
+      Like ``per-directory``, but all outputs are renamed at the end of the
+      run, see :meth:`close`.
+
+    On batched modes the data of the outputs can be flushed with a single
+    ``syncfs`` per filesystem instead of one ``fsync`` per output, see
+    :func:`ninjecto.utils.fs.sync_files`.
+
+    :param str durability: Durability mode.
+    :param list outputs: Paths to all the outputs of the run.
+    :param Path root: Destination directory of the run.
+    :param bool syncfs: Flush the data of batched outputs with ``syncfs``.
+    """
+
+    def __init__(self, durability, outputs, root, syncfs=False):
+        self.durability = durability
+        self.batched = durability in ('per-directory', 'end-of-run')
+        self.syncfs = syncfs
+
+        self._outputs = outputs
+        self._root = root
+        self._remaining = Counter(dst.parent for dst in outputs)
+        self._pending = {}
+        self._directories = set()
+
+    def write(self, dst):
+        """
+        Finish writing an output to its temporary file.
+
+        Unless batched, the output is committed right away. This is safe to
+        call in worker processes.
+
+        :param Path dst: Path to the output.
+        """
+        if self.batched:
+            return
+
+        tmp = temporary_path(dst)
+        if self.durability == 'per-file':
+            fsync_path(tmp)
+
+        replace(tmp, dst)
+
+        if self.durability == 'per-file':
+            fsync_path(dst.parent)
+
+    def done(self, dst, written=True):
+        """
+        Register that an output was processed, committing its batch if it
+        was the last output of the batch.
+
+        Must be called in the process that created the transaction.
+
+        :param Path dst: Path to the output.
+        :param bool written: False if the output was left untouched, so
+         there is nothing to commit.
+        """
+        if not self.batched:
+            return
+
+        directory = dst.parent
+        if written:
+            self._pending.setdefault(directory, []).append(dst)
+        self._remaining[directory] -= 1
+
+        if self.durability == 'per-directory' \
+                and not self._remaining[directory]:
+            self._commit([directory])
+
+    def _commit(self, directories):
+        outputs = [
+            dst
+            for directory in directories
+            for dst in self._pending.pop(directory, [])
+        ]
+        if not outputs:
+            return
+
+        log.debug('Committing {} outputs ...'.format(len(outputs)))
+
+        sync_files(
+            [temporary_path(dst) for dst in outputs], syncfs=self.syncfs,
+        )
+        for dst in outputs:
+            replace(temporary_path(dst), dst)
+
+        for directory in directories:
+            fsync_path(directory)
+            self._directories.add(directory)
+
+    def close(self):
+        """
+        Commit the pending outputs, and flush the parents of the directories
+        that received outputs, up to the destination directory, so new
+        directories are durable too.
+        """
+        self._commit(list(self._pending))
+
+        if self.durability == 'none':
+            return
+
+        root = self._root
+        parents = set()
+        for directory in self._remaining:
+            parents.update(
+                parent for parent in directory.parents
+                if parent == root or root in parent.parents
+            )
+
+        for parent in sorted(parents - self._directories):
+            fsync_path(parent)
+
+    def abort(self):
+        """
+        Remove the temporary files of the outputs not committed yet.
+        """
+        self._pending.clear()
+        for dst in self._outputs:
+            temporary_path(dst).unlink(missing_ok=True)
+
+
+__all__ = [
+    'DURABILITY_MODES',
+    'temporary_path',
+    'Transaction',
+]
@@ -0,0 +1,190 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Overlapped read, process and write pipeline module.
+"""
+
+from logging import getLogger
+from collections import deque
+from threading import Condition, Thread
+
+
+log = getLogger(__name__)
+
+
+class QueueClosed(Exception):
+    """
+    Typed exception raised when using a closed :class:`BudgetQueue`.
+    """
+    pass
+
+
+class BudgetQueue:
+    """
+    FIFO queue bounded by the total size of its items.
+
+    Producers block while adding an item would exceed the budget. An item
+    larger than the budget is still accepted when the queue is empty, so the
+    pipeline never deadlocks on a single large item.
+
+    :param int budget: Maximum total size of the items in the queue.
+    """
+
+    def __init__(self, budget):
+        self._budget = budget
+        self._used = 0
+        self._items = deque()
+        self._closed = False
+        self._condition = Condition()
+
+    def put(self, item, size):
+        """
+        Add an item to the queue, waiting for budget to be available.
+
+        :param item: Item to add.
+        :param int size: Size of the item, accounted against the budget.
+
+        :raises QueueClosed: If the queue was closed.
+        """
+        with self._condition:
+            while (
+                not self._closed and self._items and
+                self._used + size > self._budget
+            ):
+                self._condition.wait()
+
+            if self._closed:
+                raise QueueClosed()
+
+            self._items.append((item, size))
+            self._used += size
+            self._condition.notify_all()
+
+    def get(self):
+        """
+        Remove and return the next item, waiting for one to be available.
+
+        :return: The next item.
+
+        :raises QueueClosed: If the queue was closed and has no more items.
+        """
+        with self._condition:
+            while not self._items and not self._closed:
+                self._condition.wait()
+
+            if not self._items:
+                raise QueueClosed()
+
+            item, size = self._items.popleft()
+            self._used -= size
+            self._condition.notify_all()
+            return item
+
+    def close(self, discard=False):
+        """
+        Close the queue.
+
+        Consumers can still get the remaining items, unless discarded.
+
+        :param bool discard: Discard the remaining items.
+        """
+        with self._condition:
+            self._closed = True
+            if discard:
+                self._items.clear()
+                self._used = 0
+            self._condition.notify_all()
+
+
+def pipeline(items, read, process, write, budget, sizeof=len):
+    """
+    Process items overlapping their reading and writing with the processing.
+
+    A reader thread calls ``read(item)`` ahead of the processing, and a
+    writer thread calls ``write(item, result)`` for the already processed
+    items, while the calling thread calls ``process(item, data)``. The data
+    read and the results pending to be written are bounded by half the
+    budget each.
+
+    If any stage fails, the others are stopped and the first error is raised.
+
+    :param iterable items: Items to process.
+    :param function read: Function returning the data of an item.
+    :param function process: Function returning the result of processing the
+     data of an item.
+    :param function write: Function writing the result of an item.
+    :param int budget: Maximum total size of the data and results in flight.
+    :param function sizeof: Function returning the size of a data or result.
+    """
+    inbox = BudgetQueue(budget // 2)
+    outbox = BudgetQueue(budget // 2)
+    errors = []
+
+    def abort(error):
+        errors.append(error)
+        inbox.close(discard=True)
+        outbox.close(discard=True)
+
+    def reader():
+        try:
+            for item in items:
+                data = read(item)
+                inbox.put((item, data), sizeof(data))
+            inbox.close()
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            abort(e)
+
+    def writer():
+        try:
+            while True:
+                item, result = outbox.get()
+                write(item, result)
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            abort(e)
+
+    threads = [
+        Thread(target=reader, name='ninjecto-reader', daemon=True),
+        Thread(target=writer, name='ninjecto-writer', daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item, data = inbox.get()
+            result = process(item, data)
+            outbox.put((item, result), sizeof(result))
+    except QueueClosed:
+        outbox.close()
+    except BaseException as e:
+        abort(e)
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+__all__ = [
+    'QueueClosed',
+    'BudgetQueue',
+    'pipeline',
+]
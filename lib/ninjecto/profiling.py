@@ -0,0 +1,336 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Profiling of the renders, per processed path.
+"""
+
+from json import dumps
+from threading import Lock
+from time import perf_counter
+from logging import getLogger
+from collections import OrderedDict
+
+from jinja2 import TemplateNotFound, TemplateSyntaxError, nodes
+from jinja2.meta import find_referenced_templates
+
+
+log = getLogger(__name__)
+
+
+# Timings of each entry, in seconds
+TIMINGS = ('filename', 'compile', 'render', 'write')
+
+
+class Profiler:
+    """
+    Profiler of the time spent on each processed path.
+
+    For each source path, it records the time spent rendering its name,
+    loading and compiling its template, rendering it and writing its
+    output, the bytes written, and the namespaces and filters referenced by
+    its template and the templates it includes, imports or extends. For
+    streamed outputs, the render time is part of the write time.
+
+    Namespaces and filters are found statically, in the syntax tree of the
+    templates, instead of being recorded as they are used. They may be
+    referenced in branches that are never rendered, and templates whose
+    names are only known when rendering aren't followed.
+
+    A :class:`ninjecto.core.Ninjecto` run only profiles when given a
+    profiler, otherwise it doesn't pay for it.
+
+    :param int top: Number of slowest paths to log at the end of a run.
+    """
+
+    def __init__(self, top=10):
+        self.top = top
+        self.entries = OrderedDict()
+
+        self._namespaces = set()
+        self._analyzed = {}
+        self._lock = Lock()
+
+    def start(self, namespaces):
+        """
+        Start profiling a run.
+
+        :param list namespaces: Names of the namespaces available to the
+         templates.
+        """
+        self._namespaces = set(namespaces)
+
+    def entry(self, src):
+        """
+        Get the entry of a source path, creating it if needed.
+
+        :param Path src: Path to the source file or directory.
+
+        :return: The entry.
+        :rtype: dict
+        """
+        key = str(src)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {
+                    'destination': None,
+                    'filename': 0.0,
+                    'compile': 0.0,
+                    'render': 0.0,
+                    'write': 0.0,
+                    'bytes': 0,
+                    'referenced_namespaces': [],
+                    'referenced_filters': [],
+                }
+        return entry
+
+    def template(self, environment, name, filepath):
+        """
+        Get a template from the environment, timing it as the compile time of
+        the path.
+
+        :param environment: The environment to get the template from.
+        :type environment: :class:`jinja2.Environment`
+        :param str name: Name of the template.
+        :param Path filepath: Path to the template file.
+
+        :return: The template.
+        :rtype: :class:`jinja2.Template`
+        """
+        start = perf_counter()
+        template = environment.get_template(name)
+        elapsed = perf_counter() - start
+
+        entry = self.entry(filepath)
+        entry['compile'] += elapsed
+
+        namespaces, filters = self._analyze(environment, name)
+        entry['referenced_namespaces'] = sorted(
+            set(entry['referenced_namespaces']) | namespaces
+        )
+        entry['referenced_filters'] = sorted(
+            set(entry['referenced_filters']) | filters
+        )
+        return template
+
+    def render(self, environment, name, filepath):
+        """
+        Get and render a template, timing it.
+
+        Templates named as their path are the content of the file, any other
+        is its name.
+
+        :param environment: The environment to get the template from.
+        :type environment: :class:`jinja2.Environment`
+        :param str name: Name of the template.
+        :param Path filepath: Path to the template file, if any.
+
+        :return: The rendered template.
+        :rtype: str
+        """
+        if filepath is None:
+            return environment.get_template(name).render()
+
+        if name != str(filepath):
+            start = perf_counter()
+            rendered = environment.get_template(name).render()
+            self.entry(filepath)['filename'] += perf_counter() - start
+            return rendered
+
+        template = self.template(environment, name, filepath)
+
+        start = perf_counter()
+        rendered = template.render()
+        self.entry(filepath)['render'] += perf_counter() - start
+        return rendered
+
+    def write(self, write, paths, content):
+        """
+        Write an output, timing it.
+
+        :param write: Function writing the output.
+        :param tuple paths: Source and destination paths of the file.
+        :param content: The content to write.
+
+        :return: The result of the write function.
+        """
+        src, dst = paths
+
+        start = perf_counter()
+        status = write(paths, content)
+        elapsed = perf_counter() - start
+
+        entry = self.entry(src)
+        entry['write'] += elapsed
+        entry['destination'] = str(dst)
+        return status
+
+    def written(self, src, size):
+        """
+        Record the bytes written to an output.
+
+        Outputs written in a transaction are only renamed into place when it
+        commits, so the size is taken from the file actually written.
+
+        :param Path src: Path to the source file.
+        :param int size: Size of the written file, in bytes.
+        """
+        self.entry(src)['bytes'] += size
+
+    def _analyze(self, environment, name):
+        """
+        Find the namespaces and filters referenced by a template and the
+        templates it references.
+
+        :return: A tuple with the sets of names of the namespaces and the
+         filters.
+        :rtype: tuple
+        """
+        namespaces = set()
+        filters = set()
+
+        pending = [name]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+
+            references = self._references(environment, current)
+            if references is None:
+                continue
+            namespaces |= references[0]
+            filters |= references[1]
+            pending.extend(references[2])
+
+        return namespaces, filters
+
+    def _references(self, environment, name):
+        """
+        Find the namespaces, filters and templates a single template
+        references.
+
+        :return: A tuple with the sets of names of the namespaces, the filters
+         and the templates, or None if the template can't be loaded.
+        :rtype: tuple
+        """
+        try:
+            source, _, _ = environment.loader.get_source(environment, name)
+        except TemplateNotFound:
+            return None
+
+        key = (name, source)
+        if key not in self._analyzed:
+            try:
+                ast = environment.parse(source)
+            except TemplateSyntaxError:
+                return None
+
+            self._analyzed[key] = (
+                {
+                    node.name for node in ast.find_all(nodes.Name)
+                    if node.ctx == 'load'
+                } & self._namespaces,
+                {node.name for node in ast.find_all(nodes.Filter)},
+                {
+                    template for template in find_referenced_templates(ast)
+                    if template is not None
+                },
+            )
+        return self._analyzed[key]
+
+    def pop(self, src):
+        """
+        Remove the entry of a source path, to be merged in another profiler.
+
+        :param Path src: Path to the source file or directory.
+
+        :return: The entry, or None if there is none.
+        :rtype: dict
+        """
+        with self._lock:
+            return self.entries.pop(str(src), None)
+
+    def merge(self, src, other):
+        """
+        Merge the entry of a source path profiled elsewhere, for example in
+        a worker process.
+
+        :param Path src: Path to the source file or directory.
+        :param dict other: The entry to merge.
+        """
+        entry = self.entry(src)
+        for key in TIMINGS + ('bytes', ):
+            entry[key] += other[key]
+        for key in ('referenced_namespaces', 'referenced_filters'):
+            entry[key] = sorted(set(entry[key]) | set(other[key]))
+        entry['destination'] = other['destination'] or entry['destination']
+
+    def slowest(self, count):
+        """
+        Get the slowest paths.
+
+        :param int count: Number of paths to get.
+
+        :return: List of tuples with the source path, its total time and its
+         entry, slowest first.
+        :rtype: list
+        """
+        totals = [
+            (path, sum(entry[key] for key in TIMINGS), entry)
+            for path, entry in self.entries.items()
+        ]
+        totals.sort(key=lambda total: total[1], reverse=True)
+        return totals[:count]
+
+    def summary(self):
+        """
+        Log the slowest paths.
+        """
+        slowest = self.slowest(self.top)
+        if not slowest:
+            return
+
+        lines = ['{} slowest paths:'.format(len(slowest))]
+        for path, total, entry in slowest:
+            lines.append(
+                '  {:9.3f}ms {} (filename {:.3f}ms, compile {:.3f}ms, '
+                'render {:.3f}ms, write {:.3f}ms, {} bytes)'.format(
+                    total * 1000, path,
+                    *(entry[key] * 1000 for key in TIMINGS),
+                    entry['bytes'],
+                )
+            )
+        log.info('\n'.join(lines))
+
+    def save(self, path):
+        """
+        Save the report of the profiled paths as JSON.
+
+        :param Path path: Path to the report file.
+        """
+        path.write_text(dumps({
+            'paths': self.entries,
+            'slowest': [
+                source for source, _, _ in self.slowest(self.top)
+            ],
+        }, indent=4), encoding='utf-8')
+
+
+__all__ = [
+    'Profiler',
+]
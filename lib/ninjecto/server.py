@@ -0,0 +1,331 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Render daemon, keeping configuration, plugins and compiled templates loaded
+between renders.
+"""
+
+from io import StringIO
+from os import chdir, environ, getcwd, umask
+from pathlib import Path
+from threading import Lock
+from logging import getLogger
+from contextlib import contextmanager
+from collections import OrderedDict
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+
+from .core import Ninjecto
+from .local import load_local
+from .config import find_configs, load_config
+from .values import load_values
+from .inputs import load_content
+from .utils.types import autocast
+from .utils.dictionary import update
+from .client import send_message, receive_message
+from .plugins.filters import FiltersLoader
+from .plugins.namespaces import NamespacesLoader
+
+
+log = getLogger(__name__)
+
+
+# Environment variables read to find the configuration files, see
+# :func:`ninjecto.config.find_configs`, including the ones used to find the
+# root of the git repository
+CONFIG_ENVIRON = (
+    'HOME', 'XDG_CONFIG_HOME', 'PATH',
+    'GIT_DIR', 'GIT_WORK_TREE', 'GIT_CEILING_DIRECTORIES',
+    'GIT_DISCOVERY_ACROSS_FILESYSTEM',
+)
+
+
+class RenderServer:
+    """
+    Render jobs sent by clients, reusing everything that can be reused.
+
+    Plugins are loaded once. Configurations are loaded once per working
+    directory, environment variables used to find them, see
+    :data:`CONFIG_ENVIRON`, and list of configuration files of the clients,
+    and loaded again when any of the files they were loaded from change.
+    :class:`ninjecto.core.Ninjecto` instances, with their compiled
+    templates, are kept per source, destination, libraries, working
+    directory and configuration. Both are kept up to a maximum, the least
+    recently used are dropped first.
+
+    Instances aren't kept per environment, as build systems set variables
+    that change on every call. Instead, the namespaces of an instance are
+    loaded again when the environment of a job differs from the one of the
+    previous job rendered with it.
+
+    Jobs are rendered one at a time, in the working directory and with the
+    environment of their client, so configurations and namespaces see what
+    they would see in the command line. Jobs are also rendered with a single
+    job, as forking worker processes from a threaded server could deadlock
+    on the locks held by its other threads.
+
+    :param list configs: Configuration files to load for the jobs that don't
+     set any.
+    :param int max_instances: Maximum number of instances, and of
+     configurations, to keep.
+    """
+
+    def __init__(self, configs=(), max_instances=32):
+        self._configs = [Path(path) for path in configs]
+        self._max_instances = max_instances
+
+        self._filters = FiltersLoader().load_functions()
+        self._namespaces = NamespacesLoader().load_functions()
+
+        self._loaded = OrderedDict()
+        self._instances = OrderedDict()
+        self._environs = {}
+        self._lock = Lock()
+
+        # Fail on broken configuration files now, not on the first job
+        self._config(self._configs)
+
+    def _config(self, configs):
+        """
+        Get the configuration for the current working directory and
+        environment, loading it again if its files changed.
+
+        :param list configs: Configuration files to load.
+
+        :return: A tuple with the configuration and the state of the files it
+         was loaded from.
+        :rtype: tuple
+        """
+        key = (getcwd(), _discovery(environ), tuple(configs))
+
+        loaded = self._loaded.get(key)
+        files = find_configs(configs) if loaded is None else loaded[0]
+        state = tuple(_mtime(path) for path in files)
+
+        if loaded is None or loaded[1] != state:
+            if loaded is not None:
+                log.info('Configuration changed, loading it again ...')
+            loaded = (files, state, load_config(list(configs)))
+
+        self._loaded[key] = loaded
+        self._loaded.move_to_end(key)
+        if len(self._loaded) > self._max_instances:
+            self._loaded.popitem(last=False)
+
+        return loaded[2], state
+
+    def _instance(self, job):
+        """
+        Get the instance to render a job with, creating it if needed.
+
+        Must be called in the context of the client of the job, see
+        :func:`client_context`.
+
+        :param dict job: The job.
+
+        :rtype: :class:`ninjecto.core.Ninjecto`
+        """
+        source = Path(job['source'])
+        configs = [Path(path) for path in job['configs']] or self._configs
+        libraries = [Path(path) for path in job['libraries']]
+
+        if job['stdout']:
+            destination, filename = None, None
+        elif job['output_in']:
+            destination, filename = Path(job['destination']), None
+        else:
+            destination = Path(job['destination']).parent
+            filename = Path(job['destination']).name
+
+        config, state = self._config(configs)
+
+        key = (
+            source, destination, filename, tuple(libraries), tuple(configs),
+            job['cwd'], _discovery(job['environ']), state,
+        )
+        environment = _frozen(job['environ'])
+
+        ninjecto = self._instances.get(key)
+        if ninjecto is not None:
+            self._instances.move_to_end(key)
+            if self._environs[key] != environment:
+                ninjecto.reload_namespaces()
+                self._environs[key] = environment
+            return ninjecto
+
+        ninjecto = Ninjecto(
+            config,
+            load_local(source.parent),
+            self._filters,
+            self._namespaces,
+            libraries,
+            {},
+            source,
+            destination,
+            filename,
+        )
+
+        self._instances[key] = ninjecto
+        self._environs[key] = environment
+        if len(self._instances) > self._max_instances:
+            dropped, _ = self._instances.popitem(last=False)
+            del self._environs[dropped]
+
+        return ninjecto
+
+    def render(self, job):
+        """
+        Render a job.
+
+        :param dict job: The job, see :func:`ninjecto.client.job_from_args`.
+
+        :return: The result of the job, see :func:`ninjecto.client.request`.
+        :rtype: dict
+        """
+        # Values were parsed by the client, restore the types lost in JSON
+        values = OrderedDict(
+            (key, autocast(value) if isinstance(value, str) else value)
+            for key, value in job['values'].items()
+        )
+        bundle = load_values(
+            [Path(path) for path in job['values_files']], values, None,
+        )
+        if job['values_in']:
+            piped = load_content(
+                job['values_in']['content'], job['values_in']['format'],
+            )
+            if piped:
+                update(bundle, piped)
+
+        with self._lock, client_context(job['cwd'], job['environ']):
+            ninjecto = self._instance(job)
+            ninjecto.update_values(bundle)
+
+            if job['stdout']:
+                output = StringIO()
+                processed = ninjecto.dump(output)
+                return {'result': {
+                    'processed': processed,
+                    'summary': {},
+                    'output': output.getvalue(),
+                }}
+
+            processed = ninjecto.run(**dict(job['options'], jobs=1))
+            return {'result': {
+                'processed': processed,
+                'summary': dict(ninjecto.summary),
+                'output': None,
+            }}
+
+
+def _frozen(mapping):
+    return tuple(sorted(mapping.items()))
+
+
+def _discovery(environment):
+    return tuple((name, environment.get(name)) for name in CONFIG_ENVIRON)
+
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@contextmanager
+def client_context(cwd, environment):
+    """
+    Change the working directory and the environment of the process to the
+    ones of a client, restoring them when done.
+
+    :param str cwd: Working directory of the client.
+    :param dict environment: Environment variables of the client.
+    """
+    previous_cwd = getcwd()
+    previous_environment = dict(environ)
+
+    chdir(cwd)
+    environ.clear()
+    environ.update(environment)
+    try:
+        yield
+    finally:
+        chdir(previous_cwd)
+        environ.clear()
+        environ.update(previous_environment)
+
+
+class RenderHandler(StreamRequestHandler):
+    """
+    Handle the connections of the clients, one job per connection.
+    """
+
+    def handle(self):
+        job = receive_message(self.rfile)
+        if job is None:
+            return
+
+        log.info('Rendering {} ...'.format(job.get('source')))
+        try:
+            response = self.server.renderer.render(job)
+        except Exception as e:
+            log.exception('Job failed')
+            response = {'error': '{}: {}'.format(type(e).__name__, e)}
+
+        send_message(self.connection, response)
+
+
+def serve(path, configs=(), max_instances=32):
+    """
+    Run the render daemon until interrupted.
+
+    :param Path path: Path to the Unix socket to listen on. A stale socket
+     left by a previous daemon is replaced.
+    :param list configs: Configuration files to load for the jobs that don't
+     set any.
+    :param int max_instances: Maximum number of instances to keep.
+    """
+    renderer = RenderServer(configs, max_instances)
+
+    path = Path(path)
+    if path.is_socket():
+        path.unlink()
+
+    # Only the user can connect, from the moment the socket is created
+    previous = umask(0o177)
+    try:
+        server = ThreadingUnixStreamServer(str(path), RenderHandler)
+    finally:
+        umask(previous)
+
+    with server:
+        server.renderer = renderer
+        log.info('Listening on {} ...'.format(path))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
+
+
+__all__ = [
+    'RenderServer',
+    'RenderHandler',
+    'client_context',
+    'serve',
+]
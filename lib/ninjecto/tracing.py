@@ -0,0 +1,208 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tracing of the phases of a run, exported in the trace event format of
+Chrome and Perfetto.
+
+Tracing is global to the process, so any module can record spans without
+passing a tracer around:
+
+.. code-block:: python3
+
+    from ninjecto.tracing import span, start_tracing, stop_tracing
+
+    start_tracing()
+    with span('load_config'):
+        ...
+    stop_tracing().save(Path('trace.json'))
+
+When tracing isn't started, :func:`span` does nothing.
+"""
+
+from os import getpid
+from json import dumps
+from threading import Lock, get_ident
+from time import perf_counter
+from logging import getLogger
+from contextlib import contextmanager, nullcontext
+
+
+log = getLogger(__name__)
+
+
+class Tracer:
+    """
+    Recorder of spans, as complete events of the trace event format.
+
+    :param float origin: Time, from ``time.perf_counter``, the timestamps of
+     the events are relative to. Defaults to the creation of the tracer.
+    """
+
+    def __init__(self, origin=None):
+        self.events = []
+        self._origin = perf_counter() if origin is None else origin
+        self._pid = getpid()
+        self._lock = Lock()
+
+    def add(self, name, start, end, category='ninjecto', **args):
+        """
+        Record a span.
+
+        :param str name: Name of the span.
+        :param float start: Start of the span, from ``time.perf_counter``.
+        :param float end: End of the span, from ``time.perf_counter``.
+        :param str category: Category of the span.
+        :param args: Arguments to show with the span.
+        """
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': getpid(),
+            'tid': get_ident(),
+        }
+        if args:
+            event['args'] = args
+
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, category='ninjecto', **args):
+        """
+        Record a span for the duration of the context.
+
+        See :meth:`add`.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, perf_counter(), category, **args)
+
+    def collect(self):
+        """
+        Remove the recorded events, to be merged in the tracer of another
+        process, for example by a worker process.
+
+        :return: The events.
+        :rtype: list
+        """
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def merge(self, events):
+        """
+        Merge the events collected in another process.
+
+        :param list events: The events, see :meth:`collect`.
+        """
+        with self._lock:
+            self.events.extend(events)
+
+    def save(self, path):
+        """
+        Save the events as trace event JSON, loadable in ``chrome://tracing``
+        or in the Perfetto UI.
+
+        :param Path path: Path to the trace file.
+        """
+        metadata = [
+            {
+                'name': 'process_name',
+                'ph': 'M',
+                'pid': pid,
+                'args': {
+                    'name': 'ninjecto' if pid == self._pid else
+                    'ninjecto worker',
+                },
+            }
+            for pid in sorted({event['pid'] for event in self.events})
+        ]
+
+        path.write_text(dumps({
+            'traceEvents': metadata + self.events,
+            'displayTimeUnit': 'ms',
+        }), encoding='utf-8')
+        log.info('Trace of {} spans written to {}'.format(
+            len(self.events), path,
+        ))
+
+
+# Tracer of this process, set by start_tracing
+_tracer = None
+_disabled = nullcontext()
+
+
+def start_tracing(origin=None):
+    """
+    Start tracing this process.
+
+    :param float origin: Time the timestamps are relative to, see
+     :class:`Tracer`.
+
+    :return: The tracer recording the spans.
+    :rtype: :class:`Tracer`
+    """
+    global _tracer
+    _tracer = Tracer(origin)
+    return _tracer
+
+
+def stop_tracing():
+    """
+    Stop tracing this process.
+
+    :return: The tracer that recorded the spans, or None if tracing wasn't
+     started.
+    :rtype: :class:`Tracer`
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def tracer():
+    """
+    Get the tracer of this process.
+
+    :return: The tracer, or None if tracing isn't started.
+    :rtype: :class:`Tracer`
+    """
+    return _tracer
+
+
+def span(name, category='ninjecto', **args):
+    """
+    Record a span for the duration of the context, if tracing.
+
+    See :meth:`Tracer.add`.
+    """
+    if _tracer is None:
+        return _disabled
+    return _tracer.span(name, category, **args)
+
+
+__all__ = [
+    'Tracer',
+    'start_tracing',
+    'stop_tracing',
+    'tracer',
+    'span',
+]
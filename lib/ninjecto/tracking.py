@@ -0,0 +1,235 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Recording of the values read by templates.
+"""
+
+from logging import getLogger
+from collections.abc import Mapping
+
+from .utils.hashing import fingerprint
+from .utils.dictionary import Namespace
+
+
+log = getLogger(__name__)
+
+
+MISSING = 'missing'
+
+
+def digest(value):
+    """
+    Hash of a value read by a template.
+
+    :param value: The value read, or :data:`MISSING` if it didn't exist.
+
+    :return: The hash of the value.
+    :rtype: str
+    """
+    if value is MISSING:
+        return MISSING
+    return fingerprint(value)
+
+
+def resolve(root, path):
+    """
+    Get the value at the given path, the same way a recorder read it.
+
+    :param root: Mapping or Namespace to resolve the path in.
+    :param list path: Keys to the value.
+
+    :return: The value, or :data:`MISSING` if it doesn't exist.
+    """
+    value = root
+    for key in path:
+        if not isinstance(value, (Mapping, Namespace)):
+            return MISSING
+        try:
+            value = value[key]
+        except KeyError:
+            return MISSING
+    return value
+
+
+class Recorder:
+    """
+    Recorder of the paths of the values read through its proxies.
+
+    Usage:
+
+    .. code-block:: python3
+
+        >>> recorder = Recorder()
+        >>> values = recorder.wrap('values', {'a': {'b': 1, 'c': 2}})
+        >>> values['a']['b']
+        1
+        >>> sorted(recorder.paths)
+        [('values', ('a', 'b'))]
+    """
+
+    def __init__(self):
+        self.paths = {}
+
+    def wrap(self, root, value, path=()):
+        """
+        Wrap a value in a recording proxy, if it is a mapping or namespace.
+
+        :param str root: Name of the root of the path, for example
+         ``values`` or the name of a namespace.
+        :param value: The value to wrap.
+        :param tuple path: Keys to the value from the root.
+
+        :return: A proxy recording the reads on the value, or the value itself
+         if it can't be proxied, in which case it is recorded as read.
+        """
+        if isinstance(value, Namespace):
+            return NamespaceRecording(self, root, path, value)
+        if isinstance(value, Mapping):
+            return MappingRecording(self, root, path, value)
+
+        self.read(root, path, value)
+        return value
+
+    def read(self, root, path, value):
+        """
+        Record that a value was read completely.
+
+        :param str root: Name of the root of the path.
+        :param tuple path: Keys to the value from the root.
+        :param value: The value read, or :data:`MISSING`.
+        """
+        key = (root, path)
+        if key not in self.paths:
+            self.paths[key] = digest(value)
+
+
+def unwrap(value):
+    """
+    Get the object proxied by a recording proxy, recording it as read.
+
+    Usable as the ``default`` function of a JSON encoder, so proxies can be
+    serialized, for example, by the ``tojson`` filter.
+    """
+    if isinstance(value, Recording):
+        return value._whole()
+    raise TypeError(
+        'Object of type {} is not JSON serializable'.format(
+            type(value).__name__,
+        )
+    )
+
+
+class Recording:
+    """
+    Base class of the recording proxies.
+
+    Reading a key records it only if its value isn't itself proxied, so
+    only the leaves actually read are recorded. Any operation that uses the
+    whole object, like iterating it or rendering it, records the whole
+    object.
+    """
+
+    def __init__(self, recorder, root, path, value):
+        object.__setattr__(self, '_recorder', recorder)
+        object.__setattr__(self, '_root', root)
+        object.__setattr__(self, '_path', path)
+        object.__setattr__(self, '_value', value)
+
+    def _whole(self):
+        self._recorder.read(self._root, self._path, self._value)
+        return self._value
+
+    def __getitem__(self, key):
+        path = self._path + (key, )
+        try:
+            value = self._value[key]
+        except KeyError:
+            self._recorder.read(self._root, path, MISSING)
+            raise
+        return self._recorder.wrap(self._root, value, path)
+
+    def __iter__(self):
+        return iter(self._whole())
+
+    def __len__(self):
+        return len(self._whole())
+
+    def __bool__(self):
+        return bool(self._whole())
+
+    def __eq__(self, other):
+        if isinstance(other, Recording):
+            other = other._whole()
+        return self._whole() == other
+
+    __hash__ = None
+
+    def __str__(self):
+        return str(self._whole())
+
+    def __repr__(self):
+        return repr(self._whole())
+
+
+class MappingRecording(Recording, Mapping):
+    """
+    Recording proxy for dictionaries.
+
+    Dictionary methods are available through the ``Mapping`` interface,
+    recording the keys they access.
+    """
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __getattr__(self, attr):
+        # Jinja falls back to item access when attribute access fails
+        raise AttributeError(attr)
+
+
+class NamespaceRecording(Recording):
+    """
+    Recording proxy for :class:`ninjecto.utils.dictionary.Namespace`.
+    """
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+
+        # Namespace methods use the whole object
+        if hasattr(Namespace, attr):
+            return getattr(self._whole(), attr)
+
+        try:
+            return self[attr]
+        except KeyError as e:
+            raise AttributeError(e)
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('Namespaces are read-only while recording')
+
+
+__all__ = [
+    'MISSING',
+    'digest',
+    'resolve',
+    'Recorder',
+    'unwrap',
+]
@@ -0,0 +1,107 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Utilities to determine the processing resources available to the process.
+"""
+
+import os
+import sys
+from math import ceil
+from pathlib import Path
+from logging import getLogger
+
+
+log = getLogger(__name__)
+
+
+CGROUP_V2_MAX = Path('/sys/fs/cgroup/cpu.max')
+CGROUP_V1_QUOTA = Path('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+CGROUP_V1_PERIOD = Path('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+
+
+def cgroup_cpus():
+    """
+    Determine the CPU limit imposed by the cgroup of the process, if any.
+
+    Both cgroup v2 (``cpu.max``) and cgroup v1 (``cpu.cfs_quota_us`` and
+    ``cpu.cfs_period_us``) are supported.
+
+    :return: The number of CPUs allowed by the CPU quota, or None if there is
+     no quota or it can't be determined.
+    :rtype: int
+    """
+    try:
+        if CGROUP_V2_MAX.is_file():
+            quota, period = CGROUP_V2_MAX.read_text().split()[:2]
+        elif CGROUP_V1_QUOTA.is_file():
+            quota = CGROUP_V1_QUOTA.read_text().strip()
+            period = CGROUP_V1_PERIOD.read_text().strip()
+        else:
+            return None
+    except (OSError, ValueError):
+        log.debug('Unable to read the cgroup CPU quota')
+        return None
+
+    if quota in ('max', '-1'):
+        return None
+
+    return max(1, ceil(int(quota) / int(period)))
+
+
+def available_cpus():
+    """
+    Determine the number of CPUs this process can use.
+
+    The count respects the CPU affinity of the process and the CPU quota of
+    its cgroup, so it is accurate inside containers.
+
+    :return: The number of usable CPUs, at least 1.
+    :rtype: int
+    """
+    if hasattr(os, 'process_cpu_count'):
+        cpus = os.process_cpu_count()
+    elif hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count()
+
+    cpus = cpus or 1
+    quota = cgroup_cpus()
+
+    if quota is not None:
+        cpus = min(cpus, quota)
+
+    return cpus
+
+
+def gil_enabled():
+    """
+    Check if the interpreter runs with the Global Interpreter Lock.
+
+    :return: False only on free-threaded interpreters with the GIL disabled.
+    :rtype: bool
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    if is_gil_enabled is None:
+        return True
+    return is_gil_enabled()
+
+
+__all__ = [
+    'available_cpus',
+    'cgroup_cpus',
+    'gil_enabled',
+]
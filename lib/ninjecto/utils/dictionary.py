@@ -21,7 +21,9 @@ Dictionary and namespaces related utilities.
 
 from copy import deepcopy
 from logging import getLogger
-from collections.abc import Mapping
+from contextvars import ContextVar
+from contextlib import contextmanager
+from collections.abc import Mapping, MutableMapping
 
 try:
     from pprintpp import pformat
@@ -180,7 +182,73 @@ class Namespace:
         return Namespace(deepcopy(data))
 
 
+class ScopedMapping(MutableMapping):
+    """
+    Dictionary with per-thread and per-task overlays.
+
+    Keys set on the mapping are shared by all threads. Keys set with
+    :meth:`scope` are only visible to the current thread, or asyncio task,
+    until the context exits, overriding the shared ones.
+
+    Usage:
+
+    .. code-block:: python3
+
+        >>> mapping = ScopedMapping({'one': 100})
+        >>> with mapping.scope({'one': 200, 'two': 300}):
+        ...     mapping['one'], mapping['two']
+        (200, 300)
+        >>> mapping['one']
+        100
+    """
+
+    def __init__(self, data=None):
+        self._data = {} if data is None else data
+
+        # Scopes are immutable, so tasks inheriting them never share changes
+        self._scopes = ContextVar('scopes', default=())
+
+    @contextmanager
+    def scope(self, overlay):
+        """
+        Overlay the given mapping for the current thread, or asyncio task,
+        during the context.
+
+        :param dict overlay: Keys and values to overlay.
+        """
+        token = self._scopes.set(self._scopes.get() + (overlay, ))
+        try:
+            yield self
+        finally:
+            self._scopes.reset(token)
+
+    def __getitem__(self, key):
+        for overlay in reversed(self._scopes.get()):
+            if key in overlay:
+                return overlay[key]
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        keys = dict.fromkeys(self._data)
+        for overlay in self._scopes.get():
+            keys.update(dict.fromkeys(overlay))
+        return iter(keys)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return pformat(dict(self))
+
+
 __all__ = [
     'update',
     'Namespace',
+    'ScopedMapping',
 ]
@@ -0,0 +1,345 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Filesystem utilities.
+"""
+
+import os
+from mmap import mmap, ACCESS_READ
+from errno import EXDEV, ENOSYS, EINVAL, EOPNOTSUPP, ENOTTY, EPERM
+from shutil import copyfileobj
+from logging import getLogger
+
+
+log = getLogger(__name__)
+
+
+# Errors meaning the fast copy isn't supported for the given files
+UNSUPPORTED = {EXDEV, ENOSYS, EINVAL, EOPNOTSUPP}
+
+# ioctl request to clone a file, from linux/fs.h
+FICLONE = 0x40049409
+
+# Bytes searched for a NUL byte to consider a file binary, as git does
+BINARY_SNIFF_SIZE = 8000
+
+# Bytes read at once when comparing the content of files
+COMPARE_CHUNK_SIZE = 1024 * 1024
+
+
+def contains_any(path, needles):
+    """
+    Check if a file contains any of the given byte strings.
+
+    The file is memory mapped, so it is searched without reading it into the
+    memory of the process.
+
+    :param Path path: Path to the file.
+    :param list needles: Byte strings to search for.
+
+    :return: True if any of the byte strings is found.
+    :rtype: bool
+    """
+    with open(path, 'rb') as fd:
+        if not os.fstat(fd.fileno()).st_size:
+            return False
+
+        with mmap(fd.fileno(), 0, access=ACCESS_READ) as data:
+            return any(data.find(needle) != -1 for needle in needles)
+
+
+def is_binary(path):
+    """
+    Check if a file looks binary.
+
+    Like git, a file is considered binary if a NUL byte is found at its
+    beginning.
+
+    :param Path path: Path to the file.
+
+    :return: True if the file looks binary.
+    :rtype: bool
+    """
+    with open(path, 'rb') as fd:
+        return b'\0' in fd.read(BINARY_SNIFF_SIZE)
+
+
+def _copy_range(infd, outfd, size):
+    copy = getattr(os, 'copy_file_range', None)
+    if copy is None:
+        return False
+
+    copied = 0
+    while copied < size:
+        try:
+            sent = copy(infd, outfd, size - copied)
+        except OSError as e:
+            if copied == 0 and e.errno in UNSUPPORTED:
+                return False
+            raise
+        if not sent:
+            break
+        copied += sent
+
+    # The file shrank, or the filesystem stopped copying early
+    return copied == size
+
+
+def _sendfile(infd, outfd, size):
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is None:
+        return False
+
+    copied = 0
+    while copied < size:
+        try:
+            sent = sendfile(outfd, infd, copied, size - copied)
+        except OSError as e:
+            if copied == 0 and e.errno in UNSUPPORTED:
+                return False
+            raise
+        if not sent:
+            break
+        copied += sent
+
+    # The file shrank, or the filesystem stopped copying early
+    return copied == size
+
+
+def copy_file(src, dst):
+    """
+    Copy the content of a file, in the kernel if possible.
+
+    The content is copied with ``copy_file_range``, falling back to
+    ``sendfile`` and finally to a regular read and write copy, also used if
+    the kernel copies less than the size of the source. The destination is
+    created or truncated, its permissions are not changed.
+
+    :param Path src: Path to the source file.
+    :param Path dst: Path to the destination file.
+    """
+    with open(src, 'rb') as infile, open(dst, 'wb') as outfile:
+        infd = infile.fileno()
+        outfd = outfile.fileno()
+        size = os.fstat(infd).st_size
+
+        for copy in (_copy_range, _sendfile):
+            if copy(infd, outfd, size):
+                return
+
+            # Start over after a partial copy
+            infile.seek(0)
+            outfile.seek(0)
+            outfile.truncate()
+
+        copyfileobj(infile, outfile)
+
+
+def reflink_file(src, dst):
+    """
+    Clone a file, sharing its data blocks until any of the files is modified.
+
+    Only some filesystems support cloning files, like Btrfs or XFS. If the
+    clone isn't supported, the file is copied with :func:`copy_file`.
+
+    :param Path src: Path to the source file.
+    :param Path dst: Path to the destination file.
+    """
+    try:
+        from fcntl import ioctl
+    except ImportError:
+        copy_file(src, dst)
+        return
+
+    with open(src, 'rb') as infile, open(dst, 'wb') as outfile:
+        try:
+            ioctl(outfile.fileno(), FICLONE, infile.fileno())
+            return
+        except OSError as e:
+            if e.errno not in UNSUPPORTED | {ENOTTY}:
+                raise
+            log.debug('Unable to clone {}: {}'.format(src, e))
+
+    copy_file(src, dst)
+
+
+def link_file(src, dst):
+    """
+    Hard link a file, replacing the destination if it exists.
+
+    If the files are in different filesystems, or the filesystem doesn't
+    support hard links, the file is copied with :func:`copy_file`.
+
+    :param Path src: Path to the source file.
+    :param Path dst: Path to the destination file.
+    """
+    if dst.exists() and dst.samefile(src):
+        return
+
+    try:
+        dst.unlink()
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in UNSUPPORTED | {EPERM}:
+            raise
+        log.debug('Unable to link {}: {}'.format(src, e))
+        copy_file(src, dst)
+
+
+def _same_chunks(fd, data, chunk_size):
+    view = memoryview(data)
+    offset = 0
+    while True:
+        chunk = fd.read(chunk_size)
+        if not chunk:
+            return offset == len(view)
+        if view[offset:offset + len(chunk)] != chunk:
+            return False
+        offset += len(chunk)
+
+
+def equal_bytes(path, data, stat=None, chunk_size=COMPARE_CHUNK_SIZE):
+    """
+    Check if the content of a file is the given bytes.
+
+    Sizes are compared first, then the content is compared chunk by chunk,
+    stopping at the first difference.
+
+    :param Path path: Path to the file.
+    :param bytes data: Expected content.
+    :param stat: Result of ``stat`` on the file, if already known.
+    :param int chunk_size: Size of the chunks to read.
+
+    :return: True if the file has the given content.
+    :rtype: bool
+    """
+    if stat is None:
+        stat = os.stat(path)
+    if stat.st_size != len(data):
+        return False
+
+    with open(path, 'rb') as fd:
+        return _same_chunks(fd, data, chunk_size)
+
+
+def equal_files(path, other, stat=None, chunk_size=COMPARE_CHUNK_SIZE):
+    """
+    Check if two files have the same content.
+
+    Sizes are compared first, then the contents are compared chunk by chunk,
+    stopping at the first difference.
+
+    :param Path path: Path to the file.
+    :param Path other: Path to the other file.
+    :param stat: Result of ``stat`` on the file, if already known.
+    :param int chunk_size: Size of the chunks to read.
+
+    :return: True if both files have the same content.
+    :rtype: bool
+    """
+    if stat is None:
+        stat = os.stat(path)
+    other_stat = os.stat(other)
+
+    if os.path.samestat(stat, other_stat):
+        return True
+    if stat.st_size != other_stat.st_size:
+        return False
+
+    with open(path, 'rb') as fd, open(other, 'rb') as other_fd:
+        while True:
+            chunk = fd.read(chunk_size)
+            if chunk != other_fd.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+
+def fsync_path(path):
+    """
+    Flush a file or directory to the storage device.
+
+    :param Path path: Path to the file or directory.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _load_syncfs():
+    try:
+        from ctypes import CDLL
+        syncfs = CDLL(None, use_errno=True).syncfs
+    except (ImportError, OSError, AttributeError):
+        return None
+
+    syncfs.restype = int
+    return syncfs
+
+
+_syncfs = _load_syncfs()
+
+
+def sync_files(paths, syncfs=False):
+    """
+    Flush several files to the storage device.
+
+    Each file is flushed with ``fsync``, unless using ``syncfs``.
+
+    :param list paths: Paths to the files.
+    :param bool syncfs: On Linux, flush each filesystem the files are in
+     with a single ``syncfs`` instead. This flushes the data written to the
+     filesystem by any process, not only the files, so it can be far slower
+     on a filesystem shared with other writers.
+    """
+    if not syncfs or _syncfs is None:
+        for path in paths:
+            fsync_path(path)
+        return
+
+    devices = {}
+    for path in paths:
+        devices.setdefault(os.stat(path).st_dev, []).append(path)
+
+    for group in devices.values():
+        fd = os.open(group[0], os.O_RDONLY)
+        try:
+            synced = _syncfs(fd) == 0
+        finally:
+            os.close(fd)
+
+        if not synced:
+            for path in group:
+                fsync_path(path)
+
+
+__all__ = [
+    'contains_any',
+    'is_binary',
+    'copy_file',
+    'reflink_file',
+    'link_file',
+    'equal_bytes',
+    'equal_files',
+    'fsync_path',
+    'sync_files',
+]
@@ -0,0 +1,68 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Utilities to compute stable hashes of arbitrary data.
+"""
+
+from json import dumps
+from hashlib import sha256
+
+from .dictionary import Namespace
+
+
+def _serializable(obj):
+    """
+    Convert objects unknown to the JSON encoder to a stable representation.
+    """
+    if isinstance(obj, Namespace):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    if isinstance(obj, bytes):
+        return obj.hex()
+    return repr(obj)
+
+
+def fingerprint(*objects):
+    """
+    Compute a stable hash of the given objects.
+
+    Objects are serialized to JSON with sorted keys, so the same data will
+    produce the same hash regardless of the insertion order of its
+    dictionaries.
+
+    :param objects: Any number of objects to hash together.
+
+    :return: The hexadecimal SHA-256 digest of the objects.
+    :rtype: str
+    """
+    digest = sha256()
+
+    for obj in objects:
+        digest.update(dumps(
+            obj,
+            sort_keys=True,
+            ensure_ascii=False,
+            default=_serializable,
+        ).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+
+    return digest.hexdigest()
+
+
+__all__ = [
+    'fingerprint',
+]
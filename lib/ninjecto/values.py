@@ -20,12 +20,14 @@ Values loading and merging module.
 """
 
 from sys import stdin
+from copy import deepcopy
 from logging import getLogger
+from collections import OrderedDict
 
 from pprintpp import pformat
 
 from .utils.dictionary import update
-from .inputs import load_files, load_content
+from .inputs import load_file, load_files, load_content
 
 
 log = getLogger(__name__)
@@ -136,6 +138,56 @@ def load_values(values_files, values, values_in):
     return bundle
 
 
+def load_matrix(matrix_files, values_files, values, values_in):
+    """
+    Get the value sets of a matrix rendering, one per matrix file.
+
+    Each value set merges, left to right, the values files, its matrix file,
+    the dot-notation values and the standard input (if any). The values files
+    and the standard input are read once for all the value sets.
+
+    :param list matrix_files: List of Path objects pointing to the files with
+     the values of each value set. Their names, without suffix, name the
+     value sets.
+    :param list values_files: List of Path objects pointing to files with
+     values common to all the value sets.
+    :param OrderedDict values: Dictionary with keys in dot-notation and its
+     associated values.
+    :param str values_in: Read standard input using the given format. If None,
+     then ignore standard input.
+
+    :return: Ordered dictionary mapping the name of each value set to its
+     values.
+    :rtype: OrderedDict
+    """
+    common = load_files(values_files)
+    expanded = expand_dotdict(values) if values else None
+    piped = load_content(stdin.read(), values_in) if values_in else None
+
+    matrix = OrderedDict()
+
+    for path in matrix_files:
+        if path.stem in matrix:
+            raise RuntimeError(
+                'Duplicated value set name "{}" for file {}'.format(
+                    path.stem, path,
+                )
+            )
+
+        log.info('Loading value set {} ...'.format(path))
+        bundle = update(deepcopy(common), load_file(path))
+
+        if expanded:
+            update(bundle, expanded)
+        if piped:
+            update(bundle, piped)
+
+        matrix[path.stem] = bundle
+
+    return matrix
+
+
 __all__ = [
     'load_values',
+    'load_matrix',
 ]
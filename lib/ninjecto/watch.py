@@ -0,0 +1,356 @@
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Filesystem watching module, used to render again on changes.
+"""
+
+import os
+from time import monotonic, sleep
+from struct import calcsize, unpack_from
+from select import select
+from logging import getLogger
+
+
+log = getLogger(__name__)
+
+
+# Flags from sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+IN_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+EVENT = 'iIII'
+EVENT_SIZE = calcsize(EVENT)
+
+
+def _directories(root):
+    """
+    List a directory and all its subdirectories, without recursing.
+
+    :param Path root: Path to the directory.
+
+    :return: List of paths to the directories.
+    :rtype: list
+    """
+    directories = []
+    pending = [root]
+
+    while pending:
+        directory = pending.pop()
+        directories.append(directory)
+
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(directory / entry.name)
+        except OSError:
+            continue
+
+    return directories
+
+
+class Watcher:
+    """
+    Base class of the filesystem watchers.
+
+    Directories are watched recursively, files are watched by name, so
+    editors replacing them are detected.
+
+    :param list paths: Paths to the files and directories to watch.
+    :param list ignore: Paths to directories whose changes are ignored, like
+     the destination of the renders.
+    """
+
+    def __init__(self, paths, ignore=()):
+        self._directories = [path for path in paths if path.is_dir()]
+        self._files = [path for path in paths if not path.is_dir()]
+        self._ignore = list(ignore)
+
+    def _ignored(self, path):
+        return any(
+            path == ignored or ignored in path.parents
+            for ignored in self._ignore
+        )
+
+    def _relevant(self, path):
+        if self._ignored(path):
+            return False
+        return path in self._files or any(
+            path == directory or directory in path.parents
+            for directory in self._directories
+        )
+
+    def poll(self, timeout):
+        """
+        Wait for changes.
+
+        :param float timeout: Seconds to wait for, or None to wait forever.
+
+        :return: The set of changed paths, empty if none changed.
+        :rtype: set
+        """
+        raise NotImplementedError()
+
+    def wait(self, debounce=0.1):
+        """
+        Wait for changes, and collect the changes that follow them until
+        there are none for the given time, so a burst of writes is reported
+        at once.
+
+        :param float debounce: Seconds without changes to wait for.
+
+        :return: The set of changed paths.
+        :rtype: set
+        """
+        changed = set()
+        while not changed:
+            changed = self.poll(None)
+
+        while True:
+            more = self.poll(debounce)
+            if not more:
+                return changed
+            changed.update(more)
+
+    def close(self):
+        pass
+
+
+class PollingWatcher(Watcher):
+    """
+    Watcher comparing the state of the files periodically.
+
+    :param list paths: Paths to the files and directories to watch.
+    :param list ignore: Paths to directories whose changes are ignored.
+    :param float interval: Seconds between each check.
+    """
+
+    def __init__(self, paths, ignore=(), interval=0.5):
+        super().__init__(paths, ignore)
+        self._interval = interval
+        self._state = self._snapshot()
+
+    def _snapshot(self):
+        state = {}
+
+        for path in self._files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        for root in self._directories:
+            for directory in _directories(root):
+                if self._ignored(directory):
+                    continue
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            path = directory / entry.name
+                            if self._ignored(path):
+                                continue
+                            stat = entry.stat(follow_symlinks=False)
+                            state[path] = (
+                                stat.st_mtime_ns, stat.st_size, stat.st_ino,
+                            )
+                except OSError:
+                    continue
+
+        return state
+
+    def poll(self, timeout):
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            state = self._snapshot()
+            changed = {
+                path for path in state.keys() | self._state.keys()
+                if state.get(path) != self._state.get(path)
+            }
+            self._state = state
+
+            if changed:
+                return changed
+
+            if deadline is not None and monotonic() >= deadline:
+                return set()
+
+            interval = self._interval
+            if deadline is not None:
+                interval = min(interval, max(deadline - monotonic(), 0))
+            sleep(interval)
+
+
+class InotifyWatcher(Watcher):
+    """
+    Watcher using the Linux inotify API.
+
+    :param list paths: Paths to the files and directories to watch.
+    :param list ignore: Paths to directories whose changes are ignored.
+
+    :raises OSError: If inotify is unavailable.
+    """
+
+    def __init__(self, paths, ignore=()):
+        super().__init__(paths, ignore)
+
+        try:
+            from ctypes import CDLL, get_errno
+            libc = CDLL(None, use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except (ImportError, OSError, AttributeError) as e:
+            raise OSError('inotify is unavailable: {}'.format(e))
+
+        self._get_errno = get_errno
+        self._fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._watches = {}
+
+        try:
+            for root in self._directories:
+                for directory in _directories(root):
+                    self._watch(directory)
+
+            for path in self._files:
+                self._watch(path.parent)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory):
+        if self._ignored(directory):
+            return
+
+        wd = self._add_watch(
+            self._fd, os.fsencode(str(directory)), IN_MASK,
+        )
+        if wd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+
+        self._watches[wd] = directory
+
+    def poll(self, timeout):
+        readable, _, _ = select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, length = unpack_from(EVENT, data, offset)
+            name = data[
+                offset + EVENT_SIZE:offset + EVENT_SIZE + length
+            ].rstrip(b'\0')
+            offset += EVENT_SIZE + length
+
+            # Events were lost, consider everything changed
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self._directories)
+                changed.update(self._files)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+
+            path = directory / os.fsdecode(name) if name else directory
+
+            # Watch the directories created in the watched trees
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) \
+                    and self._relevant(path):
+                for subdirectory in _directories(path):
+                    try:
+                        self._watch(subdirectory)
+                    except OSError as e:
+                        log.warning('Unable to watch {}: {}'.format(
+                            subdirectory, e,
+                        ))
+
+            if self._relevant(path):
+                changed.add(path)
+
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(paths, ignore=(), polling=False, interval=0.5):
+    """
+    Create a watcher for the given paths, using inotify if available, or
+    polling otherwise.
+
+    :param list paths: Paths to the files and directories to watch.
+    :param list ignore: Paths to directories whose changes are ignored.
+    :param bool polling: Always use polling.
+    :param float interval: Seconds between each check when polling.
+
+    :return: The watcher.
+    :rtype: :class:`Watcher`
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(paths, ignore)
+        except OSError as e:
+            log.warning(
+                'Unable to use inotify, polling instead: {}'.format(e)
+            )
+
+    return PollingWatcher(paths, ignore, interval)
+
+
+__all__ = [
+    'Watcher',
+    'PollingWatcher',
+    'InotifyWatcher',
+    'create_watcher',
+]
@@ -0,0 +1,1062 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tests for the Ninjecto core rendering engine.
+"""
+
+import os
+import asyncio
+from io import StringIO
+from json import loads
+from sys import getrecursionlimit
+from pathlib import Path
+
+from jinja2 import UndefinedError
+from pytest import fixture, raises
+from yaml import safe_load as yaml_load
+
+from ninjecto.core import Ninjecto
+from ninjecto.pipeline import pipeline as run_pipeline
+from ninjecto.values import load_matrix
+from ninjecto.profiling import Profiler
+from ninjecto.utils.fs import copy_file, sync_files
+
+
+@fixture
+def config():
+    return yaml_load(
+        (Path(__file__).parent / 'config' / 'config.yaml').read_text(
+            encoding='utf-8',
+        )
+    )
+
+
+def make_ninjecto(config, source, destination, values=None, **kwargs):
+    options = {
+        'local': None,
+        'filters': {},
+        'namespaces': {},
+        'libraries': [],
+        'filename': None,
+    }
+    options.update(kwargs)
+
+    return Ninjecto(
+        config=config,
+        values=values or {},
+        source=source,
+        destination=destination,
+        **options,
+    )
+
+
+def test_render_reuses_environment(config, tmp_path):
+    """
+    Check that renders share the environment while still picking up changes
+    in the source of a template with the same name.
+    """
+    ninjecto = make_ninjecto(config, tmp_path, tmp_path, {'key': 'value'})
+
+    cache = ninjecto._environment.cache
+
+    assert ninjecto.render('name', '{{ values.key }}') == 'value'
+    compiled = list(cache.values())
+
+    assert ninjecto.render('name', '{{ values.key }}') == 'value'
+    assert list(cache.values()) == compiled
+
+    assert ninjecto.render('name', '{{ values.key }}!') == 'value!'
+    assert list(cache.values()) != compiled
+
+
+def test_render_tree_with_library(config, tmp_path):
+    """
+    Check rendering a directory tree using a library macro.
+    """
+    library = tmp_path / 'library'
+    library.mkdir()
+    (library / 'macros.tpl').write_text(
+        '{% macro hello(who) %}Hello {{ who }}{% endmacro %}',
+        encoding='utf-8',
+    )
+
+    source = tmp_path / 'source'
+    (source / 'sub').mkdir(parents=True)
+    for path in (source / '{{ values.name }}.txt', source / 'sub' / 'b.txt'):
+        path.write_text(
+            "{% import 'library/macros.tpl' as m %}{{ m.hello(values.name) }}",
+            encoding='utf-8',
+        )
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    processed = make_ninjecto(
+        config, source, destination, {'name': 'world'},
+        libraries=[library],
+    ).run()
+
+    assert processed == 4
+    output = destination / 'source'
+    assert (output / 'world.txt').read_text() == 'Hello world'
+    assert (output / 'sub' / 'b.txt').read_text() == 'Hello world'
+
+
+def test_bytecode_cache(config, tmp_path, monkeypatch):
+    """
+    Check that warm renders load the compiled templates from the bytecode
+    cache instead of compiling them, and that the cache is pruned.
+    """
+    config['ninjecto']['cache'] = {
+        'enabled': True,
+        'directory': str(tmp_path / 'cache'),
+    }
+
+    make_ninjecto(config, tmp_path, tmp_path, {'key': 'value'}).render(
+        'name', '{{ values.key }}',
+    )
+    assert list((tmp_path / 'cache' / 'bytecode').iterdir())
+
+    ninjecto = make_ninjecto(config, tmp_path, tmp_path, {'key': 'cached'})
+
+    def compile(*args, **kwargs):
+        raise AssertionError('Template was compiled')
+
+    monkeypatch.setattr(ninjecto._environment, 'compile', compile)
+    assert ninjecto.render('name', '{{ values.key }}') == 'cached'
+
+    # Changed templates add entries, pruned beyond the maximum
+    config['ninjecto']['cache']['max_entries'] = 2
+    for index in range(5):
+        make_ninjecto(config, tmp_path, tmp_path).render(
+            'name', '{}'.format(index) + '{{ values }}',
+        )
+    assert len(list((tmp_path / 'cache' / 'bytecode').iterdir())) == 2
+
+
+def test_parallel_render(config, tmp_path, monkeypatch):
+    """
+    Check that rendering with several jobs, in processes or in threads as
+    done without the GIL, produces the same tree.
+    """
+    source = tmp_path / 'source'
+    (source / 'sub').mkdir(parents=True)
+    for index in range(10):
+        (source / 'sub' / 'file{}.txt'.format(index)).write_text(
+            '{{ values.key }} ' + str(index), encoding='utf-8',
+        )
+
+    def render(name, jobs):
+        destination = tmp_path / name
+        destination.mkdir()
+
+        processed = make_ninjecto(
+            config, source, destination, {'key': 'value'},
+        ).run(jobs=jobs)
+
+        return processed, sorted(
+            (path.relative_to(destination), path.read_text())
+            for path in destination.glob('**/*.txt')
+        )
+
+    results = [render('jobs1', 1), render('processes', 3)]
+
+    monkeypatch.setattr('ninjecto.core.gil_enabled', lambda: False)
+    results.append(render('threads', 3))
+
+    assert results[0] == results[1] == results[2]
+    assert results[0][0] == 12
+
+
+def test_pipeline_render(config, tmp_path, monkeypatch):
+    """
+    Check rendering a tree with the pipeline and a budget smaller than the
+    files, also when several jobs are requested, that sizes are counted in
+    bytes, and that errors in the pipeline are raised.
+    """
+    config['ninjecto']['pipeline'] = {'enabled': True, 'budget': 16}
+
+    sizes = []
+
+    def pipeline(*args, sizeof, **kwargs):
+        sizes.append((sizeof('a'), sizeof('ñ')))
+        return run_pipeline(*args, sizeof=sizeof, **kwargs)
+
+    monkeypatch.setattr('ninjecto.core.pipeline', pipeline)
+
+    source = tmp_path / 'source'
+    source.mkdir()
+    for index in range(10):
+        (source / 'file{}.txt'.format(index)).write_text(
+            '{{ values.key }} ' * 10 + str(index), encoding='utf-8',
+        )
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    ninjecto = make_ninjecto(config, source, destination, {'key': 'value'})
+    assert ninjecto.run(jobs=4) == 11
+    assert sizes == [(1, 4)]
+
+    for index in range(10):
+        assert (
+            destination / 'source' / 'file{}.txt'.format(index)
+        ).read_text() == 'value ' * 10 + str(index)
+
+    (source / 'file5.txt').write_text('{{ values.missing }}')
+    with raises(UndefinedError):
+        ninjecto.run(jobs=1, override=True)
+
+
+def test_incremental_render(config, tmp_path):
+    """
+    Check that incremental runs only render the outputs whose inputs changed.
+    """
+    library = tmp_path / 'library'
+    library.mkdir()
+    (library / 'macros.tpl').write_text(
+        '{% macro upper(text) %}{{ text | upper }}{% endmacro %}',
+        encoding='utf-8',
+    )
+
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'static.txt').write_text(
+        '{# no values #}static', encoding='utf-8',
+    )
+    (source / 'values.txt').write_text('{{ values.key }}', encoding='utf-8')
+    (source / 'library.txt').write_text(
+        "{% import 'library/macros.tpl' as m %}{{ m.upper('text') }}",
+        encoding='utf-8',
+    )
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    def run(values):
+        ninjecto = make_ninjecto(
+            config, source, destination, values, libraries=[library],
+        )
+        rendered = []
+        render = ninjecto.render
+
+        def spy(name, content, filepath=None, **kwargs):
+            if name == str(filepath):
+                rendered.append(filepath.name)
+            return render(name, content, filepath=filepath, **kwargs)
+
+        ninjecto.render = spy
+        assert ninjecto.run(jobs=1, incremental=True) == 4
+        return sorted(rendered)
+
+    assert run({'key': 'one'}) == ['library.txt', 'static.txt', 'values.txt']
+    assert (destination / '.ninjecto-manifest.json').is_file()
+
+    assert run({'key': 'one'}) == []
+    assert run({'key': 'two'}) == ['values.txt']
+    assert (destination / 'source' / 'values.txt').read_text() == 'two'
+
+    (library / 'macros.tpl').write_text(
+        '{% macro upper(text) %}{{ text | lower }}{% endmacro %}',
+        encoding='utf-8',
+    )
+    assert run({'key': 'two'}) == ['library.txt']
+
+    (destination / 'source' / 'static.txt').write_text('modified')
+    assert run({'key': 'two'}) == ['static.txt']
+    assert (destination / 'source' / 'static.txt').read_text() == 'static'
+
+
+def test_incremental_render_same_destination(config, tmp_path):
+    """
+    Check that incremental runs of different sources into the same
+    destination directory keep the records of each other.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    for name in ('a', 'b'):
+        (source / '{}.txt'.format(name)).write_text(
+            name + '{{ values.key }}', encoding='utf-8',
+        )
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    def run(name, values):
+        make_ninjecto(
+            config, source / '{}.txt'.format(name), destination, values,
+            filename='{}.out'.format(name),
+        ).run(jobs=1, incremental=True)
+
+    run('a', {'key': 1})
+    run('b', {'key': 1})
+
+    manifest = loads(
+        (destination / '.ninjecto-manifest.json').read_text(encoding='utf-8')
+    )
+    assert sorted(manifest['outputs']) == ['a.out', 'b.out']
+
+    run('a', {'key': 2})
+    assert (destination / 'a.out').read_text() == 'a2'
+    assert (destination / 'b.out').read_text() == 'b1'
+
+
+def test_render_cache(config, tmp_path):
+    """
+    Check that the render cache reuses outputs whose read values didn't
+    change, even if other values did.
+    """
+    config['ninjecto']['rendercache'] = {'enabled': True, 'max_entries': 8}
+
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'a.txt').write_text('{{ values.a }}', encoding='utf-8')
+    (source / 'b.txt').write_text(
+        '{{ values.nested | tojson }}', encoding='utf-8',
+    )
+    (source / 'c.txt').write_text(
+        '{% if values.c is defined %}{{ values.c }}{% endif %}',
+        encoding='utf-8',
+    )
+
+    def run(values):
+        destination = tmp_path / 'destination'
+        destination.mkdir(exist_ok=True)
+        ninjecto = make_ninjecto(config, source, destination, values)
+        rendered = []
+        render = ninjecto._render
+
+        def spy(name, content, filepath=None, recorder=None, **kwargs):
+            if recorder is not None:
+                rendered.append(filepath.name)
+            return render(
+                name, content, filepath, recorder=recorder, **kwargs,
+            )
+
+        ninjecto._render = spy
+        ninjecto.run(jobs=1, override=True)
+        return sorted(rendered), {
+            path.name: path.read_text()
+            for path in (destination / 'source').iterdir()
+        }
+
+    values = {'a': 1, 'nested': {'b': 2}, 'other': 3}
+    assert run(values) == (
+        ['a.txt', 'b.txt', 'c.txt'],
+        {'a.txt': '1', 'b.txt': '{"b": 2}', 'c.txt': ''},
+    )
+
+    values['other'] = 4
+    assert run(values)[0] == []
+
+    values['nested']['b'] = 5
+    assert run(values) == (
+        ['b.txt'],
+        {'a.txt': '1', 'b.txt': '{"b": 5}', 'c.txt': ''},
+    )
+
+    values['c'] = 6
+    assert run(values) == (
+        ['c.txt'],
+        {'a.txt': '1', 'b.txt': '{"b": 5}', 'c.txt': '6'},
+    )
+
+
+def test_literal_files(config, tmp_path):
+    """
+    Check that files without template markers are copied as is, and that
+    files with markers are still rendered.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'plain.txt').write_bytes('no markers { here }\n'.encode())
+    (source / 'empty.txt').write_bytes(b'')
+    (source / 'crlf.txt').write_bytes(b'one\r\ntwo\r\n')
+    (source / '{{ values.name }}.txt').write_text(
+        '{{ values.name }}\n', encoding='utf-8',
+    )
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    ninjecto = make_ninjecto(config, source, destination, {'name': 'file'})
+    rendered = []
+    render = ninjecto.render
+
+    def spy(name, content, filepath=None, **kwargs):
+        rendered.append(Path(name).name)
+        return render(name, content, filepath, **kwargs)
+
+    ninjecto.render = spy
+    ninjecto.run(jobs=1)
+
+    output = destination / 'source'
+    assert sorted(rendered) == [
+        'crlf.txt', '{{ values.name }}.txt', '{{ values.name }}.txt',
+    ]
+    assert (output / 'plain.txt').read_bytes() == b'no markers { here }\n'
+    assert (output / 'empty.txt').read_bytes() == b''
+    assert (output / 'crlf.txt').read_bytes() == b'one\ntwo\n'
+    assert (output / 'file.txt').read_text() == 'file\n'
+
+
+def test_passthrough_files(config, tmp_path):
+    """
+    Check that binary files and files matching the passthrough patterns are
+    copied byte-for-byte, in every mode.
+    """
+    source = tmp_path / 'source'
+    (source / 'assets').mkdir(parents=True)
+    (source / 'image.bin').write_bytes(b'\x89PNG\0{{ \xff')
+    (source / 'assets' / 'style.css').write_text(
+        '{{ not a template }}', encoding='utf-8',
+    )
+    (source / 'page.txt').write_text('{{ values.title }}', encoding='utf-8')
+
+    for mode in ('copy', 'reflink', 'hardlink'):
+        config['ninjecto']['passthrough'] = {
+            'patterns': ['assets/*.css'],
+            'detect': True,
+            'mode': mode,
+        }
+        destination = tmp_path / mode
+        destination.mkdir()
+
+        ninjecto = make_ninjecto(
+            config, source, destination, {'title': 'Title'},
+        )
+        assert ninjecto.run(jobs=1) == 5
+
+        output = destination / 'source'
+        assert (output / 'image.bin').read_bytes() == b'\x89PNG\0{{ \xff'
+        assert (output / 'assets' / 'style.css').read_text() == (
+            '{{ not a template }}'
+        )
+        assert (output / 'page.txt').read_text() == 'Title'
+
+    config['ninjecto']['passthrough']['mode'] = 'symlink'
+    with raises(ValueError):
+        make_ninjecto(config, source, tmp_path)
+
+
+def test_copy_file_short(tmp_path, monkeypatch):
+    """
+    Check that files copied partially by the kernel are copied again.
+    """
+    src = tmp_path / 'source.bin'
+    src.write_bytes(b'0123456789')
+    dst = tmp_path / 'destination.bin'
+
+    def copy_file_range(infd, outfd, count):
+        return 0
+
+    def sendfile(outfd, infd, offset, count):
+        return os.write(outfd, os.pread(infd, 4, offset)) if not offset else 0
+
+    monkeypatch.setattr(os, 'copy_file_range', copy_file_range, raising=False)
+    monkeypatch.setattr(os, 'sendfile', sendfile, raising=False)
+
+    copy_file(src, dst)
+    assert dst.read_bytes() == b'0123456789'
+
+
+def test_sync_files(tmp_path, monkeypatch):
+    """
+    Check that files are flushed one by one, unless using syncfs.
+    """
+    paths = [tmp_path / 'one.txt', tmp_path / 'two.txt']
+    for path in paths:
+        path.write_text('data', encoding='utf-8')
+
+    calls = []
+    monkeypatch.setattr(
+        'ninjecto.utils.fs._syncfs', lambda fd: calls.append(fd) or 0,
+    )
+    monkeypatch.setattr(
+        'ninjecto.utils.fs.fsync_path', lambda path: calls.append(path),
+    )
+
+    sync_files(paths)
+    assert calls == paths
+
+    calls.clear()
+    sync_files(paths, syncfs=True)
+    assert len(calls) == 1 and calls[0] not in paths
+
+
+def test_stream_render(config, tmp_path):
+    """
+    Check that streamed outputs are the same as whole outputs, for files
+    and streams.
+    """
+    config['ninjecto']['streaming'] = {'enabled': False, 'buffer_size': 16}
+
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'rows.txt').write_text(
+        '{% for row in range(values.rows) %}row {{ row }}\n{% endfor %}',
+        encoding='utf-8',
+    )
+    expected = ''.join('row {}\n'.format(row) for row in range(100))
+
+    for stream in (False, True):
+        destination = tmp_path / 'stream-{}'.format(stream)
+        destination.mkdir()
+
+        ninjecto = make_ninjecto(config, source, destination, {'rows': 100})
+        assert ninjecto.run(jobs=1, stream=stream) == 2
+        assert (destination / 'source' / 'rows.txt').read_text() == expected
+
+    output = StringIO()
+    ninjecto = make_ninjecto(
+        config, source / 'rows.txt', None, {'rows': 100},
+    )
+    assert ninjecto.dump(output) == 1
+    assert output.getvalue() == expected
+
+
+def remove_chain(root):
+    """
+    Remove a chain of nested directories without recursing, as
+    ``shutil.rmtree`` would hit the recursion limit.
+    """
+    chain = [root]
+    while True:
+        directories = [path for path in chain[-1].iterdir() if path.is_dir()]
+        if not directories:
+            break
+        chain.extend(directories)
+
+    for directory in reversed(chain):
+        for path in directory.iterdir():
+            path.unlink()
+        directory.rmdir()
+
+
+def test_walk_deep_tree(config, tmp_path):
+    """
+    Check that trees deeper than the recursion limit are walked in order,
+    and that levels limit the depth walked.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    deepest = source
+    for _ in range(getrecursionlimit() + 10):
+        deepest = deepest / 'd'
+        deepest.mkdir()
+    (deepest / 'b.txt').write_text('{{ values.b }}', encoding='utf-8')
+    (deepest / 'a.txt').write_text('{{ values.a }}', encoding='utf-8')
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    try:
+        ninjecto = make_ninjecto(
+            config, source, destination, {'a': 1, 'b': 2},
+        )
+        files = []
+        ninjecto._walk(source, destination, None, None, files)
+        assert [src.name for src, _ in files] == ['a.txt', 'b.txt']
+
+        output = destination / deepest.relative_to(tmp_path)
+        assert ninjecto.run(jobs=1, override=True) == (
+            getrecursionlimit() + 13
+        )
+        assert (output / 'a.txt').read_text() == '1'
+
+        shallow = tmp_path / 'shallow'
+        shallow.mkdir()
+        ninjecto = make_ninjecto(config, source, shallow)
+        assert ninjecto.run(jobs=1, levels=3) == 3
+        assert (shallow / 'source' / 'd' / 'd').is_dir()
+        assert not (shallow / 'source' / 'd' / 'd' / 'd').exists()
+    finally:
+        remove_chain(source)
+        remove_chain(destination)
+
+
+def test_atomic_writes(config, tmp_path):
+    """
+    Check that atomic outputs are written in every durability mode, and that
+    a failed run leaves neither partial outputs nor temporary files behind.
+    """
+    source = tmp_path / 'source'
+    (source / 'nested').mkdir(parents=True)
+    (source / 'a.txt').write_text('{{ values.a }}', encoding='utf-8')
+    (source / 'nested' / 'b.txt').write_text(
+        '{{ values.b }}', encoding='utf-8',
+    )
+
+    for durability in ('none', 'per-file', 'per-directory', 'end-of-run'):
+        destination = tmp_path / durability
+        destination.mkdir()
+
+        ninjecto = make_ninjecto(
+            config, source, destination, {'a': 1, 'b': 2},
+        )
+        assert ninjecto.run(
+            jobs=1, atomic=True, durability=durability,
+        ) == 4
+
+        output = destination / 'source'
+        assert (output / 'a.txt').read_text() == '1'
+        assert (output / 'nested' / 'b.txt').read_text() == '2'
+        assert sorted(
+            path.name for path in output.rglob('*') if path.is_file()
+        ) == ['a.txt', 'b.txt']
+
+    # The second file fails to render, the first one must not be committed
+    destination = tmp_path / 'end-of-run'
+    ninjecto = make_ninjecto(config, source, destination, {'a': 3})
+    with raises(UndefinedError):
+        ninjecto.run(jobs=1, override=True, durability='end-of-run')
+
+    output = destination / 'source'
+    assert (output / 'a.txt').read_text() == '1'
+    assert sorted(
+        path.name for path in output.rglob('*') if path.is_file()
+    ) == ['a.txt', 'b.txt']
+
+    with raises(ValueError):
+        make_ninjecto(config, source, destination).run(durability='always')
+
+
+def test_compare_before_write(config, tmp_path):
+    """
+    Check that outputs with the same content are left untouched, and that
+    the summary reports the outputs written, unchanged and skipped.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'values.txt').write_text('{{ values.key }}', encoding='utf-8')
+    (source / 'static.txt').write_text('static', encoding='utf-8')
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+    output = destination / 'source'
+
+    def run(values, **kwargs):
+        ninjecto = make_ninjecto(config, source, destination, values)
+        ninjecto.run(jobs=1, override=True, compare=True, **kwargs)
+        return dict(ninjecto.summary)
+
+    assert run({'key': 'one'}) == {
+        'written': 2, 'unchanged': 0, 'skipped': 0,
+    }
+    mtimes = {
+        path.name: path.stat().st_mtime_ns for path in output.iterdir()
+    }
+
+    assert run({'key': 'one'}) == {
+        'written': 0, 'unchanged': 2, 'skipped': 0,
+    }
+    assert run({'key': 'one'}, durability='per-directory') == {
+        'written': 0, 'unchanged': 2, 'skipped': 0,
+    }
+    assert {
+        path.name: path.stat().st_mtime_ns for path in output.iterdir()
+    } == mtimes
+
+    # Same size, different content
+    assert run({'key': 'two'}, atomic=True) == {
+        'written': 1, 'unchanged': 1, 'skipped': 0,
+    }
+    assert (output / 'values.txt').read_text() == 'two'
+
+    assert run({'key': 'two'}, incremental=True) == {
+        'written': 0, 'unchanged': 2, 'skipped': 0,
+    }
+    assert run({'key': 'two'}, incremental=True) == {
+        'written': 0, 'unchanged': 0, 'skipped': 2,
+    }
+
+
+def test_matrix_render(config, tmp_path):
+    """
+    Check that a matrix renders the source once per value set, serially and
+    in parallel, merging each value set over the common values.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / '{{ values.env }}.txt').write_text(
+        '{{ values.env }} {{ values.name }}', encoding='utf-8',
+    )
+
+    environments = tmp_path / 'environments'
+    environments.mkdir()
+    for env in ('dev', 'prod', 'staging'):
+        (environments / '{}.yaml'.format(env)).write_text(
+            'env: {}'.format(env), encoding='utf-8',
+        )
+
+    common = tmp_path / 'common.yaml'
+    common.write_text('name: common\nenv: none', encoding='utf-8')
+
+    matrix = load_matrix(
+        sorted(environments.iterdir()), [common], {'name': 'override'}, None,
+    )
+    assert list(matrix) == ['dev', 'prod', 'staging']
+
+    for jobs in (1, 2):
+        destination = tmp_path / 'destination{}'.format(jobs)
+        ninjecto = make_ninjecto(config, source, destination)
+
+        processed = ninjecto.run_matrix(
+            matrix, str(destination / '{index}-{name}'), jobs=jobs,
+        )
+        assert processed == 6
+        assert ninjecto.summary['written'] == 3
+
+        for index, env in enumerate(matrix):
+            output = destination / '{}-{}'.format(index, env) / 'source'
+            assert (output / '{}.txt'.format(env)).read_text(
+                encoding='utf-8',
+            ) == '{} override'.format(env)
+
+    with raises(ValueError):
+        ninjecto.run_matrix(matrix, str(destination / 'same'))
+
+
+def test_fanout_render(config, tmp_path):
+    """
+    Check that fan-out files render one output per element of their list,
+    with the element bound, that incremental runs track the list, and that
+    outputs must have different file names.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'service.yaml.tpl').write_text(
+        'name: {{ service.name }}\nport: {{ service.port }}\n',
+        encoding='utf-8',
+    )
+    (source / '{{ item }}.txt').write_text('{{ item }}', encoding='utf-8')
+    (source / 'other.txt').write_text('other', encoding='utf-8')
+
+    config['ninjecto']['fanout'] = {'rules': [
+        {
+            'pattern': 'service.yaml.tpl',
+            'items': 'deploy.services',
+            'name': 'service',
+            'output': '{{ service.name }}.yaml',
+        },
+        {'pattern': '{{ item }}.txt', 'items': 'names'},
+    ]}
+    values = {
+        'deploy': {'services': [
+            {'name': 'api', 'port': 80},
+            {'name': 'web', 'port': 8080},
+        ]},
+        'names': ['one', 'two', 'three'],
+    }
+
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+    output = destination / 'source'
+
+    ninjecto = make_ninjecto(config, source, destination, values)
+    ninjecto.run(jobs=1, incremental=True)
+
+    assert sorted(path.name for path in output.iterdir()) == [
+        'api.yaml', 'one.txt', 'other.txt', 'three.txt', 'two.txt', 'web.yaml',
+    ]
+    assert (output / 'web.yaml').read_text(encoding='utf-8') == (
+        'name: web\nport: 8080\n'
+    )
+    assert (output / 'two.txt').read_text(encoding='utf-8') == 'two'
+
+    values['deploy']['services'][0]['port'] = 81
+    ninjecto.update_values(values)
+    ninjecto.run(jobs=1, incremental=True)
+    assert (output / 'api.yaml').read_text(encoding='utf-8') == (
+        'name: api\nport: 81\n'
+    )
+
+    # Outputs of every element must have different names
+    config['ninjecto']['fanout']['rules'][0]['output'] = 'same.yaml'
+    ninjecto = make_ninjecto(config, source, destination, values)
+    with raises(RuntimeError):
+        ninjecto.run(jobs=1, override=True)
+
+    # And be file names
+    config['ninjecto']['fanout']['rules'][0]['output'] = (
+        '{{ service.name }}/conf.yaml'
+    )
+    ninjecto = make_ninjecto(config, source, destination, values)
+    with raises(RuntimeError, match='path separator'):
+        ninjecto.run(jobs=1, override=True)
+
+
+def test_dependencies(config, tmp_path):
+    """
+    Check that the dependency graph maps library templates to the source
+    templates depending on them, directly or not.
+    """
+    source = tmp_path / 'source'
+    (source / 'sub').mkdir(parents=True)
+    (source / 'macro.txt').write_text(
+        '{% import "library/macros.j2" as macros %}{{ macros.hello() }}',
+        encoding='utf-8',
+    )
+    (source / 'sub' / 'base.txt').write_text(
+        '{% extends "library/base.j2" %}', encoding='utf-8',
+    )
+    (source / 'plain.txt').write_text('plain', encoding='utf-8')
+    (source / 'binary.bin').write_bytes(b'\0{% include "x" %}')
+
+    library = tmp_path / 'library'
+    library.mkdir()
+    (library / 'macros.j2').write_text(
+        '{% macro hello() %}{% include "library/base.j2" %}{% endmacro %}',
+        encoding='utf-8',
+    )
+    (library / 'base.j2').write_text('base', encoding='utf-8')
+
+    ninjecto = make_ninjecto(config, source, None, libraries=[library])
+    graph = ninjecto.dependencies()
+
+    assert graph.edges == {
+        'source/macro.txt': ['library/macros.j2'],
+        'source/plain.txt': [],
+        'source/sub/base.txt': ['library/base.j2'],
+        'library/base.j2': [],
+        'library/macros.j2': ['library/base.j2'],
+    }
+    assert graph.dependents(['library/macros.j2']) == ['source/macro.txt']
+    assert graph.dependents(['library/base.j2']) == [
+        'source/macro.txt', 'source/sub/base.txt',
+    ]
+
+    # Templates with dynamic references may depend on anything
+    (source / 'dynamic.txt').write_text(
+        '{% include values.template %}', encoding='utf-8',
+    )
+    graph = ninjecto.dependencies()
+    assert graph.dependents(['library/macros.j2']) == [
+        'source/dynamic.txt', 'source/macro.txt',
+    ]
+    assert '"source/dynamic.txt" [style=dashed];' in graph.to_dot()
+
+
+def test_profiler(config, tmp_path):
+    """
+    Check that profiled runs record the timings, bytes, referenced
+    namespaces and filters of each path, also through included templates,
+    when rendering in workers and when writing in batched transactions.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / '{{ values.name }}.txt').write_text(
+        '{{ values.name | upper }} {{ ns.key }}', encoding='utf-8',
+    )
+    (source / 'plain.txt').write_text('{{ values.name }}', encoding='utf-8')
+    (source / 'include.txt').write_text(
+        "{% include 'library/common.j2' %}", encoding='utf-8',
+    )
+    library = tmp_path / 'library'
+    library.mkdir()
+    (library / 'common.j2').write_text(
+        '{{ ns.key | title }}', encoding='utf-8',
+    )
+
+    for jobs, durability in [
+        (1, None),
+        (2, None),
+        (1, 'per-directory'),
+        (2, 'end-of-run'),
+    ]:
+        destination = tmp_path / 'destination{}{}'.format(jobs, durability)
+        destination.mkdir()
+        ninjecto = make_ninjecto(
+            config, source, destination, {'name': 'file'},
+            namespaces={'ns': lambda config: {'key': 'value'}},
+            libraries=[library],
+        )
+
+        profiler = Profiler(top=1)
+        ninjecto.run(
+            jobs=jobs, profiler=profiler,
+            atomic=durability is not None, durability=durability,
+        )
+
+        entry = profiler.entries[str(source / '{{ values.name }}.txt')]
+        assert entry['destination'] == str(
+            destination / 'source' / 'file.txt'
+        )
+        assert entry['filename'] > 0
+        assert entry['compile'] > 0
+        assert entry['render'] > 0
+        assert entry['write'] > 0
+        assert entry['bytes'] == len('FILE value')
+        assert entry['referenced_namespaces'] == ['ns']
+        assert entry['referenced_filters'] == ['upper']
+
+        entry = profiler.entries[str(source / 'plain.txt')]
+        assert entry['filename'] == 0
+        assert entry['referenced_namespaces'] == []
+        assert entry['referenced_filters'] == []
+
+        entry = profiler.entries[str(source / 'include.txt')]
+        assert entry['referenced_namespaces'] == ['ns']
+        assert entry['referenced_filters'] == ['title']
+
+        assert len(profiler.slowest(5)) == 3
+        profiler.save(tmp_path / 'report.json')
+        report = loads((tmp_path / 'report.json').read_text(encoding='utf-8'))
+        assert len(report['slowest']) == 1
+
+
+def test_compiled_templates(config, tmp_path, monkeypatch):
+    """
+    Check that runs render from the precompiled templates, also from a copy
+    of the source elsewhere, and compile the templates changed since.
+    """
+    config['ninjecto']['cache'] = {'enabled': False}
+
+    library = tmp_path / 'library'
+    library.mkdir()
+    (library / 'macros.j2').write_text(
+        '{% macro hello(who) %}Hello {{ who }}{% endmacro %}',
+        encoding='utf-8',
+    )
+
+    for name in ('source', 'copy'):
+        source = tmp_path / name
+        (source / '{{ values.dir }}').mkdir(parents=True)
+        (source / '{{ values.dir }}' / '{{ values.name }}.txt').write_text(
+            '{% import "library/macros.j2" as m %}'
+            '{{ m.hello(values.name) }}',
+            encoding='utf-8',
+        )
+        (source / 'plain.txt').write_text('plain', encoding='utf-8')
+
+    compiled = tmp_path / 'compiled'
+    ninjecto = make_ninjecto(
+        config, tmp_path / 'source', None, libraries=[library],
+    )
+    assert ninjecto.compile(compiled) == 4
+    assert len(list(compiled.glob('tmpl_*.py'))) == 4
+
+    values = {'dir': 'sub', 'name': 'world'}
+    source = tmp_path / 'copy'
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    ninjecto = make_ninjecto(
+        config, source, destination, values, libraries=[library],
+    )
+    assert ninjecto.load_compiled(compiled)
+
+    def compile(*args, **kwargs):
+        raise AssertionError('Template was compiled')
+
+    monkeypatch.setattr(ninjecto._environment, 'compile', compile)
+    ninjecto.run()
+
+    output = destination / 'copy' / 'sub' / 'world.txt'
+    assert output.read_text() == 'Hello world'
+    assert (destination / 'copy' / 'plain.txt').read_text() == 'plain'
+
+    # Changed templates are compiled from their source
+    monkeypatch.undo()
+    (source / '{{ values.dir }}' / '{{ values.name }}.txt').write_text(
+        'Bye {{ values.name }}', encoding='utf-8',
+    )
+    ninjecto.run(override=True)
+    assert output.read_text() == 'Bye world'
+
+    # Templates compiled with other options are ignored
+    config['ninjecto']['environment']['trim_blocks'] = True
+    ninjecto = make_ninjecto(config, source, destination, values)
+    assert not ninjecto.load_compiled(compiled)
+
+
+def test_async_render(config, tmp_path):
+    """
+    Check that namespaces returning coroutines are awaited, by the async API
+    in the event loop of the caller, also when rendering synchronously from
+    a coroutine, and that the async API renders files concurrently.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    for index in range(4):
+        (source / '{{{{ file.name }}}}{}.txt'.format(index)).write_text(
+            '{{ file.name }} {{ secrets.key }} {{ secrets.fetch() }}',
+            encoding='utf-8',
+        )
+
+    running = 0
+    concurrent = 0
+    loops = []
+
+    async def secrets(config):
+        loops.append(asyncio.get_running_loop())
+
+        async def fetch():
+            return 'fetched'
+        return {'key': 'secret', 'fetch': fetch}
+
+    def file(config):
+        async def namespace(filepath):
+            nonlocal running, concurrent
+            running += 1
+            concurrent = max(concurrent, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {'name': 'file'}
+        return namespace
+
+    namespaces = {'secrets': secrets, 'file': file}
+
+    # Synchronous renders await the namespaces too
+    ninjecto = make_ninjecto(config, source, None, namespaces=namespaces)
+
+    async def render():
+        return ninjecto.render(
+            'name', '{{ secrets.key }} {{ file.name }}', filepath=source,
+        )
+
+    assert asyncio.run(render()) == 'secret file'
+
+    with raises(RuntimeError):
+        asyncio.run(ninjecto.arender('name', '{{ secrets.key }}'))
+
+    config['ninjecto']['environment']['enable_async'] = True
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    ninjecto = make_ninjecto(
+        config, source, destination, namespaces=namespaces,
+    )
+
+    async def main():
+        assert await ninjecto.arender(
+            'name', '{{ secrets.fetch() }}',
+        ) == 'fetched'
+        processed = await ninjecto.arun(
+            concurrency=2, atomic=True, durability='per-directory',
+        )
+        return processed, asyncio.get_running_loop()
+
+    processed, loop = asyncio.run(main())
+    assert processed == 5
+    assert loops[-1] is loop
+    assert concurrent == 2
+
+    for index in range(4):
+        output = destination / 'source' / 'file{}.txt'.format(index)
+        assert output.read_text() == 'file secret fetched'
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tests for the rendering engine.
+"""
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from yaml import safe_load as yaml_load
+
+from ninjecto.engine import Engine
+from ninjecto.loaders import LibraryLoader
+from ninjecto.environment import NinjectoEnvironment
+
+
+def make_engine(**kwargs):
+    config = yaml_load(
+        (Path(__file__).parent / 'config' / 'config.yaml').read_text(
+            encoding='utf-8',
+        )
+    )
+    config['ninjecto']['cache'] = {'enabled': False}
+    return Engine(config, **kwargs)
+
+
+def test_engine(tmp_path, monkeypatch, caplog):
+    """
+    Check that renders from many threads get their own values and paths,
+    sharing the compiled templates and the scan of the libraries, without
+    forking workers and without logging their values.
+    """
+    library = tmp_path / 'library'
+    library.mkdir()
+    (library / 'macros.j2').write_text(
+        '{% macro hello(who) %}Hello {{ who }}{% endmacro %}',
+        encoding='utf-8',
+    )
+
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / '{{ values.name }}.txt').write_text(
+        '{% import "library/macros.j2" as m %}{{ m.hello(values.name) }}',
+        encoding='utf-8',
+    )
+    (source / 'static.txt').write_text('static', encoding='utf-8')
+
+    scans = []
+    scan = LibraryLoader.scan
+
+    def count_scan(self):
+        scans.append(self)
+        return scan(self)
+
+    monkeypatch.setattr(LibraryLoader, 'scan', count_scan)
+
+    engine = make_engine(libraries=[library])
+    names = ['name{}'.format(index) for index in range(32)]
+
+    def render_string(name):
+        return engine.render_string(
+            'greeting', '{{ values.name }}!', {'name': name},
+        )
+
+    def render_tree(name):
+        destination = tmp_path / name
+        destination.mkdir()
+        return engine.render_tree(
+            source, destination, {'name': name}, jobs=4,
+        )
+
+    # Compile the templates once
+    assert render_string('warm') == 'warm!'
+    assert render_tree('warm') == (3, {
+        'written': 2, 'unchanged': 0, 'skipped': 0,
+    })
+
+    def compile(*args, **kwargs):
+        raise AssertionError('Template was compiled again')
+
+    def fork(*args, **kwargs):
+        raise AssertionError('Worker processes were forked')
+
+    monkeypatch.setattr(NinjectoEnvironment, 'compile', compile)
+    monkeypatch.setattr('ninjecto.core.ProcessPoolExecutor', fork)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(render_string, names)) == [
+            '{}!'.format(name) for name in names
+        ]
+        for processed, summary in executor.map(render_tree, names):
+            assert processed == 3
+            assert summary['written'] == 2
+
+    for name in names:
+        output = tmp_path / name / 'source' / '{}.txt'.format(name)
+        assert output.read_text(encoding='utf-8') == 'Hello {}'.format(name)
+
+    assert len(scans) == 1
+    assert 'With values' not in caplog.text
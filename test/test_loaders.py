@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tests for the template loaders.
+"""
+from os import symlink, utime
+
+from jinja2 import Environment, PrefixLoader, TemplateNotFound
+from pytest import raises
+
+from ninjecto.loaders import LibraryLoader
+
+
+def test_library_loader(tmp_path):
+    """
+    Check that the library loader serves templates from its index, with the
+    priority of the directories, and only sees changes after a scan unless
+    revalidating.
+    """
+    first = tmp_path / 'first'
+    (first / 'macros').mkdir(parents=True)
+    template = first / 'macros' / 'common.j2'
+    second = tmp_path / 'second'
+    (second / 'macros').mkdir(parents=True)
+    (second / 'macros' / 'common.j2').write_text('second', encoding='utf-8')
+    (second / 'other.j2').write_text('other', encoding='utf-8')
+
+    environment = Environment()
+
+    for revalidate in (False, True):
+        template.write_text('first', encoding='utf-8')
+        utime(template, ns=(0, 0))
+
+        loader = LibraryLoader([first, second], revalidate=revalidate)
+        assert loader.list_templates() == ['macros/common.j2', 'other.j2']
+
+        source, filename, uptodate = loader.get_source(
+            environment, 'macros/common.j2',
+        )
+        assert source == 'first'
+        assert filename == str(template)
+        assert uptodate()
+
+        with raises(TemplateNotFound):
+            loader.get_source(environment, 'missing.j2')
+
+        template.write_text('changed', encoding='utf-8')
+        utime(template, ns=(0, 1))
+
+        # Without revalidation, only a scan sees the change
+        assert uptodate() is False if revalidate else uptodate()
+        if not revalidate:
+            loader.scan()
+            assert not uptodate()
+
+        assert loader.get_source(
+            environment, 'macros/./common.j2',
+        )[0] == 'changed'
+
+
+def test_library_loader_symlinks(tmp_path):
+    """
+    Check that templates under symbolic links to directories are found even
+    when the links aren't followed to list the templates.
+    """
+    (tmp_path / 'real').mkdir()
+    (tmp_path / 'real' / 'm.j2').write_text('M', encoding='utf-8')
+    library = tmp_path / 'lib'
+    library.mkdir()
+    symlink('../real', library / 'sub')
+
+    loader = LibraryLoader([library])
+    assert loader.list_templates() == []
+
+    environment = Environment(loader=PrefixLoader({'library': loader}))
+    template = environment.from_string("{% include 'library/sub/m.j2' %}")
+    assert template.render() == 'M'
+    assert LibraryLoader(
+        [library], followlinks=True,
+    ).list_templates() == ['sub/m.j2']
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tests for the render daemon and its client.
+"""
+from os import environ, getcwd, getuid, utime
+from threading import Thread
+from socketserver import ThreadingUnixStreamServer
+
+from pytest import fixture, raises
+
+from ninjecto.client import request
+from ninjecto.server import RenderServer, RenderHandler
+
+
+def job(source, destination, **kwargs):
+    job = {
+        'source': str(source),
+        'destination': str(destination),
+        'output_in': True,
+        'stdout': False,
+        'configs': [],
+        'libraries': [],
+        'values_files': [],
+        'values': {},
+        'values_in': None,
+        'cwd': getcwd(),
+        'environ': dict(environ),
+        'options': {},
+    }
+    job.update(kwargs)
+    return job
+
+
+@fixture
+def daemon(tmp_path):
+    """
+    Serve a renderer on a socket from a thread, returning the path of the
+    socket.
+    """
+    servers = []
+
+    def start(renderer):
+        path = tmp_path / 'ninjecto{}.sock'.format(len(servers))
+        server = ThreadingUnixStreamServer(str(path), RenderHandler)
+        server.renderer = renderer
+        Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return path
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server(tmp_path, monkeypatch, daemon):
+    """
+    Check that the daemon renders the jobs sent through its socket, reusing
+    the instance of a source between jobs, without forking workers, and
+    reports failures.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'template.txt').write_text(
+        '{{ values.key }} {{ values.count + 1 }}', encoding='utf-8',
+    )
+    (source / 'other.txt').write_text('{{ values.key }}', encoding='utf-8')
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    def fork(*args, **kwargs):
+        raise AssertionError('Worker processes were forked')
+
+    monkeypatch.setattr('ninjecto.core.ProcessPoolExecutor', fork)
+
+    renderer = RenderServer(max_instances=1)
+    path = daemon(renderer)
+
+    response = request(path, job(
+        source, destination, values={'key': 'one', 'count': '1'},
+    ))
+    assert response['result']['summary']['written'] == 2
+    output = destination / 'source' / 'template.txt'
+    assert output.read_text(encoding='utf-8') == 'one 2'
+
+    instances = list(renderer._instances.values())
+
+    response = request(path, job(
+        source, destination,
+        values={'key': 'two', 'count': '2'},
+        options={'override': True, 'jobs': 4},
+    ))
+    assert response['result']['summary']['written'] == 2
+    assert output.read_text(encoding='utf-8') == 'two 3'
+    assert list(renderer._instances.values()) == instances
+
+    response = request(path, job(
+        source / 'template.txt', '-',
+        stdout=True, output_in=False,
+        values={'key': 'three', 'count': '3'},
+    ))
+    assert response['result']['output'] == 'three 4'
+    assert len(renderer._instances) == 1
+
+    response = request(path, job(source, destination))
+    assert 'exists' in response['error']
+
+
+def test_server_client_context(tmp_path, daemon):
+    """
+    Check that the daemon renders with the configuration found from the
+    working directory of the client, loading it again when it changes, and
+    with the environment of the client, reusing the instance between
+    environments.
+    """
+    source = tmp_path / 'template.txt'
+    source.write_text(
+        '[[ env.NINJECTO_CLIENT ]] {{ env.NINJECTO_CLIENT }}',
+        encoding='utf-8',
+    )
+
+    project = tmp_path / 'project'
+    project.mkdir()
+    ninjerc = project / '.ninjerc.yaml'
+    ninjerc.write_text(
+        'ninjecto:\n'
+        '  environment:\n'
+        '    variable_start_string: "[["\n'
+        '    variable_end_string: "]]"\n',
+        encoding='utf-8',
+    )
+
+    renderer = RenderServer()
+    path = daemon(renderer)
+    cwd = getcwd()
+
+    def render(client):
+        response = request(path, job(
+            source, '-', stdout=True, output_in=False, cwd=str(project),
+            environ=dict(environ, NINJECTO_CLIENT=client),
+        ))
+        assert getcwd() == cwd
+        assert 'NINJECTO_CLIENT' not in environ
+        return response['result']['output']
+
+    assert render('one') == 'one {{ env.NINJECTO_CLIENT }}'
+    assert render('two') == 'two {{ env.NINJECTO_CLIENT }}'
+    assert len(renderer._instances) == 1
+
+    ninjerc.write_text('ninjecto: {}\n', encoding='utf-8')
+    utime(ninjerc, ns=(0, 0))
+    assert render('two') == '[[ env.NINJECTO_CLIENT ]] two'
+    assert len(renderer._loaded) == 2
+
+
+def test_server_other_user(tmp_path, monkeypatch, daemon):
+    """
+    Check that jobs are never sent to a daemon of another user.
+    """
+    path = daemon(RenderServer())
+    monkeypatch.setattr('ninjecto.client.getuid', lambda: getuid() + 1)
+
+    with raises(PermissionError):
+        request(path, job(tmp_path, tmp_path))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tests for the tracing of the runs.
+"""
+from json import loads
+from pathlib import Path
+
+from yaml import safe_load as yaml_load
+
+from ninjecto.core import Ninjecto
+from ninjecto.tracing import span, start_tracing, stop_tracing, tracer
+
+
+def test_tracing(tmp_path):
+    """
+    Check that spans are only recorded while tracing, including the ones of
+    the files rendered in worker processes, and saved as trace events.
+    """
+    config = yaml_load(
+        (Path(__file__).parent / 'config' / 'config.yaml').read_text(
+            encoding='utf-8',
+        )
+    )
+    source = tmp_path / 'source'
+    source.mkdir()
+    for index in range(2):
+        (source / 'file{}.txt'.format(index)).write_text(
+            '{{ values.key }}', encoding='utf-8',
+        )
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+
+    with span('untraced'):
+        pass
+    assert tracer() is None
+
+    traced = start_tracing()
+    try:
+        with span('phase', key='value'):
+            ninjecto = Ninjecto(
+                config, None, {}, {}, [], {'key': 'value'},
+                source, destination, None,
+            )
+            ninjecto.run(jobs=2)
+    finally:
+        assert stop_tracing() is traced
+
+    names = [event['name'] for event in traced.events]
+    assert 'untraced' not in names
+    assert names.count('render') == 2
+    assert {'phase', 'walk', 'execute', 'read', 'write'} <= set(names)
+
+    phase = traced.events[names.index('phase')]
+    assert phase['ph'] == 'X'
+    assert phase['args'] == {'key': 'value'}
+    assert all(
+        phase['ts'] <= event['ts'] <= phase['ts'] + phase['dur']
+        for event in traced.events
+    )
+
+    traced.save(tmp_path / 'trace.json')
+    trace = loads((tmp_path / 'trace.json').read_text(encoding='utf-8'))
+    assert trace['traceEvents'][0]['name'] == 'process_name'
+    assert len(trace['traceEvents']) > len(traced.events)
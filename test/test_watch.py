@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Tests for the filesystem watchers.
+"""
+
+from pytest import mark
+
+from ninjecto.watch import InotifyWatcher, PollingWatcher, create_watcher
+
+
+def inotify_watcher(paths, ignore):
+    return InotifyWatcher(paths, ignore)
+
+
+def polling_watcher(paths, ignore):
+    return PollingWatcher(paths, ignore, interval=0.01)
+
+
+@mark.parametrize('factory', [inotify_watcher, polling_watcher])
+def test_watcher(factory, tmp_path):
+    """
+    Check that watchers report changes in watched trees and files, including
+    new directories, and ignore the rest.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'template.txt').write_text('one', encoding='utf-8')
+    values = tmp_path / 'values.yaml'
+    values.write_text('key: one', encoding='utf-8')
+    (tmp_path / 'other.txt').write_text('one', encoding='utf-8')
+    ignored = source / 'ignored'
+    ignored.mkdir()
+
+    watcher = factory([source, values], [ignored])
+    try:
+        assert watcher.poll(0.05) == set()
+
+        (source / 'template.txt').write_text('two', encoding='utf-8')
+        assert source / 'template.txt' in watcher.wait(0.05)
+
+        # Editors usually replace files
+        replacement = tmp_path / 'values.yaml.swp'
+        replacement.write_text('key: two', encoding='utf-8')
+        replacement.replace(values)
+        assert values in watcher.wait(0.05)
+
+        (source / 'nested').mkdir()
+        assert source / 'nested' in watcher.wait(0.05)
+        (source / 'nested' / 'new.txt').write_text('one', encoding='utf-8')
+        assert source / 'nested' / 'new.txt' in watcher.wait(0.05)
+
+        (tmp_path / 'other.txt').write_text('two', encoding='utf-8')
+        (ignored / 'output.txt').write_text('two', encoding='utf-8')
+        assert watcher.poll(0.05) == set()
+    finally:
+        watcher.close()
+
+
+def test_create_watcher_polling(tmp_path):
+    """
+    Check that polling can be forced.
+    """
+    watcher = create_watcher([tmp_path], polling=True)
+    assert isinstance(watcher, PollingWatcher)
+    watcher.close()